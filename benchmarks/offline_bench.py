@@ -0,0 +1,114 @@
+"""
+离线基准：把任意 agent / team / workflow 指向本地假模型服务跑若干轮，不需要网络和API Key
+
+    python benchmarks/offline_bench.py level_4_team:reasoning_finance_team --runs 10 \
+        --message "compare AAPL news and stock price" --config benchmarks/stub_script.json
+    python benchmarks/offline_bench.py level_5_workflow:CacheWorkflow --runs 5
+    python benchmarks/offline_bench.py level_1_agent:agent --stub-url http://127.0.0.1:8900/v1   # 使用已经启动的假模型服务
+    python benchmarks/offline_bench.py level_4_team:reasoning_finance_team --runs 3 --prefix-cache   # 每次模型调用可命中前缀缓存的token
+
+目标为类时（如Workflow子类）先无参实例化。每轮的消息末尾带上序号，避免命中响应缓存。
+"""
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from serve_load_test import percentile, wait_until_ready  # noqa: E402
+
+
+def load_target(target: str):
+    module_name, _, attr = target.partition(":")
+    obj = getattr(importlib.import_module(module_name), attr)
+    return obj() if isinstance(obj, type) else obj
+
+
+def components(target) -> list:
+    """agent/team及其所有成员"""
+    return [target] + [c for member in getattr(target, "members", None) or [] for c in components(member)]
+
+
+def run_once(target, message: str) -> tuple:
+    """返回 (首个内容事件的秒数, 总耗时)"""
+    from agno.workflow import Workflow
+
+    start = time.perf_counter()
+    ttft = None
+    if isinstance(target, Workflow):
+        events = target.run(message=message)
+    else:
+        events = target.run(message, stream=True)
+    for event in events if not hasattr(events, "content") else [events]:
+        if ttft is None and getattr(event, "content", None):
+            ttft = time.perf_counter() - start
+    return ttft, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an agent, team or workflow against the stub model server")
+    parser.add_argument("target", help="模块:属性，如 level_4_team:reasoning_finance_team")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--message", default="What is the stock price of AAPL?")
+    parser.add_argument("--config", default=os.path.join(ROOT, "benchmarks", "stub_script.json"), help="假模型服务的JSON配置")
+    parser.add_argument("--stub-url", default=None, help="使用已经启动的假模型服务")
+    parser.add_argument("--stub-port", type=int, default=8901)
+    parser.add_argument("--online-tools", action="store_true", help="工具仍然访问真实数据源")
+    parser.add_argument("--prefix-cache", action="store_true", help="测量每次模型调用的提示词里可命中前缀缓存的token")
+    parser.add_argument("--unstable-prompt", action="store_true", help="保留agno默认的系统提示词（含精确到微秒的时间），和 --prefix-cache 一起对比")
+    args = parser.parse_args()
+
+    from models import point_at_stub
+
+    proc = None
+    stub_url = args.stub_url
+    try:
+        if stub_url is None:
+            stub_url = f"http://127.0.0.1:{args.stub_port}/v1"
+            proc = subprocess.Popen([
+                sys.executable, os.path.join(ROOT, "benchmarks", "stub_openai_server.py"),
+                "--port", str(args.stub_port), "--config", args.config,
+            ])
+            wait_until_ready(f"{stub_url}/models")
+
+        target = point_at_stub(load_target(args.target), stub_url, offline_tools=not args.online_tools)
+        if args.unstable_prompt:
+            for component in components(target):
+                component.stable_prompt = False
+        if args.prefix_cache:
+            from telemetry.prefix_cache import PREFIX_CACHE_ENV
+
+            os.environ[PREFIX_CACHE_ENV] = "1"
+        ttfts, latencies = [], []
+        for i in range(args.runs):
+            ttft, latency = run_once(target, f"{args.message} (run {i})")
+            if ttft is not None:
+                ttfts.append(ttft)
+            latencies.append(latency)
+
+        stats = httpx.get(stub_url.rsplit("/v1", 1)[0] + "/stats").json()
+        print(f"{args.target}: {args.runs} runs")
+        print(f"  TTFT p50 {percentile(ttfts, 0.5) * 1000:.0f}ms p95 {percentile(ttfts, 0.95) * 1000:.0f}ms, "
+              f"latency p50 {percentile(latencies, 0.5) * 1000:.0f}ms p95 {percentile(latencies, 0.95) * 1000:.0f}ms")
+        print(f"  stub: {stats}")
+        if args.prefix_cache:
+            from telemetry import get_prefix_cache_meter
+
+            for row in get_prefix_cache_meter().summary():
+                share = row["eligible_tokens"] / row["prompt_tokens"] * 100 if row["prompt_tokens"] else 0.0
+                print(f"  {row['component']} ({row['model']}): {row['calls']} calls, {row['prompt_tokens'] / row['calls']:.0f} prompt tokens/call, "
+                      f"{row['eligible_tokens'] / row['calls']:.0f} cache-eligible/call ({share:.0f}%), {row['cached_tokens']} cached by provider")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+按股票和日期限定的知识库检索基准：多公司语料上对比三种过滤方式的检索延迟
+- postfilter：agno LanceDb默认实现，先向量检索取limit条，再按meta_data过滤（结果经常不足limit条）
+- prefilter：FinancialLanceDb把条件作为where子句在向量检索之前执行，标量列没有索引，逐行比较
+- indexed：同上，code/date建BTREE索引、doc_type/report_type建BITMAP索引
+- hybrid：建了索引后的混合检索（financial_knowledge 默认是混合检索），向量和全文两路各自prefilter后融合
+
+    python benchmarks/prefilter_search.py --companies 2000 --docs-per-company 50 --queries 100
+    python benchmarks/prefilter_search.py --ann        # 另外建IVF_PQ向量索引，对比ANN + 过滤
+
+向量是随机生成的，只测检索本身，不调用嵌入模型
+建了IVF_PQ索引时，限定股票的检索在过滤后的行上精确计算距离（bypass_vector_index），所以prefilter两行的命中数不受nprobes影响
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agno.embedder.base import Embedder
+from agno.utils.log import logger
+from agno.vectordb.lancedb import LanceDb, SearchType
+
+from knowledge.financial import ANNOUNCEMENT, REPORT, SENTIMENT, STATEMENT, FinancialLanceDb
+
+REPORT_TYPES = ["年报", "中报", "一季报", "三季报"]
+DOC_TYPES = [STATEMENT, ANNOUNCEMENT, SENTIMENT, REPORT]
+
+
+@dataclass
+class RandomEmbedder(Embedder):
+    """每次返回一个随机单位向量，检索延迟与嵌入模型无关"""
+
+    dimensions: Optional[int] = 768
+
+    def get_embedding(self, text: str) -> List[float]:
+        vector = np.random.standard_normal(self.dimensions).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+def build_corpus(vector_db: FinancialLanceDb, companies: int, docs_per_company: int, dim: int, batch: int = 20000) -> List[str]:
+    """按公司写入随机向量和元数据，返回股票代码列表"""
+    codes = [f"{600000 + i:06d}" for i in range(companies)]
+    rows = [(code, j) for code in codes for j in range(docs_per_company)]
+    rng = np.random.default_rng(0)
+    for start in range(0, len(rows), batch):
+        chunk = rows[start:start + batch]
+        vectors = rng.standard_normal((len(chunk), dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        meta = [
+            {
+                "code": code,
+                "doc_type": DOC_TYPES[j % len(DOC_TYPES)],
+                "report_type": REPORT_TYPES[j % len(REPORT_TYPES)],
+                "date": f"{2015 + j % 10}-{(j % 12) + 1:02d}-28",
+            }
+            for code, j in chunk
+        ]
+        payloads = [json.dumps({"name": f"{m['code']}_{i}", "meta_data": m, "content": f"{m['code']} doc {start + i}", "usage": None}) for i, m in enumerate(meta)]
+        table = pa.table({
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), dim),
+            "id": [f"{start + i}" for i in range(len(chunk))],
+            "payload": payloads,
+            **{column: [m[column] for m in meta] for column in ("code", "doc_type", "report_type", "date")},
+        })
+        vector_db.table.add(table)
+    return codes
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+def timed(search, queries: List[dict]) -> dict:
+    latencies, hits = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits.append(len(search(query)))
+        latencies.append(time.perf_counter() - start)
+    return {
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "avg_hits": sum(hits) / len(hits),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticker/date scoped vector search: post-filter vs scalar-indexed prefilter")
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--docs-per-company", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--ann", action="store_true", help="建IVF_PQ向量索引")
+    args = parser.parse_args()
+    logger.setLevel("WARNING")
+
+    uri = tempfile.mkdtemp()
+    vector_db = FinancialLanceDb(uri=uri, table_name="bench", search_type=SearchType.vector, embedder=RandomEmbedder(dimensions=args.dim))
+    vector_db.create()
+    start = time.perf_counter()
+    codes = build_corpus(vector_db, args.companies, args.docs_per_company, args.dim)
+    total = vector_db.get_count()
+    print(f"{total} rows ({args.companies} companies x {args.docs_per_company}), built in {time.perf_counter() - start:.1f}s, {uri}")
+    if args.ann:
+        start = time.perf_counter()
+        vector_db.table.create_index(metric="cosine", num_partitions=max(1, int(total ** 0.5)), num_sub_vectors=args.dim // 16, vector_column_name="vector")
+        print(f"IVF_PQ index built in {time.perf_counter() - start:.1f}s")
+
+    random.seed(0)
+    queries = [
+        {"code": random.choice(codes), "report_type": random.choice(REPORT_TYPES), "since": f"{random.randint(2015, 2021)}", "until": f"{random.randint(2022, 2024)}"}
+        for _ in range(args.queries)
+    ]
+    # agno默认实现只能按meta_data做等值比较，没法表达日期范围
+    def equality(q: dict) -> dict:
+        return {"code": q["code"], "report_type": q["report_type"]}
+
+    results = {
+        "unfiltered": timed(lambda q: LanceDb.search(vector_db, "q", args.limit), queries),
+        "postfilter": timed(lambda q: LanceDb.search(vector_db, "q", args.limit, equality(q)), queries),
+        "prefilter": timed(lambda q: vector_db.search("q", args.limit, q), queries),
+    }
+    start = time.perf_counter()
+    vector_db.create_scalar_indexes()
+    print(f"scalar indexes built in {time.perf_counter() - start:.1f}s")
+    results["indexed"] = timed(lambda q: vector_db.search("q", args.limit, q), queries)
+    hybrid_db = FinancialLanceDb(uri=uri, table_name="bench", search_type=SearchType.hybrid, embedder=vector_db.embedder)
+    start = time.perf_counter()
+    hybrid_db.table.create_fts_index("payload", use_tantivy=False, replace=True)
+    hybrid_db.fts_index_exists = True
+    print(f"FTS index built in {time.perf_counter() - start:.1f}s")
+    # 文档内容是 "{code} doc {n}"，全文这一路也有命中
+    results["hybrid"] = timed(lambda q: hybrid_db.search(f"{q['code']} doc", args.limit, q), queries)
+
+    for mode, r in results.items():
+        print(f"{mode:>11}: p50 {r['p50_ms']:7.1f}ms  p95 {r['p95_ms']:7.1f}ms  avg hits {r['avg_hits']:.2f}/{args.limit}")
+    speedup = results["postfilter"]["p50_ms"] / max(results["indexed"]["p50_ms"], 1e-9)
+    print(f"indexed prefilter vs postfilter p50: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
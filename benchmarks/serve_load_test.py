@@ -0,0 +1,136 @@
+"""
+生产模式压测：启动假模型服务和 serve.py 多worker应用，并发发起流式agent请求，
+统计每秒请求数（RPS）和首个token时间（TTFT）
+
+    python benchmarks/serve_load_test.py --app main:app --workers 4 --concurrency 32 --requests 400
+    python benchmarks/serve_load_test.py --url http://127.0.0.1:7777 --concurrency 16   # 压测已经启动的服务
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+def wait_until_ready(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+async def one_request(client: httpx.AsyncClient, url: str, message: str, results: list) -> None:
+    start = time.perf_counter()
+    ttft = None
+    try:
+        async with client.stream("POST", url, data={"message": message, "stream": "true"}) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                if ttft is None and b"RunResponseContent" in chunk:
+                    ttft = time.perf_counter() - start
+        results.append((ttft, time.perf_counter() - start, None))
+    except Exception as e:
+        results.append((None, time.perf_counter() - start, e))
+
+
+async def run_load(base_url: str, concurrency: int, total: int) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=concurrency)) as client:
+        agents = (await client.get("/v1/playground/agents")).json()
+        run_url = f"/v1/playground/agents/{agents[0]['agent_id']}/runs"
+
+        results: list = []
+        counter = iter(range(total))
+
+        async def user():
+            for i in counter:
+                await one_request(client, run_url, f"load test message {i}", results)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[user() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r[2] is None]
+    ttfts = [r[0] for r in ok if r[0] is not None]
+    latencies = [r[1] for r in ok]
+    errors = [r[2] for r in results if r[2] is not None]
+    return {
+        "requests": len(results),
+        "errors": len(errors),
+        "first_error": repr(errors[0]) if errors else None,
+        "rps": len(ok) / elapsed,
+        "ttft_p50": percentile(ttfts, 0.5),
+        "ttft_p95": percentile(ttfts, 0.95),
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p95": percentile(latencies, 0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the production server against a stub model")
+    parser.add_argument("--app", default="main:app", help="要压测的应用，其中的模型全部会指向假模型服务")
+    parser.add_argument("--url", default=None, help="压测已经启动的服务，不再启动假模型和应用")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=7799)
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--ttft", type=float, default=0.2, help="假模型首个token延迟（秒）")
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--tokens-per-sec", default="200")
+    parser.add_argument("--stub-config", default=None, help="假模型服务的JSON配置，如 benchmarks/stub_script.json")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    procs = []
+    base_url = args.url
+    try:
+        if base_url is None:
+            stub_url = f"http://127.0.0.1:{args.stub_port}/v1"
+            stub_cmd = [
+                sys.executable, os.path.join(ROOT, "benchmarks", "stub_openai_server.py"),
+                "--port", str(args.stub_port), "--ttft", str(args.ttft),
+                "--tokens", str(args.tokens), "--tokens-per-sec", str(args.tokens_per_sec),
+            ]
+            if args.stub_config:
+                stub_cmd += ["--config", args.stub_config]
+            procs.append(subprocess.Popen(stub_cmd))
+            wait_until_ready(f"{stub_url}/models")
+
+            procs.append(subprocess.Popen(
+                [sys.executable, "serve.py", args.app, "--workers", str(args.workers), "--host", "127.0.0.1",
+                 "--port", str(args.port), "--stub-url", stub_url],
+                cwd=ROOT, stdout=subprocess.DEVNULL,
+            ))
+            base_url = f"http://127.0.0.1:{args.port}"
+            wait_until_ready(f"{base_url}/v1/playground/status")
+
+        r = asyncio.run(run_load(base_url, args.concurrency, args.requests))
+        print(f"{args.app} x{args.workers} workers, concurrency {args.concurrency}: {r['requests']} requests, {r['errors']} errors")
+        print(f"  {r['rps']:.1f} req/s, TTFT p50 {r['ttft_p50'] * 1000:.0f}ms p95 {r['ttft_p95'] * 1000:.0f}ms, "
+              f"latency p50 {r['latency_p50'] * 1000:.0f}ms p95 {r['latency_p95'] * 1000:.0f}ms")
+        if r["first_error"]:
+            print(f"  first error: {r['first_error']}")
+    finally:
+        # SIGTERM走优雅退出
+        for p in reversed(procs):
+            p.terminate()
+        for p in procs:
+            p.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+SQLite会话存储压测：模拟多个worker进程 × 多个并发会话，每轮对话 read -> upsert，
+对比默认SqliteStorage和WAL + 连接池 + 批量提交的WalSqliteStorage
+
+    python benchmarks/sqlite_load_test.py --processes 4 --threads 8 --turns 20
+
+输出写入吞吐（writes/s）、写锁等待时间（p50/p95）和 database is locked 错误数
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from multiprocessing import Process, Queue
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agno.storage.session.agent import AgentSession
+from agno.storage.sqlite import SqliteStorage
+from agno.utils.log import logger
+
+from storage.wal import WalSqliteStorage, get_lock_stats
+
+
+def make_run(turn: int) -> dict:
+    return {
+        "run_id": str(uuid.uuid4()),
+        "content": f"answer {turn} " + "x" * 400,
+        "messages": [{"role": "user", "content": f"question {turn}"}, {"role": "assistant", "content": "x" * 400}],
+    }
+
+
+def simulate_session(storage, turns: int, latencies: list, errors: list) -> None:
+    session_id = str(uuid.uuid4())
+    runs = []
+    for turn in range(turns):
+        storage.read(session_id=session_id)
+        runs.append(make_run(turn))
+        session = AgentSession(session_id=session_id, agent_id="bench", user_id="bench", memory={"runs": list(runs)})
+        start = time.perf_counter()
+        if storage.upsert(session) is None:
+            errors.append(session_id)
+        latencies.append(time.perf_counter() - start)
+
+
+def worker(mode: str, db_file: str, threads: int, turns: int, out: Queue) -> None:
+    # SqliteStorage吞掉了写入异常，只打印日志，压测时不需要
+    logger.setLevel("CRITICAL")
+    if mode == "wal":
+        storage = WalSqliteStorage(table_name="sessions", db_file=db_file, mode="agent")
+    else:
+        storage = SqliteStorage(table_name="sessions", db_file=db_file, mode="agent")
+        storage.create()
+
+    latencies: list = []
+    errors: list = []
+    pool = [threading.Thread(target=simulate_session, args=(storage, turns, latencies, errors)) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if mode == "wal":
+        storage.flush()
+    elapsed = time.perf_counter() - start
+
+    stats = get_lock_stats(storage.db_engine).snapshot() if mode == "wal" else {}
+    out.put({
+        "writes": len(latencies),
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "errors": len(errors),
+        "lock_waits": get_lock_stats(storage.db_engine).lock_waits if mode == "wal" else [],
+        "commits": stats.get("commits", len(latencies)),
+    })
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+def run(mode: str, processes: int, threads: int, turns: int) -> dict:
+    db_file = os.path.join(tempfile.mkdtemp(), f"{mode}.db")
+    # 先在主进程建表，避免多个进程同时建表
+    if mode == "wal":
+        WalSqliteStorage(table_name="sessions", db_file=db_file, mode="agent")
+    else:
+        SqliteStorage(table_name="sessions", db_file=db_file, mode="agent").create()
+
+    out: Queue = Queue()
+    procs = [Process(target=worker, args=(mode, db_file, threads, turns, out)) for _ in range(processes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    writes = sum(r["writes"] for r in results)
+    latencies = [x for r in results for x in r["latencies"]]
+    # 默认模式下无法单独测量等锁时间，upsert耗时基本就是等锁+提交的时间
+    waits = [x for r in results for x in r["lock_waits"]] or latencies
+    return {
+        "mode": mode,
+        "writes": writes,
+        "commits": sum(r["commits"] for r in results),
+        "writes_per_s": writes / elapsed,
+        "upsert_p50_ms": percentile(latencies, 0.5) * 1000,
+        "upsert_p95_ms": percentile(latencies, 0.95) * 1000,
+        "lock_wait_p50_ms": percentile(waits, 0.5) * 1000,
+        "lock_wait_p95_ms": percentile(waits, 0.95) * 1000,
+        "lock_wait_total_s": sum(waits),
+        "locked_errors": sum(r["errors"] for r in results),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite session storage load test")
+    parser.add_argument("--processes", type=int, default=4, help="worker进程数")
+    parser.add_argument("--threads", type=int, default=8, help="每个进程的并发会话数")
+    parser.add_argument("--turns", type=int, default=20, help="每个会话的对话轮数")
+    parser.add_argument("--modes", nargs="+", default=["default", "wal"], choices=["default", "wal"])
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.threads} sessions x {args.turns} turns")
+    for mode in args.modes:
+        r = run(mode, args.processes, args.threads, args.turns)
+        print(
+            f"{r['mode']:>8}: {r['writes']} writes in {r['commits']} commits, {r['writes_per_s']:.0f} writes/s, "
+            f"upsert p50 {r['upsert_p50_ms']:.1f}ms p95 {r['upsert_p95_ms']:.1f}ms, "
+            f"lock wait p50 {r['lock_wait_p50_ms']:.1f}ms p95 {r['lock_wait_p95_ms']:.1f}ms total {r['lock_wait_total_s']:.2f}s, "
+            f"{r['locked_errors']} failed writes"
+        )
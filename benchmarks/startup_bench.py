@@ -0,0 +1,75 @@
+"""
+冷启动基准：每次在新进程里导入入口模块，统计导入耗时，并用 -X importtime 列出最慢的依赖
+
+    python benchmarks/startup_bench.py playground main level_2_agent --runs 5 --top 15
+
+导入不应该有网络请求等副作用，否则这里测到的是网络延迟
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_once(module: str) -> Tuple[float, str]:
+    """在新进程里导入一次，返回 (墙钟秒数, importtime输出)"""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stderr
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int, int]]:
+    """模块名 -> (自身微秒, 累计微秒, 嵌套深度)"""
+    result = {}
+    for line in output.splitlines():
+        m = _LINE.match(line)
+        if m:
+            result[m.group(4)] = (int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+    return result
+
+
+def top_level_packages(modules: Dict[str, Tuple[int, int, int]]) -> List[Tuple[str, int]]:
+    """按顶层包汇总自身耗时，例如 openai、pandas、google"""
+    totals: Dict[str, int] = {}
+    for name, (self_us, _, _) in modules.items():
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0) + self_us
+    return sorted(totals.items(), key=lambda kv: -kv[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of entry point modules")
+    parser.add_argument("modules", nargs="*", default=["playground"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="列出自身耗时最多的顶层包数量")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        walls, outputs = [], []
+        for _ in range(args.runs):
+            wall, output = import_once(module)
+            walls.append(wall)
+            outputs.append(output)
+        modules = parse_importtime(outputs[-1])
+        total = modules.get(module, (0, 0, 0))[1]
+        print(f"{module}: wall p50 {statistics.median(walls) * 1000:.0f}ms min {min(walls) * 1000:.0f}ms, "
+              f"import {total / 1000:.0f}ms, {len(modules)} modules")
+        for name, self_us in top_level_packages(modules)[: args.top]:
+            print(f"  {self_us / 1000:8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
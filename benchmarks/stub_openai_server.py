@@ -0,0 +1,233 @@
+"""
+本地OpenAI兼容的假模型服务，用于离线压测，不需要网络和API Key
+
+    python benchmarks/stub_openai_server.py --port 8900 --ttft 0.2 --tokens 50 --tokens-per-sec 100
+    python benchmarks/stub_openai_server.py --config benchmarks/stub_script.json
+
+模型指向 http://127.0.0.1:8900/v1 即可（见 models.point_at_stub），支持：
+- /v1/chat/completions，普通和stream两种返回，流式按设定的速度逐token输出
+- 首token延迟、输出速度、回复长度可以是固定值，也可以是分布：
+  "0.2"、"uniform:0.1,0.3"、"normal:0.2,0.05"、"lognormal:-1.6,0.4"、"exp:0.2"
+- 工具调用脚本：用户消息匹配某条规则时返回tool_calls，收到工具结果后再返回文本回答
+- /v1/models、/stats（请求数、工具调用数、输入输出token数），usage里的prompt_tokens按请求长度估算
+
+配置文件（JSON）的字段与命令行参数同名，另有 script：
+    {
+      "ttft": "lognormal:-1.6,0.4",
+      "tokens_per_sec": "normal:80,10",
+      "tokens": "uniform:30,80",
+      "script": [
+        {"match": "stock price|股价", "tool_calls": [{"name": "get_current_stock_price", "arguments": {"symbol": "AAPL"}}]},
+        {"match": "summary", "content": "A fixed answer."}
+      ]
+    }
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+class Distribution:
+    """解析 "0.2" / "uniform:a,b" / "normal:mu,sigma" / "lognormal:mu,sigma" / "exp:mean"，采样结果不小于0"""
+
+    def __init__(self, spec: Any, rng: random.Random):
+        self.spec = str(spec)
+        self.rng = rng
+        kind, _, params = self.spec.partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",")]
+        if kind not in ("fixed", "uniform", "normal", "lognormal", "exp"):
+            raise ValueError(f"Unknown distribution: {spec}")
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = self.rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = self.rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = self.rng.lognormvariate(p[0], p[1])
+        else:
+            value = self.rng.expovariate(1 / p[0])
+        return max(0.0, value)
+
+
+class StubConfig:
+    """
+    :param ttft: 首个token前的延迟（秒）
+    :param tokens: 每次回复的token数
+    :param tokens_per_sec: 流式输出速度
+    :param script: 工具调用脚本，见模块说明
+    :param seed: 随机种子，相同种子的压测可以复现
+    """
+
+    def __init__(self, ttft: Any = 0.2, tokens: Any = 50, tokens_per_sec: Any = 100.0, script: Optional[List[Dict[str, Any]]] = None, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.ttft = Distribution(ttft, self.rng)
+        self.tokens = Distribution(tokens, self.rng)
+        self.tokens_per_sec = Distribution(tokens_per_sec, self.rng)
+        self.script = [dict(rule, pattern=re.compile(rule.get("match", ".*"), re.I)) for rule in script or []]
+        self.stats = {"requests": 0, "stream_requests": 0, "tool_call_responses": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    @classmethod
+    def from_file(cls, path: str, **overrides) -> "StubConfig":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        data.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**data)
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def plan_reply(body: Dict[str, Any], config: StubConfig) -> Dict[str, Any]:
+    """决定这次返回工具调用还是文本：只有最后一条是用户消息、规则命中且请求里带了对应工具时才调用工具"""
+    messages = body.get("messages") or []
+    last = messages[-1] if messages else {}
+    available = {t.get("function", {}).get("name") for t in body.get("tools") or []}
+    user_text = _text(last.get("content"))
+
+    rule = next((r for r in config.script if r["pattern"].search(user_text)), None) if last.get("role") == "user" else None
+    if rule and rule.get("tool_calls"):
+        calls = [c for c in rule["tool_calls"] if c["name"] in available]
+        if calls:
+            return {"tool_calls": [
+                {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                 "function": {"name": c["name"], "arguments": json.dumps(c.get("arguments", {}), ensure_ascii=False)}}
+                for c in calls
+            ]}
+    if rule and rule.get("content"):
+        return {"tokens": re.findall(r"\S+\s*", rule["content"])}
+
+    n = int(config.tokens.sample())
+    if last.get("role") == "tool":
+        # 工具结果之后的回答，带上一点工具输出，方便确认整条链路走通了
+        prefix = re.findall(r"\S+\s*", "Based on the tool results: " + _text(last.get("content"))[:80] + " ")
+        return {"tokens": prefix + [f"tok{i} " for i in range(max(0, n - len(prefix)))]}
+    return {"tokens": [f"tok{i} " for i in range(n)]}
+
+
+def _prompt_tokens(body: Dict[str, Any]) -> int:
+    # 约4个字符一个token，让token账本和成本统计在离线时也有接近真实的数量级
+    chars = sum(len(json.dumps(m.get("content") or "", ensure_ascii=False)) for m in body.get("messages") or [])
+    return max(1, (chars + len(json.dumps(body.get("tools") or [], ensure_ascii=False))) // 4)
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _chunk(chunk_id: str, model: str, delta: dict, finish_reason=None, usage=None) -> str:
+    data = {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage:
+        data["usage"] = usage
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def create_app(config: StubConfig) -> Starlette:
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        reply = plan_reply(body, config)
+        tokens = reply.get("tokens", [])
+        prompt_tokens = _prompt_tokens(body)
+        rate = config.tokens_per_sec.sample() or 1e9
+        ttft = config.ttft.sample()
+        config.stats["requests"] += 1
+        config.stats["prompt_tokens"] += prompt_tokens
+        config.stats["completion_tokens"] += len(tokens)
+        if "tool_calls" in reply:
+            config.stats["tool_call_responses"] += 1
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + len(tokens) / rate)
+            message = {"role": "assistant", "content": "".join(tokens) or None}
+            if "tool_calls" in reply:
+                message["tool_calls"] = reply["tool_calls"]
+            return JSONResponse({
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if "tool_calls" in reply else "stop"}],
+                "usage": _usage(prompt_tokens, len(tokens)),
+            })
+
+        config.stats["stream_requests"] += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+        async def stream():
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+            await asyncio.sleep(ttft)
+            yield _chunk(chunk_id, model, {"role": "assistant", "content": ""})
+            if "tool_calls" in reply:
+                for i, call in enumerate(reply["tool_calls"]):
+                    yield _chunk(chunk_id, model, {"tool_calls": [dict(call, index=i)]})
+                yield _chunk(chunk_id, model, {}, finish_reason="tool_calls")
+            else:
+                for token in tokens:
+                    yield _chunk(chunk_id, model, {"content": token})
+                    await asyncio.sleep(1 / rate)
+                yield _chunk(chunk_id, model, {}, finish_reason="stop")
+            if include_usage:
+                yield _chunk(chunk_id, model, {}, usage=_usage(prompt_tokens, len(tokens)))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    async def models(request: Request):
+        return JSONResponse({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+
+    async def stats(request: Request):
+        return JSONResponse(config.stats)
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/models", models, methods=["GET"]),
+        Route("/stats", stats, methods=["GET"]),
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub model server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--config", default=None, help="JSON配置文件，可包含工具调用脚本")
+    parser.add_argument("--ttft", default=None, help="首个token前的延迟（秒），可以是分布，默认0.2")
+    parser.add_argument("--tokens", default=None, help="每次回复的token数，可以是分布，默认50")
+    parser.add_argument("--tokens-per-sec", default=None, help="流式输出速度，可以是分布，默认100")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    overrides = {"ttft": args.ttft, "tokens": args.tokens, "tokens_per_sec": args.tokens_per_sec, "seed": args.seed}
+    if args.config:
+        config = StubConfig.from_file(args.config, **overrides)
+    else:
+        config = StubConfig(**{k: v for k, v in overrides.items() if v is not None})
+
+    import uvicorn
+
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
@@ -1,32 +1,21 @@
-from agno.agent import Agent
-from agno.models.anthropic import Claude
-from agno.models.google import Gemini
-from agno.tools.yfinance import YFinanceTools
-
-from agno.models.openai import OpenAILike
-import os
-GEMINI_API_KEY= os.getenv("GEMINI_API_KEY")
-QWEN_API_KEY=os.getenv("QWEN_API_KEY")
+from models import get_model
+from telemetry import InstrumentedAgent, get_latency_store
+from telemetry.dashboard import print_dashboard
+from tools import CachedYFinanceTools
  
 
-qw_model = OpenAILike(
-    id= 'qwen-turbo', # qwen-turbo / qwen3-235b-a22b / gemini-2.0-flash
-    api_key=QWEN_API_KEY,
-    base_url='https://dashscope.aliyuncs.com/compatible-mode/v1/',
-)
-gemini_model = OpenAILike(
-    id='gemini-2.0-flash',
-    api_key=GEMINI_API_KEY,
-    base_url='https://generativelanguage.googleapis.com/v1beta/openai/'
-)
 
-agent = Agent(
-    model=Gemini(id="gemini-2.0-flash"),# gemini_model,
-    tools=[YFinanceTools(stock_price=True)],
+# debug_mode prints every step of a run, the latency store keeps per-stage timings for comparing runs
+agent = InstrumentedAgent(
+    name="Finance Agent",
+    model=get_model("gemini-native"),
+    tools=[CachedYFinanceTools(stock_price=True)],
     instructions="Use tables to display data. Don't include any other text.",
     markdown=True,
     # debug_mode=True,
     monitoring=True,
 )
 
-agent.print_response("What is the stock price of Apple??", stream=True)
\ No newline at end of file
+if __name__ == "__main__":
+    agent.print_response("What is the stock price of Apple??", stream=True)
+    print_dashboard(get_latency_store(), component=agent.name)
\ No newline at end of file
@@ -1,6 +1,5 @@
 import os
 from typing import List, Dict, Optional
-import akshare as ak
 import pandas as pd
 """
 1. 抓取三大会计报表
@@ -72,10 +71,13 @@ def fetch_financial_reports_akshare(code: str, market: str = None) -> Dict[str,
     输入: code（如'00020.HK'或'002594'），market可选（'hk'/'cn'）
     输出: {报表类型: DataFrame}
     """
+    # 只在真正抓取时才需要akshare，字段映射表等可以在没安装akshare的环境里直接导入
+    import akshare as ak
+    from fundamental.universe import HKEX, akshare_symbol, exchange_of
     result = {}
     # 港股
-    if code.endswith('.HK') or (market == 'hk'):
-        code_hk = code.replace('.HK', '')
+    if market == 'hk' or (market != 'cn' and exchange_of(code) == HKEX):
+        code_hk = akshare_symbol(code) if code.upper().endswith('.HK') else code
         try:
             income = ak.stock_financial_hk_report_em(stock=code_hk, symbol="利润表", indicator="报告期")
         except Exception as e:
@@ -94,12 +96,8 @@ def fetch_financial_reports_akshare(code: str, market: str = None) -> Dict[str,
         result = {"利润表": income, "资产负债表": balance, "现金流量表": cashflow}
     # A股
     else:
-        code_cn = code
-        if code_cn.isdigit() and len(code_cn) == 6:
-            if code_cn.startswith('6'):
-                code_cn = f"SH{code_cn}"
-            else:
-                code_cn = f"SZ{code_cn}"
+        # SH/SZ/BJ 前缀按股票池查交易所，科创板、北交所不再误判成深市
+        code_cn = akshare_symbol(code)
         try:
             income = ak.stock_profit_sheet_by_report_em(symbol=code_cn)
         except Exception as e:
@@ -208,6 +206,10 @@ def save_financial_reports(data: Dict[str, Optional[pd.DataFrame]],
 
 
 if __name__ == "__main__":
+    import sys
+
+    # 直接运行本文件时sys.path里没有项目根目录
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     save_field_mapping_csv()
     # 继续原有批量抓取逻辑
     codes = ["00020.HK", "002594", "600519"]
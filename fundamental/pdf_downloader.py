@@ -0,0 +1,266 @@
+"""
+公告PDF批量下载：从交易所公告表格（sse_crawler.py / szse_crawler.py 保存的 financial/{code}/*.csv）
+读取公告链接，下载到 reports/{code}/{公告日期}_{标题}.pdf
+
+- 有界并发：总并发和单个网站并发分别限制
+- 断点续传：先写 .part 文件，中断后用 HTTP Range 从已下载的位置继续
+- 按内容哈希去重：同一份文件挂在不同链接下只保存一次，清单记录在 reports/manifest.json，每完成一个文件就写一次
+- 流式写盘：边下载边写文件、边算哈希，不把整个文件读进内存
+
+    python fundamental/pdf_downloader.py --codes 600519 002594 --keyword 年度报告 --concurrency 8
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+import pandas as pd
+
+CHUNK_SIZE = 64 * 1024
+MANIFEST = "manifest.json"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+@dataclass
+class DownloadItem:
+    code: str
+    title: str
+    date: str
+    url: str
+
+    @property
+    def filename(self) -> str:
+        safe_title = re.sub(r'[<>:"/\\|?*\s]', '_', self.title)[:80] or hashlib.md5(self.url.encode()).hexdigest()[:12]
+        return f"{self.date}_{safe_title}.pdf" if self.date else f"{safe_title}.pdf"
+
+
+def _link_column(df: pd.DataFrame) -> Optional[str]:
+    # 上交所表格的链接列叫"公告链接"，深交所的链接列没有表头，按内容判断
+    if '公告链接' in df.columns:
+        return '公告链接'
+    for column in df.columns:
+        values = df[column].dropna().astype(str)
+        if len(values) and values.str.startswith('http').mean() > 0.5:
+            return column
+    return None
+
+
+def _find_column(df: pd.DataFrame, keywords: Iterable[str]) -> Optional[str]:
+    return next((c for c in df.columns if any(k in str(c) for k in keywords)), None)
+
+
+def collect_links(financial_dir: str = "financial", codes: Optional[Iterable[str]] = None, keyword: Optional[str] = None) -> List[DownloadItem]:
+    """
+    从公告表格中收集下载链接
+    :param financial_dir: 公告表格目录
+    :param codes: 只收集这些股票，默认全部
+    :param keyword: 只收集标题包含该文字的公告，如 "年度报告"
+    """
+    codes = set(codes) if codes else None
+    items: Dict[str, DownloadItem] = {}
+    for path in sorted(glob.glob(os.path.join(financial_dir, "*", "*.csv"))):
+        code = os.path.basename(os.path.dirname(path))
+        name = os.path.basename(path)
+        if (codes is not None and code not in codes) or not ("公告" in name or "信息披露" in name):
+            continue
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        link_col = _link_column(df)
+        if link_col is None:
+            continue
+        columns = list(df.columns)
+        # 链接列紧跟在标题列后面
+        title_col = _find_column(df, ["标题", "名称"]) or columns[max(0, columns.index(link_col) - 1)]
+        date_col = _find_column(df, ["时间", "日期"])
+        for _, row in df.iterrows():
+            url = row[link_col].strip()
+            if not url.startswith('http') or url in items:
+                continue
+            title = row[title_col].strip() if title_col != link_col else ""
+            if keyword and keyword not in title:
+                continue
+            date = row[date_col].strip()[:10] if date_col else ""
+            items[url] = DownloadItem(code, title, date, url)
+    return list(items.values())
+
+
+class Manifest:
+    """下载清单：链接 -> 文件和哈希，哈希 -> 文件，用于跳过已完成的链接和内容去重"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.urls: Dict[str, Dict[str, str]] = {}
+        self.hashes: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.urls, self.hashes = data.get("urls", {}), data.get("hashes", {})
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"urls": self.urls, "hashes": self.hashes}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PdfDownloader:
+    """
+    :param out_dir: 保存目录，文件在 {out_dir}/{code}/ 下
+    :param concurrency: 总并发下载数
+    :param per_host: 单个网站的并发下载数
+    :param retries: 每个文件的最多尝试次数，重试时从已下载的位置续传
+    :param timeout: 单次请求的超时（秒）
+    """
+
+    def __init__(self, out_dir: str = "reports", concurrency: int = 8, per_host: int = 4, retries: int = 3, timeout: float = 60):
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.timeout = timeout
+        os.makedirs(out_dir, exist_ok=True)
+        self.manifest = Manifest(os.path.join(out_dir, MANIFEST))
+        self.stats = {"downloaded": 0, "resumed": 0, "duplicates": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        self.errors: Dict[str, str] = {}
+
+    async def _fetch(self, client: httpx.AsyncClient, item: DownloadItem, part: str) -> str:
+        """下载到.part文件，返回内容的sha256；已有.part文件时从末尾续传"""
+        digest = hashlib.sha256()
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if offset:
+            # 续传前先把已有部分算进哈希
+            with open(part, "rb") as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(block)
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        async with client.stream("GET", item.url, headers=headers) as response:
+            if response.status_code == 416:
+                # 已经下载完整，服务器没有更多内容
+                return digest.hexdigest()
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "")
+            if "html" in content_type:
+                raise ValueError(f"not a PDF ({content_type})")
+            if offset and response.status_code == 206:
+                self.stats["resumed"] += 1
+                mode = "ab"
+            else:
+                # 服务器不支持Range，从头下载
+                digest, mode = hashlib.sha256(), "wb"
+            with open(part, mode) as f:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    self.stats["bytes"] += len(chunk)
+        return digest.hexdigest()
+
+    async def _download(self, client: httpx.AsyncClient, item: DownloadItem, limit: asyncio.Semaphore, host_limit: asyncio.Semaphore) -> None:
+        if item.url in self.manifest.urls and os.path.exists(self.manifest.urls[item.url]["path"]):
+            self.stats["skipped"] += 1
+            return
+        dest_dir = os.path.join(self.out_dir, item.code)
+        os.makedirs(dest_dir, exist_ok=True)
+        dest = os.path.join(dest_dir, item.filename)
+        # 同名公告可能同时在下载，临时文件名带上链接的哈希
+        part = f"{dest}.{hashlib.md5(item.url.encode()).hexdigest()[:8]}.part"
+
+        # 先占单个网站的名额再占总名额，否则某个网站的链接排队时会占满总名额，其他网站的下载都被饿死
+        async with host_limit, limit:
+            for attempt in range(1, self.retries + 1):
+                try:
+                    sha256 = await self._fetch(client, item, part)
+                    break
+                except (httpx.HTTPError, OSError) as e:
+                    if attempt == self.retries or (isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500):
+                        self.stats["failed"] += 1
+                        self.errors[item.url] = f"{type(e).__name__}: {str(e).split(chr(10))[0]}"
+                        return
+                    await asyncio.sleep(2 ** attempt * random.uniform(0.5, 1.5))
+                except ValueError as e:
+                    self.stats["failed"] += 1
+                    self.errors[item.url] = str(e)
+                    if os.path.exists(part):
+                        os.remove(part)
+                    return
+
+        existing = self.manifest.hashes.get(sha256)
+        if existing and os.path.exists(existing):
+            os.remove(part)
+            dest = existing
+            self.stats["duplicates"] += 1
+        elif os.path.exists(dest) and _sha256(dest) == sha256:
+            # 上次运行已经把文件放好，但还没来得及写清单就退出了
+            os.remove(part)
+            self.manifest.hashes[sha256] = dest
+            self.stats["duplicates"] += 1
+        else:
+            if os.path.exists(dest):
+                dest = f"{dest[:-4]}_{sha256[:8]}.pdf"
+            os.replace(part, dest)
+            self.manifest.hashes[sha256] = dest
+            self.stats["downloaded"] += 1
+        self.manifest.urls[item.url] = {"path": dest, "sha256": sha256, "code": item.code, "title": item.title, "date": item.date}
+        # 每个文件完成后立即写清单，进程被强制结束时已放好的文件不会重新下载
+        self.manifest.save()
+
+    async def adownload(self, items: Iterable[DownloadItem]) -> Dict[str, int]:
+        limit = asyncio.Semaphore(self.concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(headers=HEADERS, timeout=self.timeout, limits=limits, follow_redirects=True) as client:
+            tasks = []
+            for item in items:
+                host = urlparse(item.url).netloc
+                host_limit = host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+                tasks.append(self._download(client, item, limit, host_limit))
+            await asyncio.gather(*tasks)
+        return self.stats
+
+    def download(self, items: Iterable[DownloadItem]) -> Dict[str, int]:
+        return asyncio.run(self.adownload(items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download announcement PDFs listed in the crawled announcement tables")
+    parser.add_argument("--financial-dir", default="financial", help="公告表格目录")
+    parser.add_argument("--out-dir", default="reports")
+    parser.add_argument("--codes", nargs="*", default=None, help="只下载这些股票，默认全部")
+    parser.add_argument("--keyword", default=None, help="只下载标题包含该文字的公告，如 年度报告")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=4)
+    args = parser.parse_args()
+
+    items = collect_links(args.financial_dir, args.codes, args.keyword)
+    print(f"共 {len(items)} 个公告链接")
+    downloader = PdfDownloader(args.out_dir, concurrency=args.concurrency, per_host=args.per_host)
+    start = time.perf_counter()
+    stats = downloader.download(items)
+    elapsed = time.perf_counter() - start
+    print(f"下载 {stats['downloaded']}，续传 {stats['resumed']}，重复 {stats['duplicates']}，"
+          f"跳过 {stats['skipped']}，失败 {stats['failed']}，"
+          f"{stats['bytes'] / 1e6:.1f} MB / {elapsed:.1f}s = {stats['bytes'] / 1e6 / max(elapsed, 1e-9):.1f} MB/s")
+    for url, error in list(downloader.errors.items())[:10]:
+        print(f"  失败 {url}: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
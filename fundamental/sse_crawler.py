@@ -725,10 +725,13 @@ def crawl_sse_multiple(stock_codes, logger=None, max_tables=None, save_analysis=
     Returns:
         list: 每个股票的爬取结果列表
     """
+    from fundamental.universe import SSE, exchange_of
+
     results = []
     
     for stock_code in stock_codes:
-        if len(stock_code) != 6 or stock_code[0] != '6':
+        # 交易所按股票池路由，混合列表请用 fundamental.universe.crawl_by_exchange 分发
+        if exchange_of(stock_code) != SSE:
             continue
         result = crawl_sse(stock_code, logger, max_tables, save_analysis)
         results.append(result)
@@ -741,6 +744,10 @@ def crawl_sse_multiple(stock_codes, logger=None, max_tables=None, save_analysis=
 
 # 使用示例
 if __name__ == "__main__":
+    import sys
+
+    # 直接运行本文件时sys.path里没有项目根目录
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     # 单个股票爬取
     # result = crawl_sse('600519')
     # print(f"爬取结果: {result}")
@@ -818,11 +818,13 @@ def crawl_szse_multiple(stock_codes, logger=None, max_pages=5):
     Returns:
         list: 每个股票的爬取结果列表
     """
+    from fundamental.universe import SZSE, exchange_of
+
     results = []
     
     for stock_code in stock_codes:
-        # 深交所股票代码以0开头
-        if len(stock_code) != 6 or (stock_code[0] != '0' and stock_code[0] != '3'):
+        # 交易所按股票池路由，混合列表请用 fundamental.universe.crawl_by_exchange 分发
+        if exchange_of(stock_code) != SZSE:
             continue
         result = crawl_szse_multiple_pages_with_click(stock_code, logger, max_pages)
         results.append(result)
@@ -834,6 +836,10 @@ def crawl_szse_multiple(stock_codes, logger=None, max_pages=5):
 
 # 使用示例
 if __name__ == "__main__":
+    import sys
+
+    # 直接运行本文件时sys.path里没有项目根目录
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     # 单个股票多页爬取（推荐）
     # result = crawl_szse_multiple_pages_with_click('000001', max_pages=10)
     # print(f"多页爬取结果: {result}")
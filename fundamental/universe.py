@@ -0,0 +1,265 @@
+"""
+股票池和按交易所路由
+1. 一次性加载沪深京A股和港股的完整列表，缓存到 data/universe.csv，进程内只读一次
+2. 按代码O(1)查到交易所和板块，列表里没有的代码按代码前缀判断
+3. 混合代码列表按交易所分组，上交所、深交所、港股各自的抓取流程并行执行
+
+代码格式统一为：A股6位数字（600519、000001、688981、830799），港股5位数字加.HK（00020.HK）
+也接受 SH600519、600519.SH、0700.HK、700 之类的写法
+"""
+import importlib
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+SSE = "SSE"
+SZSE = "SZSE"
+BSE = "BSE"
+HKEX = "HKEX"
+
+UNIVERSE_FILE = "data/universe.csv"
+# 列表缓存的有效期（秒），新股上市不频繁，一天刷新一次足够
+UNIVERSE_TTL = 24 * 3600
+
+# akshare 代码前缀
+SYMBOL_PREFIX = {SSE: "SH", SZSE: "SZ", BSE: "BJ"}
+
+# 各交易所的抓取流程，"模块:函数"，签名为 (code, **kwargs)
+PIPELINES: Dict[str, str] = {
+    SSE: "fundamental.sse_crawler:crawl_sse",
+    SZSE: "fundamental.szse_crawler:crawl_szse_multiple_pages_with_click",
+    HKEX: "fundamental.financial_reports:fetch_financial_reports_akshare",
+}
+
+
+@dataclass(frozen=True)
+class Listing:
+    code: str
+    name: str
+    exchange: str
+    board: str
+
+
+def normalize_code(code: str) -> str:
+    """统一代码格式：A股6位数字，港股5位数字加.HK"""
+    code = code.strip().upper()
+    if code.endswith(".HK") or code.startswith("HK"):
+        return re.sub(r"\D", "", code).zfill(5) + ".HK"
+    code = re.sub(r"^(SH|SZ|BJ)|\.(SH|SZ|BJ|SS)$", "", code)
+    if code.isdigit() and len(code) < 6:
+        # 纯数字且不足6位的只可能是港股
+        return code.zfill(5) + ".HK"
+    return code
+
+
+def _board(code: str, exchange: str) -> str:
+    if exchange == HKEX:
+        return "主板"
+    if exchange == BSE:
+        return "北交所"
+    if code.startswith(("688", "689")):
+        return "科创板"
+    if code.startswith(("300", "301")):
+        return "创业板"
+    if code.startswith(("900", "200")):
+        return "B股"
+    return "主板"
+
+
+def exchange_by_prefix(code: str) -> Optional[str]:
+    """按代码规则判断交易所，用于列表里还没有的代码（新股、列表加载失败）"""
+    if code.endswith(".HK"):
+        return HKEX
+    if len(code) != 6 or not code.isdigit():
+        return None
+    if code.startswith("92") or code[0] in "48":
+        return BSE
+    if code[0] in "69":
+        return SSE
+    if code[0] in "023":
+        return SZSE
+    return None
+
+
+def _fetch_listings() -> List[Listing]:
+    """从akshare拉取沪深京A股和港股列表，某个交易所失败时跳过"""
+    import akshare as ak
+
+    loaders = [
+        (SSE, lambda: pd.concat([ak.stock_info_sh_name_code(symbol="主板A股"), ak.stock_info_sh_name_code(symbol="科创板")])),
+        (SZSE, lambda: ak.stock_info_sz_name_code(symbol="A股列表")),
+        (BSE, ak.stock_info_bj_name_code),
+        (HKEX, ak.stock_hk_spot_em),
+    ]
+    listings = []
+    for exchange, loader in loaders:
+        try:
+            df = loader()
+        except Exception as e:
+            print(f"{exchange}股票列表加载失败: {e}")
+            continue
+        code_col = next(c for c in df.columns if "代码" in str(c))
+        name_col = next(c for c in df.columns if "简称" in str(c) or "名称" in str(c))
+        for code, name in zip(df[code_col].astype(str), df[name_col].astype(str)):
+            code = normalize_code(code + ".HK" if exchange == HKEX else code.zfill(6))
+            listings.append(Listing(code, name, exchange, _board(code, exchange)))
+    return listings
+
+
+class Universe:
+    """
+    全市场股票池，代码 -> Listing 的字典
+    :param listings: 直接给定列表，不给时用 load() 从缓存文件或akshare加载
+    """
+
+    def __init__(self, listings: Iterable[Listing] = ()):
+        self._by_code: Dict[str, Listing] = {l.code: l for l in listings}
+
+    @classmethod
+    def load(cls, path: str = UNIVERSE_FILE, ttl: float = UNIVERSE_TTL, refresh: bool = False) -> "Universe":
+        """缓存文件未过期时直接读取，否则从akshare重新拉取并写回；拉取失败时退回旧的缓存文件"""
+        fresh = os.path.exists(path) and time.time() - os.path.getmtime(path) < ttl
+        if not refresh and fresh:
+            return cls.from_csv(path)
+        try:
+            listings = _fetch_listings()
+        except ImportError:
+            listings = []
+        if not listings:
+            return cls.from_csv(path) if os.path.exists(path) else cls()
+        universe = cls(listings)
+        universe.to_csv(path)
+        return universe
+
+    @classmethod
+    def from_csv(cls, path: str) -> "Universe":
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        return cls(Listing(*row) for row in df[["code", "name", "exchange", "board"]].itertuples(index=False))
+
+    def to_csv(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        df = pd.DataFrame(list(self._by_code.values()), columns=["code", "name", "exchange", "board"])
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def __contains__(self, code: str) -> bool:
+        return normalize_code(code) in self._by_code
+
+    def get(self, code: str) -> Optional[Listing]:
+        """查询单只股票，列表里没有但代码规则能判断交易所时也返回（名称为空）"""
+        code = normalize_code(code)
+        listing = self._by_code.get(code)
+        if listing is None:
+            exchange = exchange_by_prefix(code)
+            if exchange is not None:
+                listing = Listing(code, "", exchange, _board(code, exchange))
+        return listing
+
+    def exchange(self, code: str) -> Optional[str]:
+        listing = self.get(code)
+        return listing.exchange if listing else None
+
+    def codes(self, exchange: Optional[str] = None) -> List[str]:
+        return [c for c, l in self._by_code.items() if exchange is None or l.exchange == exchange]
+
+    def route(self, codes: Iterable[str]) -> Dict[Optional[str], List[str]]:
+        """按交易所分组，一次遍历；无法识别的代码放在 None 下"""
+        groups: Dict[Optional[str], List[str]] = {}
+        for code in codes:
+            code = normalize_code(code)
+            groups.setdefault(self.exchange(code), []).append(code)
+        return groups
+
+
+_UNIVERSE: Optional[Universe] = None
+_universe_lock = threading.Lock()
+
+
+def get_universe() -> Universe:
+    """进程内共享的股票池，第一次调用时加载"""
+    global _UNIVERSE
+    with _universe_lock:
+        if _UNIVERSE is None:
+            _UNIVERSE = Universe.load()
+    return _UNIVERSE
+
+
+def exchange_of(code: str) -> Optional[str]:
+    """
+    代码所属交易所：SSE / SZSE / BSE / HKEX，无法识别时为None
+    还没有缓存文件时直接按代码规则判断，不为了一次查询下载全市场列表（港股列表是整张行情表）
+    """
+    if _UNIVERSE is None and not os.path.exists(UNIVERSE_FILE):
+        return exchange_by_prefix(normalize_code(code))
+    return get_universe().exchange(code)
+
+
+def akshare_symbol(code: str) -> str:
+    """akshare A股报表接口的代码格式，如 SH600519、SZ000001、BJ830799；港股返回5位数字"""
+    code = normalize_code(code)
+    exchange = exchange_of(code)
+    if exchange == HKEX:
+        return code[:-3]
+    return SYMBOL_PREFIX.get(exchange, "") + code
+
+
+def _load(target: str) -> Callable[..., Any]:
+    module_name, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def crawl_by_exchange(
+    codes: Iterable[str],
+    pipelines: Optional[Dict[str, str]] = None,
+    delay: float = 2.0,
+    kwargs: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    混合代码列表按交易所分组后并行抓取：每个交易所一个线程，交易所内部按顺序抓取并间隔delay秒，
+    不会对同一个网站并发请求
+    :param codes: 股票代码，任意交易所混合
+    :param pipelines: 交易所 -> "模块:函数"，默认为 PIPELINES
+    :param delay: 同一交易所两次抓取之间的间隔（秒）
+    :param kwargs: 交易所 -> 抓取函数的额外参数
+    :return: 代码 -> 抓取结果；没有对应流程的代码结果为None，抓取异常时为异常对象
+    """
+    pipelines = pipelines or PIPELINES
+    kwargs = kwargs or {}
+    groups = get_universe().route(codes)
+    results: Dict[str, Any] = {code: None for group in groups.values() for code in group}
+
+    def run(exchange: str, group: List[str]) -> None:
+        func = _load(pipelines[exchange])
+        for i, code in enumerate(group):
+            if i:
+                time.sleep(delay)
+            try:
+                results[code] = func(code, **kwargs.get(exchange, {}))
+            except Exception as e:
+                results[code] = e
+
+    active = {exchange: group for exchange, group in groups.items() if exchange in pipelines}
+    skipped = [code for exchange, group in groups.items() if exchange not in pipelines for code in group]
+    if skipped:
+        print(f"没有对应抓取流程，跳过: {', '.join(skipped)}", file=sys.stderr)
+    with ThreadPoolExecutor(max_workers=max(1, len(active)), thread_name_prefix="exchange") as pool:
+        for future in [pool.submit(run, exchange, group) for exchange, group in active.items()]:
+            future.result()
+    return results
+
+
+if __name__ == "__main__":
+    universe = Universe.load(refresh="--refresh" in sys.argv)
+    for exchange in (SSE, SZSE, BSE, HKEX):
+        print(f"{exchange}: {len(universe.codes(exchange))}")
+    for code in ["600519", "688981", "000001", "300474", "830799", "00020.HK", "700"]:
+        print(code, universe.get(code), akshare_symbol(code))
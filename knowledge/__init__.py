@@ -0,0 +1,46 @@
+"""
+知识库模块
+定期报告PDF的章节切块和向量化入库，本地报表、公告、舆情的知识库
+
+子模块可以直接用 `python -m knowledge.xxx` 运行，所以在第一次访问对应名称时才导入
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .embedding import embed_batch
+    from .financial import FinancialLanceDb, FinancialReportKnowledge, build_where, financial_knowledge
+    from .report_pdf import REPORT_SECTIONS, Chunk, ReportTextPipeline, iter_chunks, iter_pages
+
+_LAZY = {
+    'Chunk': '.report_pdf',
+    'FinancialLanceDb': '.financial',
+    'FinancialReportKnowledge': '.financial',
+    'REPORT_SECTIONS': '.report_pdf',
+    'ReportTextPipeline': '.report_pdf',
+    'build_where': '.financial',
+    'embed_batch': '.embedding',
+    'financial_knowledge': '.financial',
+    'iter_chunks': '.report_pdf',
+    'iter_pages': '.report_pdf',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    'Chunk',
+    'FinancialLanceDb',
+    'FinancialReportKnowledge',
+    'REPORT_SECTIONS',
+    'ReportTextPipeline',
+    'build_where',
+    'embed_batch',
+    'financial_knowledge',
+    'iter_chunks',
+    'iter_pages',
+]
@@ -0,0 +1,53 @@
+from typing import Any, Dict, List, Optional
+
+from agno.embedder.base import Embedder
+from agno.utils.log import log_debug
+
+# 各提供商单次嵌入请求的最大条数
+BATCH_LIMITS = {
+    "GeminiEmbedder": 100,
+    "OpenAIEmbedder": 64,
+}
+
+
+def _kind(embedder: Embedder) -> Optional[str]:
+    # 按类名判断，不为了isinstance去导入各家SDK；OpenAIEmbedder的子类（DashScope等兼容接口）也走批量
+    names = {cls.__name__ for cls in type(embedder).__mro__}
+    return next((name for name in BATCH_LIMITS if name in names), None)
+
+
+def _gemini(embedder: Any, texts: List[str]) -> List[List[float]]:
+    model = embedder.id.split("/")[-1]
+    # 入库的是文档，查询时GeminiEmbedder默认的task_type是RETRIEVAL_QUERY
+    config: Dict[str, Any] = {"task_type": "RETRIEVAL_DOCUMENT"}
+    if embedder.dimensions:
+        config["output_dimensionality"] = embedder.dimensions
+    response = embedder.client.models.embed_content(model=model, contents=texts, config=config)
+    return [e.values for e in response.embeddings]
+
+
+def _openai(embedder: Any, texts: List[str]) -> List[List[float]]:
+    params: Dict[str, Any] = {"input": texts, "model": embedder.id, "encoding_format": "float"}
+    if embedder.id.startswith("text-embedding-3"):
+        params["dimensions"] = embedder.dimensions
+    if embedder.request_params:
+        params.update(embedder.request_params)
+    response = embedder.client.embeddings.create(**params)
+    return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+
+def embed_batch(embedder: Embedder, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+    """
+    批量嵌入：Gemini和OpenAI兼容接口一次请求嵌入一批文本，其他嵌入模型逐条调用get_embedding
+    :param batch_size: 每次请求的条数，默认取提供商上限；DashScope等接口上限更小时需要显式指定
+    """
+    kind = _kind(embedder)
+    if kind is None:
+        return [embedder.get_embedding(text) for text in texts]
+    call = _gemini if kind == "GeminiEmbedder" else _openai
+    size = batch_size or BATCH_LIMITS[kind]
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), size):
+        vectors.extend(call(embedder, texts[start:start + size]))
+    log_debug(f"Embedded {len(texts)} texts in {-(-len(texts) // size)} requests")
+    return vectors
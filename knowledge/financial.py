@@ -0,0 +1,502 @@
+"""
+本地数据知识库：把爬下来的三大会计报表、交易所公告和舆情转成带股票代码和日期标签的短文档，
+批量嵌入后写入LanceDB，检索时先按代码、日期等标量列裁剪，再在剩下的行里做向量检索
+
+- 报表：每只股票每张报表每个报告期一条文档，只保留核心字段，金额换算成亿/万
+- 公告：每只股票每个月一条文档，按日期列出公告标题
+- 舆情：每只股票每个来源每天一条文档，过长时拆成多条
+
+    python -m knowledge.financial load --codes 600519 002594
+    python -m knowledge.financial search "茅台毛利率变化" --code 600519 --since 2023
+    python -m knowledge.financial search "经营情况" --code 600519 --report-type 年报 --since 2023 --until 2023
+
+code/date 建BTREE索引、doc_type/report_type 建BITMAP索引，全市场入库后按股票和日期检索只扫描命中的行
+"""
+import argparse
+import json
+import math
+import re
+from hashlib import md5
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+from agno.document.base import Document
+from agno.knowledge.agent import AgentKnowledge
+from agno.utils.log import log_debug, log_info, logger
+from agno.vectordb.lancedb import LanceDb, SearchType
+from pydantic import Field
+
+from fundamental.universe import normalize_code
+from tools.local_ashare import STATEMENTS, LocalDataIndex
+
+from .embedding import embed_batch
+
+# 写成独立列、可以在向量检索之前过滤的元数据
+SCALAR_COLUMNS = ("code", "doc_type", "report_type", "date")
+# 检索时接受的过滤条件：标量列之外，since/until 是日期范围（含两端），可以只写年或年月
+FILTER_KEYS = SCALAR_COLUMNS + ("since", "until")
+# 标量列的索引类型：代码和日期取值多、要做范围比较，用BTREE；文档类型和报告类型只有几种取值，用BITMAP
+SCALAR_INDEXES = {"code": "BTREE", "date": "BTREE", "doc_type": "BITMAP", "report_type": "BITMAP"}
+
+STATEMENT = "statement"
+ANNOUNCEMENT = "announcement"
+SENTIMENT = "sentiment"
+# 定期报告PDF的正文块（knowledge.report_pdf）
+REPORT = "report"
+
+# 报告期月份 -> 报告类型，港股报表没有REPORT_TYPE列时按报告期推断
+REPORT_TYPE_BY_MONTH = {"03": "一季报", "06": "中报", "09": "三季报", "12": "年报"}
+REPORT_PERIOD_END = {"一季报": "03-31", "中报": "06-30", "三季报": "09-30", "年报": "12-31"}
+# 公告标题 -> 报告类型，按顺序匹配（"半年度报告"要先于"年度报告"）
+REPORT_TYPE_BY_TITLE = [("半年度报告", "中报"), ("第一季度报告", "一季报"), ("第三季度报告", "三季报"), ("年度报告", "年报")]
+# 单条舆情文档的最大字符数
+SENTIMENT_MAX_CHARS = 1500
+# 混合检索融合向量和全文两路结果时的RRF常数
+RRF_K = 60
+
+
+def format_amount(value: Any) -> str:
+    """金额换算成亿/万，保留两位小数"""
+    value = float(value)
+    if abs(value) >= 1e8:
+        return f"{value / 1e8:.2f}亿"
+    if abs(value) >= 1e4:
+        return f"{value / 1e4:.2f}万"
+    return f"{value:.2f}"
+
+
+def _is_number(value: Any) -> bool:
+    try:
+        return not math.isnan(float(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def _iso_date(value: Any) -> str:
+    return str(value).strip()[:10].replace("/", "-")
+
+
+def _find_column(df: pd.DataFrame, keywords: Tuple[str, ...]) -> Optional[str]:
+    return next((c for c in df.columns if any(k in str(c) for k in keywords)), None)
+
+
+def statement_documents(code: str, name: str, df: pd.DataFrame) -> List[Document]:
+    """一张报表 -> 每个报告期一条文档；港股的长表（STD_ITEM_NAME/AMOUNT）先透视成宽表"""
+    mapping = STATEMENTS[name]
+    if "STD_ITEM_NAME" in df.columns:
+        period = "REPORT_DATE" if "REPORT_DATE" in df.columns else "FISCAL_YEAR"
+        df = df.pivot_table(index=period, columns="STD_ITEM_NAME", values="AMOUNT", aggfunc="first").reset_index()
+        # 港股的净利润和归母净利润是同一项，只保留第一个
+        fields = list({h: cn for _, h, cn, _ in reversed(mapping) if h}.items())[::-1]
+    else:
+        fields = [(a, cn) for a, _, cn, _ in mapping if a]
+    date_col = "REPORT_DATE" if "REPORT_DATE" in df.columns else "FISCAL_YEAR"
+    if date_col not in df.columns:
+        return []
+
+    documents = []
+    for _, row in df.iterrows():
+        date = _iso_date(row[date_col])
+        if not re.match(r"\d{4}", date):
+            continue
+        report_type = row.get("REPORT_TYPE")
+        if not isinstance(report_type, str) or not report_type:
+            report_type = REPORT_TYPE_BY_MONTH.get(date[5:7], "")
+        parts = []
+        for column, label in fields:
+            value = row.get(column)
+            if not _is_number(value):
+                continue
+            text = f"{float(value):.2f}" if "EPS" in column or "每股" in column else format_amount(value)
+            yoy = row.get(f"{column}_YOY")
+            if _is_number(yoy):
+                text += f"(同比{float(yoy):+.1f}%)"
+            parts.append(f"{label} {text}")
+        if not parts:
+            continue
+        header = " ".join(p for p in (code, name, date, report_type) if p)
+        documents.append(Document(
+            content=f"[{header}] " + "；".join(parts),
+            name=f"{code}_{name}_{date}",
+            meta_data={"code": code, "doc_type": STATEMENT, "report_type": report_type, "date": date, "statement": name},
+        ))
+    return documents
+
+
+def announcement_report_type(title: str) -> str:
+    return next((t for keyword, t in REPORT_TYPE_BY_TITLE if keyword in title), "")
+
+
+def report_period(title: str) -> Tuple[str, str]:
+    """定期报告标题 -> (报告类型, 报告期末日期)，如 "2023年年度报告" -> ("年报", "2023-12-31")；不是定期报告时为空"""
+    report_type = announcement_report_type(title)
+    year = re.search(r"(\d{4})\s*年", title)
+    if not report_type or year is None:
+        return report_type, ""
+    return report_type, f"{year.group(1)}-{REPORT_PERIOD_END[report_type]}"
+
+
+def announcement_documents(code: str, df: pd.DataFrame) -> List[Document]:
+    """公告表 -> 每个月一条文档，标题按日期排列；月内有定期报告时标上报告类型"""
+    title_col = _find_column(df, ("标题", "名称"))
+    date_col = _find_column(df, ("时间", "日期"))
+    if title_col is None or date_col is None:
+        return []
+    rows = pd.DataFrame({"date": df[date_col].map(_iso_date), "title": df[title_col].astype(str).str.strip()})
+    rows = rows[rows["date"].str.match(r"\d{4}-\d{2}") & (rows["title"] != "")].drop_duplicates()
+
+    documents = []
+    for month, group in rows.sort_values("date").groupby(rows["date"].str[:7]):
+        lines = [f"{d} {t}" for d, t in zip(group["date"], group["title"])]
+        report_type = next((t for t in map(announcement_report_type, group["title"]) if t), "")
+        documents.append(Document(
+            content=f"[{code} 公告 {month}]\n" + "\n".join(lines),
+            name=f"{code}_公告_{month}",
+            # 日期取当月最后一条公告，按日期范围检索时不会漏掉月末的公告
+            meta_data={"code": code, "doc_type": ANNOUNCEMENT, "report_type": report_type, "date": group["date"].iloc[-1]},
+        ))
+    return documents
+
+
+def sentiment_documents(code: str, df: pd.DataFrame, max_chars: int = SENTIMENT_MAX_CHARS) -> List[Document]:
+    """舆情表 -> 每个来源每天一条文档，按阅读量排序，超过max_chars拆成多条"""
+    if "parsed_time" not in df.columns or "title" not in df.columns:
+        return []
+    df = df.dropna(subset=["parsed_time", "title"]).copy()
+    df["date"] = df["parsed_time"].map(_iso_date)
+    df["source"] = df["source"].fillna("") if "source" in df.columns else ""
+    if "read_count" in df.columns:
+        df = df.sort_values("read_count", ascending=False)
+
+    documents = []
+    for (source, date), group in df.groupby(["source", "date"]):
+        header = f"[{code} {source or '舆情'} {date}]"
+        chunks, lines, size = [], [], len(header)
+        for _, row in group.iterrows():
+            stats = " ".join(
+                f"{label}{int(row[col])}" for col, label in (("read_count", "阅读"), ("reply_count", "评论")) if col in row and _is_number(row[col])
+            )
+            line = f"{str(row['title']).strip()}" + (f"（{stats}）" if stats else "")
+            if lines and size + len(line) + 1 > max_chars:
+                chunks.append(lines)
+                lines, size = [], len(header)
+            lines.append(line)
+            size += len(line) + 1
+        if lines:
+            chunks.append(lines)
+        for i, chunk in enumerate(chunks):
+            documents.append(Document(
+                content=header + "\n" + "\n".join(chunk),
+                name=f"{code}_{source}_{date}_{i}",
+                meta_data={"code": code, "doc_type": SENTIMENT, "report_type": "", "date": date, "source": source},
+            ))
+    return documents
+
+
+def _quote(value: Any) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _pad_until(value: str) -> str:
+    # until 只写年或年月时包含整年/整月
+    return value + {4: "-12-31", 7: "-31"}.get(len(value), "")
+
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    过滤条件 -> (LanceDB where子句, 不能下推的其余条件)
+    code/doc_type/report_type/date 可以是单个值或列表，since/until 是日期范围
+    """
+    clauses, rest = [], {}
+    for key, value in (filters or {}).items():
+        if key == "since":
+            clauses.append(f"date >= {_quote(value)}")
+        elif key == "until":
+            clauses.append(f"date <= {_quote(_pad_until(str(value)))}")
+        elif key in SCALAR_COLUMNS:
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            if key == "code":
+                values = [normalize_code(str(v)) for v in values]
+            if len(values) == 1:
+                clauses.append(f"{key} = {_quote(values[0])}")
+            else:
+                clauses.append(f"{key} IN ({', '.join(map(_quote, values))})")
+        else:
+            rest[key] = value
+    return (" AND ".join(clauses) or None), rest
+
+
+class FinancialLanceDb(LanceDb):
+    """
+    LanceDb加上 code/doc_type/report_type/date 四个标量列
+    - insert：一批文档先查出已存在的id，再一次批量嵌入、一次写入
+    - search：能下推的过滤条件作为where子句在向量检索之前执行（prefilter），
+      不会出现agno默认实现里先取limit条再过滤、结果变少甚至为空的情况；
+      标量列建了索引（optimize/create_scalar_indexes）后过滤不再逐行扫描
+    - 混合检索带过滤条件时，向量和全文两路各自prefilter后按RRF融合：LanceDB的hybrid查询带where时同样会丢掉命中的行
+    - 全文索引默认用LanceDB原生FTS（use_tantivy=False），tantivy索引不支持prefilter，也是先取limit条再过滤
+    """
+
+    embed_batch_size: Optional[int] = None
+
+    def __init__(self, *args, use_tantivy: bool = False, **kwargs):
+        super().__init__(*args, use_tantivy=use_tantivy, **kwargs)
+
+    def create_scalar_indexes(self, replace: bool = False) -> List[str]:
+        """给标量列建索引（见 SCALAR_INDEXES），已有索引的列跳过，返回新建索引的列"""
+        if self.table is None:
+            return []
+        indexed = {column for index in self.table.list_indices() for column in index.columns}
+        created = []
+        for column, index_type in SCALAR_INDEXES.items():
+            if replace or column not in indexed:
+                self.table.create_scalar_index(column, index_type=index_type, replace=True)
+                created.append(column)
+        if created:
+            log_debug(f"Created scalar indexes on {created}")
+        return created
+
+    def optimize(self) -> None:
+        """补建缺失的标量索引，并把索引建好之后新写入的行合并进索引（否则这部分行过滤时要逐行扫描）"""
+        if self.table is None or self.table.count_rows() == 0:
+            return
+        if not self.create_scalar_indexes():
+            self.table.optimize()
+
+    def _base_schema(self):
+        import pyarrow as pa
+
+        schema = super()._base_schema()
+        for column in SCALAR_COLUMNS:
+            schema = schema.append(pa.field(column, pa.string()))
+        return schema
+
+    def _existing_ids(self, ids: List[str]) -> Set[str]:
+        if self.table is None or not ids:
+            return set()
+        try:
+            where = f"{self._id} IN ({', '.join(map(_quote, ids))})"
+            result = self.table.search().where(where).select([self._id]).limit(len(ids)).to_arrow()
+            return set(result[self._id].to_pylist())
+        except Exception:
+            return set()
+
+    def insert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        if self.table is None:
+            logger.error("Table not initialized. Please create the table first")
+            return
+        rows: Dict[str, Document] = {}
+        for document in documents:
+            if filters:
+                document.meta_data = {**(document.meta_data or {}), **filters}
+            document.content = document.content.replace("\x00", "\ufffd")
+            rows.setdefault(md5(document.content.encode()).hexdigest(), document)
+        existing = self._existing_ids(list(rows))
+        new = {doc_id: doc for doc_id, doc in rows.items() if doc_id not in existing}
+        if not new:
+            log_debug(f"All {len(rows)} documents already exist")
+            return
+
+        vectors = embed_batch(self.embedder, [doc.content for doc in new.values()], self.embed_batch_size)
+        data = []
+        for (doc_id, document), vector in zip(new.items(), vectors):
+            meta = document.meta_data or {}
+            payload = {"name": document.name, "meta_data": meta, "content": document.content, "usage": document.usage}
+            data.append({
+                self._id: doc_id,
+                self._vector_col: vector,
+                "payload": json.dumps(payload, ensure_ascii=False),
+                **{column: str(meta.get(column) or "") for column in SCALAR_COLUMNS},
+            })
+        if self.on_bad_vectors is not None:
+            self.table.add(data, on_bad_vectors=self.on_bad_vectors, fill_value=self.fill_value)
+        else:
+            self.table.add(data)
+        log_debug(f"Inserted {len(data)} documents, skipped {len(rows) - len(data)} existing")
+
+    def search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        where, rest = build_where(filters)
+        if where is None:
+            return super().search(query, limit, filters)
+        if self.connection:
+            self.table = self.connection.open_table(name=self.table_name)
+        if self.table is None:
+            logger.error("Table not initialized. Please create the table first")
+            return []
+
+        frames = []
+        if self.search_type in (SearchType.keyword, SearchType.hybrid):
+            if not self.fts_index_exists:
+                self.table.create_fts_index("payload", use_tantivy=self.use_tantivy, replace=True)
+                self.fts_index_exists = True
+            frames.append(self.table.search(query, query_type="fts").where(where, prefilter=True).limit(limit).to_pandas())
+        if self.search_type in (SearchType.vector, SearchType.hybrid):
+            builder = self.table.search(self.embedder.get_embedding(query), vector_column_name=self._vector_col)
+            if filters and filters.get("code"):
+                # 限定了股票时过滤后只剩几十上百行，直接精确计算距离；走IVF索引只会在nprobes个分区里找，命中的行可能不在其中
+                builder = builder.bypass_vector_index()
+            elif self.nprobes:
+                builder = builder.nprobes(self.nprobes)
+            frames.append(builder.where(where, prefilter=True).limit(limit).to_pandas())
+        results = self._build_search_results(self._fuse(frames, limit))
+
+        # 其余的条件只能按meta_data逐条比较
+        results = [doc for doc in results if all((doc.meta_data or {}).get(k) == v for k, v in rest.items())]
+        if self.reranker and results:
+            results = self.reranker.rerank(query=query, documents=results)
+        log_info(f"Found {len(results)} documents ({where})")
+        return results
+
+
+    def _fuse(self, frames: List[pd.DataFrame], limit: int) -> pd.DataFrame:
+        """多路检索结果按 reciprocal rank fusion 合并：每路的第r名得 1/(RRF_K+r)，同一行的得分相加"""
+        if len(frames) == 1:
+            return frames[0]
+        scores: Dict[str, float] = {}
+        rows: Dict[str, pd.Series] = {}
+        for frame in frames:
+            for rank, (_, row) in enumerate(frame.iterrows(), start=1):
+                doc_id = row[self._id]
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (RRF_K + rank)
+                rows.setdefault(doc_id, row)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return pd.DataFrame([rows[doc_id] for doc_id in ranked])
+
+
+class FinancialReportKnowledge(AgentKnowledge):
+    """
+    本地爬取数据的知识库，数据来源与 LocalAShareTools 相同（见 tools.local_ashare.LocalDataIndex）
+    Args:
+        index: 本地数据索引，默认扫描当前目录下的data/financial/logs
+        codes: 只加载这些股票，默认全部
+        batch_size: 每次嵌入和写入的文档数
+    """
+
+    index: Optional[LocalDataIndex] = None
+    codes: Optional[List[str]] = None
+    batch_size: int = 64
+    # 不加载也能用这些键做过滤（包括agentic filters）
+    valid_metadata_filters: Set[str] = Field(default_factory=lambda: set(FILTER_KEYS))
+
+    def _index(self) -> LocalDataIndex:
+        if self.index is None:
+            self.index = LocalDataIndex()
+        return self.index
+
+    def code_documents(self, code: str) -> List[Document]:
+        index = self._index()
+        tag = normalize_code(code)
+        documents: List[Document] = []
+        for name, path in sorted(index.statements.get(code, {}).items()):
+            if name in STATEMENTS:
+                documents.extend(statement_documents(tag, name, index.load(path)))
+        for path in index.announcements.get(code, []):
+            documents.extend(announcement_documents(tag, pd.read_csv(path, dtype=str, keep_default_na=False)))
+        for path in index.sentiment.get(code, []):
+            documents.extend(sentiment_documents(tag, index.load(path)))
+        return documents
+
+    @property
+    def document_lists(self) -> Iterator[List[Document]]:
+        """每只股票一批文档"""
+        index = self._index()
+        index.refresh()
+        wanted = {normalize_code(c) for c in self.codes} if self.codes else None
+        for code in index.codes():
+            if wanted is None or normalize_code(code) in wanted:
+                documents = self.code_documents(code)
+                if documents:
+                    yield documents
+
+    def load(self, recreate: bool = False, upsert: bool = False, skip_existing: bool = True) -> None:
+        """按批写入；FinancialLanceDb.insert本身会跳过已存在的文档，内容没变的报告期不会重新嵌入"""
+        if self.vector_db is None:
+            logger.warning("No vector db provided")
+            return
+        if recreate:
+            self.vector_db.drop()
+        if not self.vector_db.exists():
+            self.vector_db.create()
+        total = 0
+        for documents in self.document_lists:
+            for doc in documents:
+                self._track_metadata_structure(doc.meta_data)
+            for start in range(0, len(documents), self.batch_size):
+                self.vector_db.insert(documents[start:start + self.batch_size])
+            total += len(documents)
+        self.vector_db.optimize()
+        log_info(f"Loaded {total} documents into the financial knowledge base")
+
+    def scoped_search(
+        self,
+        query: str,
+        code: Optional[Any] = None,
+        report_type: Optional[Any] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        doc_type: Optional[Any] = None,
+        num_documents: Optional[int] = None,
+    ) -> List[Document]:
+        """
+        限定股票、报告类型和日期范围的检索，条件在向量检索之前作为标量索引过滤执行
+        例如 600519 2023年年报的管理层讨论：scoped_search("经营情况", code="600519", report_type="年报", since="2023", until="2023")
+        :param code: 股票代码或代码列表
+        :param report_type: 年报/中报/一季报/三季报，或其列表
+        :param since: 起始日期（含），可以只写年或年月
+        :param until: 截止日期（含），可以只写年或年月
+        :param doc_type: statement/announcement/sentiment/report，或其列表
+        """
+        filters = {"code": code, "report_type": report_type, "since": since, "until": until, "doc_type": doc_type}
+        return self.search(query, num_documents, {k: v for k, v in filters.items() if v})
+
+
+def financial_knowledge(uri: str = "tmp/lancedb", table_name: str = "financial_reports", embedder: Any = None, **kwargs) -> FinancialReportKnowledge:
+    """默认配置：与level_2_agent共用tmp/lancedb，Gemini嵌入，混合检索"""
+    if embedder is None:
+        from agno.embedder.google import GeminiEmbedder
+
+        embedder = GeminiEmbedder()
+    vector_db = FinancialLanceDb(uri=uri, table_name=table_name, search_type=SearchType.hybrid, embedder=embedder)
+    return FinancialReportKnowledge(vector_db=vector_db, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load local statements, announcements and sentiment into LanceDB and search them")
+    parser.add_argument("--uri", default="tmp/lancedb")
+    parser.add_argument("--table", default="financial_reports")
+    parser.add_argument("--hash-embedder", action="store_true", help="用本地哈希向量代替Gemini，离线测试用")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load")
+    load.add_argument("--codes", nargs="*", default=None)
+    load.add_argument("--recreate", action="store_true")
+    sub.add_parser("index", help="给已有的表补建标量索引")
+    search = sub.add_parser("search")
+    search.add_argument("query")
+    search.add_argument("--code", nargs="*", default=None)
+    search.add_argument("--doc-type", choices=[STATEMENT, ANNOUNCEMENT, SENTIMENT, REPORT], default=None)
+    search.add_argument("--report-type", choices=list(REPORT_PERIOD_END), default=None)
+    search.add_argument("--since", default=None)
+    search.add_argument("--until", default=None)
+    search.add_argument("-n", type=int, default=5)
+    args = parser.parse_args()
+
+    embedder = None
+    if args.hash_embedder:
+        from memories.retrieval import HashEmbedder
+
+        embedder = HashEmbedder()
+    if args.command == "load":
+        knowledge = financial_knowledge(args.uri, args.table, embedder, codes=args.codes)
+        knowledge.load(recreate=args.recreate)
+        print(f"{knowledge.vector_db.get_count()} documents in {args.table}")
+    elif args.command == "index":
+        vector_db = financial_knowledge(args.uri, args.table, embedder).vector_db
+        print(f"indexed: {vector_db.create_scalar_indexes(replace=True)}")
+    else:
+        knowledge = financial_knowledge(args.uri, args.table, embedder)
+        for doc in knowledge.scoped_search(args.query, args.code, args.report_type, args.since, args.until, args.doc_type, args.n):
+            print(doc.content[:300], "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+定期报告PDF -> 按章节切分的文本块 -> LanceDB知识库
+
+- 多进程：每个PDF在进程池里逐页提取文本、边提取边切块边写缓存，单个进程只持有当前页和当前块
+- 按章节切块："第三节 管理层讨论与分析"、"第十节 财务报告"等一级标题和"一、""二、"二级标题处断开，
+  每块带上股票代码、报告名、章节、页码
+- 缓存：按文件sha256和切块参数保存在 tmp/report_text/{sha256}_{参数哈希}.jsonl，文件和参数都没变的PDF不再提取；
+  已写入某张向量表的缓存记录在 loaded.json，重复运行不会再次嵌入；换了 --max-chars 或 --all-sections 时重新提取和嵌入
+- PDF文件来自 fundamental/pdf_downloader.py，路径为 reports/{code}/{公告日期}_{标题}.pdf
+
+    python -m knowledge.report_pdf reports --workers 4                          # 写入 level_2_agent 的知识库
+    python -m knowledge.report_pdf reports --target knowledge.financial:financial_knowledge  # 写入可按代码/报告期过滤的财报知识库
+    python -m knowledge.report_pdf reports/600519 --all-sections --no-load      # 只提取，不嵌入
+"""
+import argparse
+import glob
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CACHE_DIR = "tmp/report_text"
+LOADED = "loaded.json"
+# 分析师关心的章节：管理层讨论与分析（部分年份叫经营情况讨论与分析）和财务报告（含报表附注）
+REPORT_SECTIONS = ("管理层讨论与分析", "经营情况讨论与分析", "财务报告")
+
+_NUM = "一二三四五六七八九十"
+SECTION_RE = re.compile(rf"^第[{_NUM}]+[节章]\s*(\S.{{0,30}})$")
+SUBSECTION_RE = re.compile(rf"^[{_NUM}]+、\s*(\S.{{0,40}})$")
+# 目录行（"第三节 管理层讨论与分析 ........ 10"）、页码行（"10 / 200"）
+TOC_RE = re.compile(r"(\.{3,}|…{2,}|·{3,})\s*\d+$")
+PAGE_NUMBER_RE = re.compile(r"^-?\s*\d+\s*(/\s*\d+)?\s*-?$")
+
+
+@dataclass
+class Chunk:
+    text: str
+    section: str
+    subsection: str
+    page_start: int
+    page_end: int
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_name(sha256: str, max_chars: int, sections: Optional[Sequence[str]]) -> str:
+    """缓存文件名（不含扩展名）：文件哈希加切块参数的哈希，同一个PDF用不同参数切出的块分开缓存"""
+    params = json.dumps([max_chars, list(sections) if sections is not None else None], ensure_ascii=False)
+    return f"{sha256}_{hashlib.md5(params.encode()).hexdigest()[:8]}"
+
+
+def report_meta(path: str) -> Dict[str, str]:
+    """从 reports/{code}/{公告日期}_{标题}.pdf 解析股票代码、日期和报告名"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    date, _, title = stem.partition("_")
+    if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", date):
+        date, title = "", stem
+    return {"code": os.path.basename(os.path.dirname(os.path.abspath(path))), "date": date, "title": title}
+
+
+def iter_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """逐页提取文本，页码从1开始"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ImportError("`pypdf` not installed. Please install it via `pip install pypdf`.")
+
+    # 传文件对象而不是路径，pypdf按需seek读取，不会先把整个文件读进内存
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        for i, page in enumerate(reader.pages, start=1):
+            try:
+                yield i, page.extract_text() or ""
+            except Exception:
+                # 个别页面的字体或内容流损坏，跳过这一页
+                yield i, ""
+
+
+def iter_chunks(pages: Iterable[Tuple[int, str]], max_chars: int = 1200, sections: Optional[Sequence[str]] = REPORT_SECTIONS) -> Iterator[Chunk]:
+    """
+    把逐页文本切成块：章节或二级标题变化时断开，块长度不超过max_chars（单个超长段落除外）
+    :param sections: 只保留标题包含这些文字的章节，None为全部保留
+    """
+    section, subsection = "", ""
+    lines: List[str] = []
+    size, page_start, page_end = 0, 0, 0
+    # 只有标题还没有正文时不断开，"第三节"后面紧跟的"一、"并进同一块
+    has_body = False
+
+    def keep() -> bool:
+        return sections is None or any(s in section for s in sections)
+
+    def flush() -> Optional[Chunk]:
+        nonlocal lines, size, has_body
+        chunk = Chunk("\n".join(lines), section, subsection, page_start, page_end) if has_body and keep() else None
+        lines, size, has_body = [], 0, False
+        return chunk
+
+    for page_no, text in pages:
+        for raw in text.splitlines():
+            line = raw.strip()
+            if not line or PAGE_NUMBER_RE.match(line) or TOC_RE.search(line):
+                continue
+            heading = SECTION_RE.match(line)
+            sub = None if heading else SUBSECTION_RE.match(line)
+            if has_body and (heading or sub or size + len(line) > max_chars):
+                chunk = flush()
+                if chunk:
+                    yield chunk
+            if heading:
+                if section and not has_body:
+                    # 上一节只有标题，直接丢弃
+                    lines, size = [], 0
+                section, subsection = heading.group(1).strip(), ""
+            elif sub:
+                subsection = sub.group(1).strip()
+            else:
+                has_body = True
+            if not lines:
+                page_start = page_no
+            lines.append(line)
+            size += len(line) + 1
+            page_end = page_no
+    chunk = flush()
+    if chunk:
+        yield chunk
+
+
+def extract_to_cache(path: str, sha256: str, cache_dir: str = CACHE_DIR, max_chars: int = 1200, sections: Optional[Sequence[str]] = REPORT_SECTIONS) -> Tuple[str, int, int]:
+    """
+    在子进程里运行：提取一个PDF并把块逐行写入 {cache_dir}/{cache_name}.jsonl，返回 (路径, 页数, 块数)
+    先写临时文件再改名，中途失败不会留下不完整的缓存
+    """
+    meta = report_meta(path)
+    out = os.path.join(cache_dir, f"{cache_name(sha256, max_chars, sections)}.jsonl")
+    tmp = f"{out}.{os.getpid()}.tmp"
+    pages = chunks = 0
+
+    def counted():
+        nonlocal pages
+        for page in iter_pages(path):
+            pages += 1
+            yield page
+
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            for chunk in iter_chunks(counted(), max_chars=max_chars, sections=sections):
+                f.write(json.dumps(dict(meta, sha256=sha256, chunk=chunks, **asdict(chunk)), ensure_ascii=False) + "\n")
+                chunks += 1
+        os.replace(tmp, out)
+    finally:
+        # 提取失败时删掉写了一半的临时文件；成功时已经改名，这里什么也不做
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path, pages, chunks
+
+
+def read_cache(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+class ReportTextPipeline:
+    """
+    :param cache_dir: 文本块缓存目录
+    :param workers: 提取PDF的进程数
+    :param max_chars: 每块最多字符数
+    :param sections: 只保留这些章节，None为全部
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, workers: Optional[int] = None, max_chars: int = 1200, sections: Optional[Sequence[str]] = REPORT_SECTIONS):
+        self.cache_dir = cache_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_chars = max_chars
+        self.sections = tuple(sections) if sections is not None else None
+        os.makedirs(cache_dir, exist_ok=True)
+        self.stats = {"files": 0, "cached": 0, "extracted": 0, "failed": 0, "pages": 0, "chunks": 0, "loaded_chunks": 0}
+
+    def cache_key(self, sha256: str) -> str:
+        return cache_name(sha256, self.max_chars, self.sections)
+
+    def cache_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.cache_key(sha256)}.jsonl")
+
+    def extract(self, pdf_paths: Iterable[str]) -> Dict[str, str]:
+        """提取所有PDF，文件内容没变的直接用缓存，返回 PDF路径 -> sha256"""
+        hashes = {path: file_hash(path) for path in pdf_paths}
+        self.stats["files"] += len(hashes)
+        # 内容相同的文件只提取一次
+        todo = {sha: path for path, sha in hashes.items() if not os.path.exists(self.cache_path(sha))}
+        self.stats["cached"] += len(hashes) - len(todo)
+        if todo:
+            # spawn：不把主进程里的lancedb运行时和模型客户端fork进子进程
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(todo)), mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {
+                    pool.submit(extract_to_cache, path, sha, self.cache_dir, self.max_chars, self.sections): path
+                    for sha, path in todo.items()
+                }
+                for future in as_completed(futures):
+                    try:
+                        _, pages, chunks = future.result()
+                    except Exception as e:
+                        self.stats["failed"] += 1
+                        print(f"提取失败 {futures[future]}: {e}")
+                        failed = hashes[futures[future]]
+                        hashes = {path: sha for path, sha in hashes.items() if sha != failed}
+                        continue
+                    self.stats["extracted"] += 1
+                    self.stats["pages"] += pages
+                    self.stats["chunks"] += chunks
+        return hashes
+
+    def documents(self, sha256: str) -> Iterator[Any]:
+        from agno.document.base import Document
+
+        from fundamental.universe import normalize_code
+
+        from .financial import REPORT, report_period
+
+        for row in read_cache(self.cache_path(sha256)):
+            where = "/".join(p for p in (row["section"], row["subsection"]) if p)
+            header = " ".join(p for p in (row["code"], row["title"], where, f"p{row['page_start']}") if p)
+            meta = {k: row[k] for k in ("title", "section", "subsection", "page_start", "page_end", "sha256", "chunk")}
+            # 与 knowledge.financial 的标量列一致：date 是报告期末，和报表文档按同一个日期范围过滤；公告日期另存
+            report_type, period = report_period(row["title"])
+            meta.update(code=normalize_code(row["code"]), doc_type=REPORT, report_type=report_type, date=period or row["date"], published=row["date"])
+            yield Document(
+                # 块开头带上公司、报告和章节，检索时不依赖上下文也能判断出处
+                content=f"[{header}]\n{row['text']}",
+                name=f"{row['code']}_{row['title']}",
+                meta_data=meta,
+            )
+
+    def _loaded(self) -> Dict[str, List[str]]:
+        path = os.path.join(self.cache_dir, LOADED)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _mark_loaded(self, table: str, key: str) -> None:
+        loaded = self._loaded()
+        loaded.setdefault(table, []).append(key)
+        path = os.path.join(self.cache_dir, LOADED)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(loaded, f)
+        os.replace(path + ".tmp", path)
+
+    def load(self, vector_db: Any, hashes: Iterable[str], batch_size: int = 64) -> None:
+        """把缓存的文本块分批写入向量库，同一文件用同样参数切出的块已经写入过这张表时跳过"""
+        table = f"{type(vector_db).__name__}:{getattr(vector_db, 'uri', '')}:{getattr(vector_db, 'table_name', '')}"
+        done = set(self._loaded().get(table, []))
+        if not vector_db.exists():
+            vector_db.create()
+        for sha256 in hashes:
+            key = self.cache_key(sha256)
+            if key in done:
+                continue
+            batch = []
+            for document in self.documents(sha256):
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    vector_db.insert(batch)
+                    self.stats["loaded_chunks"] += len(batch)
+                    batch = []
+            if batch:
+                vector_db.insert(batch)
+                self.stats["loaded_chunks"] += len(batch)
+            self._mark_loaded(table, key)
+            done.add(key)
+        # FinancialLanceDb在这里补建标量索引
+        vector_db.optimize()
+
+    def run(self, pdf_paths: Iterable[str], vector_db: Any = None) -> Dict[str, int]:
+        hashes = self.extract(pdf_paths)
+        if vector_db is not None:
+            self.load(vector_db, dict.fromkeys(hashes.values()))
+        return self.stats
+
+
+def find_pdfs(paths: Iterable[str]) -> List[str]:
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True)))
+        elif path.lower().endswith(".pdf"):
+            found.append(path)
+    return found
+
+
+def _load_target(target: str) -> Any:
+    """ "模块:属性"，属性可以是知识库（取其vector_db）、向量库本身，或返回二者之一的无参函数"""
+    module_name, _, attr = target.partition(":")
+    value = getattr(importlib.import_module(module_name), attr or "knowledge")
+    if callable(value) and not hasattr(value, "search"):
+        value = value()
+    return getattr(value, "vector_db", None) or value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract periodic report PDFs into section-aware chunks and load them into LanceDB")
+    parser.add_argument("paths", nargs="*", default=["reports"], help="PDF文件或目录，默认 reports")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认CPU核数")
+    parser.add_argument("--max-chars", type=int, default=1200)
+    parser.add_argument("--all-sections", action="store_true", help="保留全部章节，默认只保留管理层讨论与分析和财务报告")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--target", default="level_2_agent:knowledge", help="写入的知识库或向量库，格式为 模块:属性")
+    parser.add_argument("--no-load", action="store_true", help="只提取和缓存，不写入向量库")
+    args = parser.parse_args()
+
+    pipeline = ReportTextPipeline(args.cache_dir, args.workers, args.max_chars, None if args.all_sections else REPORT_SECTIONS)
+    start = time.perf_counter()
+    stats = pipeline.run(find_pdfs(args.paths), None if args.no_load else _load_target(args.target))
+    elapsed = time.perf_counter() - start
+    print(f"{stats['files']} 个文件（缓存命中 {stats['cached']}，提取 {stats['extracted']}，失败 {stats['failed']}），"
+          f"{stats['pages']} 页 -> {stats['chunks']} 块，写入向量库 {stats['loaded_chunks']} 块，用时 {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,11 @@
 from agno.agent import Agent
-from agno.models.anthropic import Claude
-from agno.models.openai import OpenAILike
-from agno.tools.yfinance import YFinanceTools
 
 
-from agno.models.google import Gemini
+from models import get_model
+from tools import CachedYFinanceTools
 agent = Agent(
-    model=Gemini(id="gemini-2.0-flash"),
-    tools=[YFinanceTools(stock_price=True)],
+    model=get_model("gemini-native"),
+    tools=[CachedYFinanceTools(stock_price=True)],
     instructions="Use tables to display data. Don't include any other text.",
     markdown=True,
     debug_mode=True,
@@ -18,4 +16,5 @@ agent = Agent(
 #     instructions="Use tables to display data. Don't include any other text.",
 #     markdown=True,
 # )
-agent.print_response("What is the stock price of Apple?", stream=True)
\ No newline at end of file
+if __name__ == "__main__":
+    agent.print_response("What is the stock price of Apple?", stream=True)
\ No newline at end of file
@@ -1,29 +1,15 @@
 from agno.agent import Agent
-from agno.embedder.openai import OpenAIEmbedder
 from agno.knowledge.url import UrlKnowledge
-from agno.models.anthropic import Claude
-from agno.storage.sqlite import SqliteStorage
 from agno.vectordb.lancedb import LanceDb, SearchType
 
 
-from agno.models.openai import OpenAILike
-from agno.models.google import Gemini
 from agno.embedder.google import GeminiEmbedder
-from agno.agent import AgentKnowledge
-from agno.vectordb.pgvector import PgVector
-import os
+from models import get_model
+from storage import WalRunHistorySqliteStorage
 
-GOOGLE_API_KEY= os.getenv("GOOGLE_API_KEY")
-print(GOOGLE_API_KEY)
 
-
-# Embed sentence in database
-embeddings = GeminiEmbedder().get_embedding("The quick brown fox jumps over the lazy dog.")
-
-# Print the embeddings and their dimensions
-print(f"Embeddings: {embeddings[:5]}")
-print(f"Dimensions: {len(embeddings)}")
-# Use an embedder in a knowledge base
+# Nothing here calls a model or an embedder at import time, the playground and workers can import this module offline
+# Use an embedder in a knowledge base (needs `from agno.agent import AgentKnowledge` and `from agno.vectordb.pgvector import PgVector`)
 # knowledge_base = AgentKnowledge(
 #     vector_db=PgVector(
 #         db_url="postgresql+psycopg://ai:ai@localhost:5532/ai",
@@ -48,19 +34,14 @@ knowledge = UrlKnowledge(
 )
 
 
-# Store agent sessions in a SQLite database
-storage = SqliteStorage(table_name="agent_sessions", db_file="tmp/agent.db")
+# Store agent sessions in a SQLite database, one row per run, only the last 3 runs are loaded per turn
+# WAL mode + batched commits, tmp/agent.db is shared with the memory db in level_3
+storage = WalRunHistorySqliteStorage(table_name="agent_sessions", db_file="tmp/agent.db", num_history_runs=3)
 
-GEMINI_API_KEY= os.getenv("GEMINI_API_KEY")
  
-gemini_model = OpenAILike(
-    id='gemini-2.0-flash',
-    api_key=GEMINI_API_KEY,
-    base_url='https://generativelanguage.googleapis.com/v1beta/openai/'
-)
 agent = Agent(
     name="Agno Assist",
-    model=Gemini(id="gemini-2.0-flash"),
+    model=get_model("gemini-native"),
     instructions=[
         "Search your knowledge before answering the question.",
         "Only include the output in your response. No other text.",
@@ -72,11 +53,18 @@ agent = Agent(
     add_history_to_messages=True,
     # Number of history runs
     num_history_runs=3,
+    # Runs older than that are kept as a rolling summary
+    add_session_summary_references=True,
     markdown=True,
     debug_mode=True,
     monitoring=True,
 )
 if __name__ == "__main__":
+    # Embed a sentence to check the embedder
+    embeddings = GeminiEmbedder().get_embedding("The quick brown fox jumps over the lazy dog.")
+    print(f"Embeddings: {embeddings[:5]}")
+    print(f"Dimensions: {len(embeddings)}")
+
     # Load the knowledge base, comment out after first run
     # Set recreate to True to recreate the knowledge base if needed
     agent.knowledge.load(recreate=False)
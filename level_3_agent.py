@@ -1,44 +1,33 @@
-from agno.agent import Agent
-from agno.memory.v2.db.sqlite import SqliteMemoryDb
-from agno.memory.v2.memory import Memory
-from agno.models.anthropic import Claude
 from agno.tools.reasoning import ReasoningTools
-from agno.tools.yfinance import YFinanceTools
 
-from agno.models.google import Gemini
 from agno.embedder.google import GeminiEmbedder
-from agno.models.openai import OpenAILike
-import os
-GEMINI_API_KEY= os.getenv("GEMINI_API_KEY")
-QWEN_API_KEY=os.getenv("QWEN_API_KEY")
+from models import get_model
+from memories import DeferredRetrievalMemory, RetrievalMemoryAgent
+from storage import WalSqliteMemoryDb
+from tools import CachedYFinanceTools
  
 
-qw_model = OpenAILike(
-    id= 'qwen-turbo', # qwen-turbo / qwen3-235b-a22b / gemini-2.0-flash
-    api_key=QWEN_API_KEY,
-    base_url='https://dashscope.aliyuncs.com/compatible-mode/v1/',
-)
-gemini_model = OpenAILike(
-    id='gemini-2.0-flash',
-    api_key=GEMINI_API_KEY,
-    base_url='https://generativelanguage.googleapis.com/v1beta/openai/'
-)
-memory = Memory(
+memory = DeferredRetrievalMemory(
     # Use any model for creating and managing memories
-    model=Gemini(id="gemini-2.0-flash"),
-    # Store memories in a SQLite database
-    db=SqliteMemoryDb(table_name="user_memories", db_file="tmp/agent.db"),
+    model=get_model("gemini-native"),
+    # Memories are embedded once and indexed, only the 5 most relevant ones are added to each turn
+    embedder=GeminiEmbedder(),
+    top_k=5,
+    # Memory extraction runs in a background worker after the response, turns within 2s are merged into one model call
+    coalesce_delay=2.0,
+    # Store memories in a SQLite database, WAL mode + batched commits
+    db=WalSqliteMemoryDb(table_name="user_memories", db_file="tmp/agent.db"),
     # We disable deletion by default, enable it if needed
     delete_memories=True,
     clear_memories=True,
 )
 
-agent = Agent(
-    model=Gemini(id="gemini-2.0-flash"),
+agent = RetrievalMemoryAgent(
+    model=get_model("gemini-native"),
     # tool 有问题，谷歌模型跑着网络不通
     tools=[
         ReasoningTools(add_instructions=True),
-        YFinanceTools(stock_price=True)#, analyst_recommendations=True, company_info=True, company_news=True),
+        CachedYFinanceTools(stock_price=True)#, analyst_recommendations=True, company_info=True, company_news=True),
     ],
     # User ID for storing memories, `default` if not provided
     user_id="ava",
@@ -48,8 +37,8 @@ agent = Agent(
         "Only include the report in your response. No other text.",
     ],
     memory=memory,
-    # Let the Agent manage its memories
-    enable_agentic_memory=True,
+    # Extract memories from every user message, off the response critical path
+    enable_user_memories=True,
     markdown=True,
 )
 
@@ -61,6 +50,9 @@ if __name__ == "__main__":
         show_full_reasoning=True,
         stream_intermediate_steps=True,
     )
+    # Memories are extracted in the background, wait for them before asking about them
+    memory.flush_memories()
+    print(memory.memory_queue.stats())
     # This will use the memory to answer the question
     agent.print_response(
         "Can you compare my favorite stocks?",
@@ -1,45 +1,34 @@
-from agno.agent import Agent
-from agno.models.anthropic import Claude
-from agno.models.openai import OpenAIChat
-from agno.team.team import Team
-from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.reasoning import ReasoningTools
-from agno.tools.yfinance import YFinanceTools
 
-from agno.models.openai import OpenAILike
-from agno.models.google import Gemini
-import os
-GEMINI_API_KEY= os.getenv("GEMINI_API_KEY")
-QWEN_API_KEY=os.getenv("QWEN_API_KEY")
+from models import get_model
+from telemetry import InstrumentedAgent, InstrumentedTeam
+from tools import CachedDuckDuckGoTools, CachedYFinanceTools, LocalAShareTools, ParallelMemberTools
  
 
-qw_model = OpenAILike(
-    id= 'qwen-turbo', # qwen-turbo / qwen3-235b-a22b / gemini-2.0-flash
-    api_key=QWEN_API_KEY,
-    base_url='https://dashscope.aliyuncs.com/compatible-mode/v1/',
-)
-gemini_model = OpenAILike(
-    id='gemini-2.0-flash',
-    api_key=GEMINI_API_KEY,
-    base_url='https://generativelanguage.googleapis.com/v1beta/openai/'
-)
-web_agent = Agent(
+# Instrumented agents and teams write per-stage latency and a per-part token ledger to tmp/telemetry.db,
+# `python -m telemetry.dashboard --tokens --by component part` shows where the prompt tokens go
+# The current time in their system prompts is cut to the date and moved to the end, so the instructions, success criteria
+# and tool schemas form a stable prefix for provider prompt caching; `TELEMETRY_PREFIX_CACHE=1` logs cache-eligible tokens per call
+# That is also what makes the explicit Gemini context cache safe to turn on here, one cache per agent instead of one per call
+web_agent = InstrumentedAgent(
     name="Web Search Agent",
     role="Handle web search requests and general research",
-    model=Gemini(id="gemini-2.0-flash"), # gemini_model,# OpenAIChat(id="gpt-4.1"),
+    model=get_model("gemini-native", context_cache=True),
     tools=[
-        DuckDuckGoTools()
+        CachedDuckDuckGoTools()
         ],
     instructions="Always include sources",
     add_datetime_to_instructions=True,
 )
 
-finance_agent = Agent(
+finance_agent = InstrumentedAgent(
     name="Finance Agent",
     role="Handle financial data requests and market analysis",
-    model=Gemini(id="gemini-2.0-flash"), # gemini_model, #OpenAIChat(id="gpt-4.1"),
+    model=get_model("gemini-native", context_cache=True),
     tools=[
-        YFinanceTools(stock_price=True, stock_fundamentals=True,analyst_recommendations=True, company_info=True)
+        CachedYFinanceTools(stock_price=True, stock_fundamentals=True,analyst_recommendations=True, company_info=True),
+        # A股财报/公告/舆情走本地爬取数据，不需要联网
+        LocalAShareTools(),
         ],
     instructions=[
         "Use tables to display stock prices, fundamentals (P/E, Market Cap), and recommendations.",
@@ -49,15 +38,18 @@ finance_agent = Agent(
     add_datetime_to_instructions=True,
 )
 
-reasoning_finance_team = Team(
+reasoning_finance_team = InstrumentedTeam(
     name="Reasoning Finance Team",
     mode="coordinate",
-    model=Gemini(id="gemini-2.0-flash"), # gemini_model, #Claude(id="claude-sonnet-4-20250514"),
+    model=get_model("gemini-native", context_cache=True),
     members=[web_agent, finance_agent],
     tools=[
-        ReasoningTools(add_instructions=True)
+        ReasoningTools(add_instructions=True),
+        # Web search and YFinance lookups don't depend on each other, run them concurrently
+        ParallelMemberTools(members=[web_agent, finance_agent]),
         ],
     instructions=[
+        "When member tasks are independent, dispatch them together with `run_member_tasks` instead of transferring them one by one",
         "Collaborate to provide comprehensive financial and investment insights",
         "Consider both fundamental analysis and market sentiment",
         "Use tables and charts to display data clearly and professionally",
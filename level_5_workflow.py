@@ -1,31 +1,83 @@
-from typing import Iterator
+import threading
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional
 from agno.agent import Agent, RunResponse
-from agno.models.openai import OpenAIChat
+from agno.run.response import RunResponseContentEvent
 from agno.utils.log import logger
 from agno.utils.pprint import pprint_run_response
 from agno.workflow import Workflow
+from models import get_model
 
-from agno.models.openai import OpenAILike
-from agno.models.google import Gemini
-import os
-GEMINI_API_KEY= os.getenv("GEMINI_API_KEY")
-QWEN_API_KEY=os.getenv("QWEN_API_KEY")
  
 
-qw_model = OpenAILike(
-    id= 'qwen-turbo', # qwen-turbo / qwen3-235b-a22b / gemini-2.0-flash
-    api_key=QWEN_API_KEY,
-    base_url='https://dashscope.aliyuncs.com/compatible-mode/v1/',
-)
-gemini_model = OpenAILike(
-    id='gemini-2.0-flash',
-    api_key=GEMINI_API_KEY,
-    base_url='https://generativelanguage.googleapis.com/v1beta/openai/'
-)
+
+class InFlightRun:
+    """A running agent stream that concurrent callers with the same key can subscribe to."""
+
+    def __init__(self):
+        self.chunks: List = []
+        self.content: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self._cond = threading.Condition()
+
+    def publish(self, chunk) -> None:
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, content: Optional[str] = None, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self.content = content
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def subscribe(self) -> Iterator:
+        # Replay the chunks produced so far, then follow the stream until the leader finishes
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.chunks) and not self.done:
+                    self._cond.wait()
+                pending = self.chunks[index:]
+                index = len(self.chunks)
+                done = self.done
+            for chunk in pending:
+                # Each subscriber gets its own copy, the workflow rewrites run/session ids on it
+                yield replace(chunk)
+            if done and index >= len(self.chunks):
+                break
+        if self.error is not None:
+            raise self.error
+
+
+class SingleFlight:
+    """Coalesce concurrent runs for the same key so only the first one calls the model."""
+
+    def __init__(self):
+        self._runs: Dict[str, InFlightRun] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str) -> tuple[InFlightRun, bool]:
+        """Return the in-flight run for `key` and whether the caller is its leader."""
+        with self._lock:
+            flight = self._runs.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._runs[key] = InFlightRun()
+            return flight, True
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._runs.pop(key, None)
+
 
 class CacheWorkflow(Workflow):
     # Add agents or teams as attributes on the workflow
-    agent = Agent(model=Gemini(id="gemini-2.0-flash"))# gemini_model)
+    agent = Agent(model=get_model("gemini-native"))
+    # Shared by every session (and playground copy) of this workflow in the process
+    inflight = SingleFlight()
 
     # Write the logic in the `run()` method
     def run(self, message: str) -> Iterator[RunResponse]:
@@ -38,12 +90,38 @@ class CacheWorkflow(Workflow):
             )
             return
 
+        flight, leader = self.inflight.join(message)
+        if not leader:
+            # Someone else is already generating this answer, stream their chunks
+            logger.info(f"Joining in-flight run for '{message}'")
+            yield from flight.subscribe()
+            self.session_state[message] = flight.content
+            return
+
         logger.info(f"Cache miss for '{message}'")
-        # Run the agent and yield the response
-        yield from self.agent.run(message, stream=True)
+        try:
+            # Run the agent and yield the response
+            parts: List[str] = []
+            for chunk in self.agent.run(message, stream=True):
+                if isinstance(chunk, RunResponseContentEvent) and isinstance(chunk.content, str):
+                    parts.append(chunk.content)
+                flight.publish(chunk)
+                yield chunk
 
-        # Cache the output after response is yielded
-        self.session_state[message] = self.agent.run_response.content
+            # Cache the output after response is yielded. Built from this run's own chunks,
+            # self.agent.run_response is shared with any other run in flight on the same agent
+            content = "".join(parts)
+            self.session_state[message] = content
+            flight.finish(content=content)
+        except Exception as e:
+            flight.finish(error=e)
+            raise
+        except GeneratorExit:
+            # The leader's client went away, don't leave subscribers waiting forever
+            flight.finish(error=RuntimeError(f"Run for '{message}' was cancelled"))
+            raise
+        finally:
+            self.inflight.release(message)
 
 
 if __name__ == "__main__":
@@ -1,19 +1,8 @@
 from agno.agent import Agent
-from agno.models.openai import OpenAILike
-import os
 from agno.playground import Playground
 from agno.tools import tool
 
-QWEN_API_KEY=os.getenv("QWEN_API_KEY")
-qw_model = OpenAILike(
-    id= 'qwen-turbo', # qwen-turbo / qwen3-235b-a22b
-    api_key=QWEN_API_KEY,
-    base_url='https://dashscope.aliyuncs.com/compatible-mode/v1/',
-    
-    # extra_body={"chat_template_kwargs": {"enable_thinking": False}},
-    # parameters={"enable_thinking": False},  # 添加这行关键参数
-    # enable_thinking=False,
-)
+from models import get_model
 
 @tool()
 def add_tools(x: int, y: int) -> str:
@@ -21,7 +10,10 @@ def add_tools(x: int, y: int) -> str:
     return x + y
 
 agent = Agent(
-    model=qw_model,
+    # 固定id，多worker时每个进程里的agent id一致
+    agent_id="qwen-agent",
+    # 同一worker内复用连接池；设置 AGNO_STUB_MODEL_URL 时指向本地假模型服务做压测
+    model=get_model("qwen"),
     tools=[add_tools],
     instructions="请你使用中文回答问题",
     markdown=True,
@@ -33,6 +25,7 @@ playground = Playground(agents=[agent])
 app = playground.get_app()
 
 # agent.run("请计算1 + 2 /no_think") 跑起来自身可能就是server
+# 开发模式；生产环境用 python serve.py main:app --workers 4
 if __name__ == "__main__":
     playground.serve("main:app", reload=True)
 
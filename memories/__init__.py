@@ -0,0 +1,18 @@
+"""
+记忆模块
+agno Memory 的扩展，记忆数量增长到上千条时每轮对话的延迟保持不变
+"""
+
+from .deferred import DeferredMemory, DeferredRetrievalMemory, MemoryExtractionQueue
+from .retrieval import HashEmbedder, MemoryVectorIndex, RetrievalMemory, RetrievalMemoryAgent, memory_query
+
+__all__ = [
+    'RetrievalMemory',
+    'RetrievalMemoryAgent',
+    'MemoryVectorIndex',
+    'HashEmbedder',
+    'memory_query',
+    'DeferredMemory',
+    'DeferredRetrievalMemory',
+    'MemoryExtractionQueue',
+]
@@ -0,0 +1,217 @@
+import atexit
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from agno.memory.v2.memory import Memory
+from agno.models.message import Message
+from agno.utils.log import log_debug, log_warning
+
+from .retrieval import RetrievalMemory
+
+
+@dataclass
+class _Job:
+    enqueued_at: float
+    messages: List[Message] = field(default_factory=list)
+    task: Optional[str] = None
+
+
+class MemoryExtractionQueue:
+    """
+    后台记忆提取队列：按用户合并多轮对话，一次模型调用完成提取
+    :param handler: (user_id, messages, tasks) -> None，实际执行提取
+    :param coalesce_delay: 最早一条入队后最多等待的秒数，期间同一用户的后续轮次合并进同一次提取
+    :param max_turns: 同一用户攒够这么多轮立即提取
+    """
+
+    def __init__(self, handler: Callable[[str, List[Message], List[str]], None], coalesce_delay: float = 2.0, max_turns: int = 8):
+        self.handler = handler
+        self.coalesce_delay = coalesce_delay
+        self.max_turns = max_turns
+        self._pending: Dict[str, List[_Job]] = {}
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._flushing = 0
+        self._lags: List[float] = []
+        self.turns_processed = 0
+        self.extraction_calls = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="memory-extraction", daemon=True)
+        self._thread.start()
+        _QUEUES.add(self)
+
+    def submit(self, user_id: str, messages: Optional[List[Message]] = None, task: Optional[str] = None) -> None:
+        with self._cond:
+            self._pending.setdefault(user_id, []).append(_Job(time.monotonic(), list(messages or []), task))
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """立即处理所有排队的提取并等待完成，返回是否在timeout内完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._pending or self._inflight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    def depth(self) -> int:
+        """排队中的轮次数"""
+        with self._cond:
+            return sum(len(jobs) for jobs in self._pending.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度和延迟：oldest_lag为排队最久一轮已等待的秒数，lag_p50/p95为入队到提取完成的秒数"""
+        now = time.monotonic()
+        with self._cond:
+            oldest = min((jobs[0].enqueued_at for jobs in self._pending.values()), default=now)
+            lags = sorted(self._lags)
+            depth = sum(len(jobs) for jobs in self._pending.values())
+        pct = lambda p: lags[min(len(lags) - 1, int(p * len(lags)))] if lags else 0.0
+        return {
+            "depth": depth,
+            "inflight": self._inflight,
+            "oldest_lag": now - oldest,
+            "lag_p50": pct(0.5),
+            "lag_p95": pct(0.95),
+            "turns_processed": self.turns_processed,
+            "extraction_calls": self.extraction_calls,
+            "errors": self.errors,
+        }
+
+    def _ready_user(self, now: float) -> Optional[str]:
+        for user_id, jobs in self._pending.items():
+            if self._flushing or len(jobs) >= self.max_turns or now - jobs[0].enqueued_at >= self.coalesce_delay:
+                return user_id
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    user_id = self._ready_user(now)
+                    if user_id is not None:
+                        break
+                    oldest = min((jobs[0].enqueued_at for jobs in self._pending.values()), default=None)
+                    self._cond.wait(None if oldest is None else max(0.0, oldest + self.coalesce_delay - now))
+                jobs = self._pending.pop(user_id)
+                self._inflight += 1
+
+            messages = [m for job in jobs for m in job.messages]
+            tasks = [job.task for job in jobs if job.task]
+            try:
+                log_debug(f"Extracting memories for {user_id} from {len(jobs)} turns")
+                self.handler(user_id, messages, tasks)
+            except Exception as e:
+                self.errors += 1
+                log_warning(f"Memory extraction failed for {user_id}: {e}")
+            finally:
+                done = time.monotonic()
+                with self._cond:
+                    self._inflight -= 1
+                    self.turns_processed += len(jobs)
+                    self.extraction_calls += 1
+                    self._lags.extend(done - job.enqueued_at for job in jobs)
+                    del self._lags[:-1000]
+                    self._cond.notify_all()
+
+
+_QUEUES: "weakref.WeakSet[MemoryExtractionQueue]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    # 提取线程是daemon线程，退出前把排队的记忆处理完
+    for q in list(_QUEUES):
+        q.flush(timeout=30)
+
+
+class DeferredMemoryMixin:
+    """
+    记忆提取移出响应的关键路径：create_user_memories / update_memory_task 只入队立即返回，
+    由后台线程合并多轮后调用一次记忆模型
+    """
+
+    def _init_deferred(self, coalesce_delay: float, max_turns: int) -> None:
+        self.memory_queue = MemoryExtractionQueue(self._extract, coalesce_delay=coalesce_delay, max_turns=max_turns)
+
+    def _extract(self, user_id: str, messages: List[Message], tasks: List[str]) -> None:
+        if messages:
+            super().create_user_memories(messages=messages, user_id=user_id)
+        if tasks:
+            super().update_memory_task(task="\n".join(tasks), user_id=user_id)
+
+    def create_user_memories(
+        self,
+        message: Optional[str] = None,
+        messages: Optional[List[Message]] = None,
+        user_id: Optional[str] = None,
+        refresh_from_db: bool = True,
+    ) -> str:
+        if not messages and not message:
+            raise ValueError("You must provide either a message or a list of messages")
+        if message:
+            messages = [Message(role="user", content=message)]
+        self.memory_queue.submit(user_id or "default", messages=messages)
+        return "Memory update queued"
+
+    async def acreate_user_memories(
+        self,
+        message: Optional[str] = None,
+        messages: Optional[List[Message]] = None,
+        user_id: Optional[str] = None,
+        refresh_from_db: bool = True,
+    ) -> str:
+        return self.create_user_memories(message=message, messages=messages, user_id=user_id)
+
+    def update_memory_task(self, task: str, user_id: Optional[str] = None) -> str:
+        self.memory_queue.submit(user_id or "default", task=task)
+        return "Memory update scheduled, it will be applied in the background"
+
+    async def aupdate_memory_task(self, task: str, user_id: Optional[str] = None) -> str:
+        return self.update_memory_task(task=task, user_id=user_id)
+
+    def flush_memories(self, timeout: Optional[float] = None) -> bool:
+        """等待排队的记忆提取全部完成，测试或需要立即读到新记忆时调用"""
+        return self.memory_queue.flush(timeout=timeout)
+
+    def __deepcopy__(self, memo):
+        # 副本共用同一个提取队列
+        memo[id(self.memory_queue)] = self.memory_queue
+        return super().__deepcopy__(memo)
+
+
+class DeferredMemory(DeferredMemoryMixin, Memory):
+    """
+    后台提取记忆的Memory，参数与Memory一致，另外：
+    Args:
+        coalesce_delay: 合并窗口（秒）
+        max_turns: 单次提取最多合并的轮次
+    """
+
+    def __init__(self, coalesce_delay: float = 2.0, max_turns: int = 8, **kwargs):
+        super().__init__(**kwargs)
+        self._init_deferred(coalesce_delay, max_turns)
+
+    def deep_copy(self) -> "DeferredMemory":
+        from copy import deepcopy
+
+        return deepcopy(self)
+
+
+class DeferredRetrievalMemory(DeferredMemoryMixin, RetrievalMemory):
+    """后台提取记忆的RetrievalMemory，参数为两者之和"""
+
+    def __init__(self, coalesce_delay: float = 2.0, max_turns: int = 8, **kwargs):
+        super().__init__(**kwargs)
+        self._init_deferred(coalesce_delay, max_turns)
@@ -0,0 +1,494 @@
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+import numpy as np
+from agno.agent import Agent
+from agno.embedder.base import Embedder
+from agno.memory.v2.memory import Memory
+from agno.memory.v2.schema import UserMemory
+from agno.models.message import Message
+from agno.utils.log import log_debug, log_warning
+
+# 当前这轮的用户输入，RetrievalMemory据此只取相关的记忆
+current_query: ContextVar[Optional[str]] = ContextVar("current_query", default=None)
+
+
+@contextmanager
+def memory_query(query: Optional[str]):
+    """在with块内，RetrievalMemory.get_user_memories只返回与query相关的top-k记忆"""
+    token = current_query.set(query)
+    try:
+        yield
+    finally:
+        current_query.reset(token)
+
+
+@dataclass
+class HashEmbedder(Embedder):
+    """
+    本地哈希词袋向量（feature hashing），不联网、零延迟，适合离线测试和中文短记忆
+    英文按单词、中文按单字和相邻两字切分
+    """
+
+    dimensions: Optional[int] = 512
+
+    def _tokens(self, text: str) -> List[str]:
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        for run in re.findall(r"[一-鿿]+", text):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        return tokens
+
+    def get_embedding(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in self._tokens(text):
+            h = int.from_bytes(hashlib.md5(token.encode()).digest()[:4], "little")
+            vector[h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        return vector.tolist()
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class MemoryVectorIndex:
+    """
+    用户记忆的向量索引
+    - 每条记忆只在文本变化时嵌入一次，向量按(memory_id, 文本hash)持久化在SQLite，重启后不用重新嵌入
+    - 嵌入和落盘在后台线程批量进行，不阻塞对话；还没嵌入完的新记忆检索时直接带上
+    - 嵌入失败（超时、限流）时按指数退避重试整批，仍失败就放弃这批，不再当作待嵌入的记忆带上，下次sync时重新提交
+    - 每个用户一个归一化向量矩阵，检索是一次矩阵乘法 + argpartition
+    :param embedder: agno Embedder，默认HashEmbedder
+    :param db_file: 向量持久化的数据库文件
+    :param table_name: 表名
+    :param max_batch: 后台每批处理的记忆数
+    :param max_retries: 一批嵌入失败后的重试次数
+    :param retry_delay: 第一次重试前等待的秒数，之后每次翻倍
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        db_file: str = "tmp/agent.db",
+        table_name: str = "memory_embeddings",
+        max_batch: int = 32,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+    ):
+        self.embedder = embedder or HashEmbedder()
+        self.db_file = db_file
+        self.table_name = table_name
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        # user_id -> memory_id -> (文本hash, 归一化向量)
+        self._vectors: Dict[str, Dict[str, Tuple[str, np.ndarray]]] = {}
+        # user_id -> (memory_id列表, 矩阵)，向量变化后置空，下次检索时重建
+        self._matrices: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        # 已提交后台嵌入、尚未完成的记忆
+        self._pending: Dict[str, Dict[str, str]] = {}
+        self._loaded: set = set()
+        self._lock = threading.RLock()
+        self._queue: "queue.Queue[Tuple[str, str, str]]" = queue.Queue()
+        self._embed_errors = 0
+
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table_name} ("
+                "memory_id TEXT PRIMARY KEY, user_id TEXT, text_hash TEXT, vector BLOB)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_user ON {table_name} (user_id)")
+        self._thread = threading.Thread(target=self._run, name="memory-embedder", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_file, timeout=10)
+
+    def _normalize(self, vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def _load_user(self, user_id: str) -> None:
+        if user_id in self._loaded:
+            return
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT memory_id, text_hash, vector FROM {self.table_name} WHERE user_id=?", (user_id,)
+            ).fetchall()
+        with self._lock:
+            vectors = self._vectors.setdefault(user_id, {})
+            for memory_id, text_hash, blob in rows:
+                vectors.setdefault(memory_id, (text_hash, np.frombuffer(blob, dtype=np.float32)))
+            self._loaded.add(user_id)
+
+    def sync(self, user_id: str, memories: Dict[str, str]) -> int:
+        """
+        让索引与记忆文本 memory_id -> text 保持一致：删除已不存在的，新增或改动的提交后台嵌入
+        :return: 需要重新嵌入的条数
+        """
+        self._load_user(user_id)
+        changed = []
+        with self._lock:
+            vectors = self._vectors.setdefault(user_id, {})
+            pending = self._pending.setdefault(user_id, {})
+            removed = [m for m in vectors if m not in memories]
+            for memory_id in removed:
+                del vectors[memory_id]
+            for memory_id in [m for m in pending if m not in memories]:
+                del pending[memory_id]
+            for memory_id, text in memories.items():
+                h = _text_hash(text)
+                if (memory_id in vectors and vectors[memory_id][0] == h) or pending.get(memory_id) == h:
+                    continue
+                pending[memory_id] = h
+                changed.append((memory_id, text))
+            if removed:
+                self._matrices.pop(user_id, None)
+        if removed:
+            with self._connect() as conn:
+                conn.executemany(f"DELETE FROM {self.table_name} WHERE memory_id=?", [(m,) for m in removed])
+        for memory_id, text in changed:
+            self._queue.put((user_id, memory_id, text))
+        return len(changed)
+
+    def search(self, user_id: str, query: str, k: int) -> List[str]:
+        """与query最相似的k条记忆id；尚未嵌入完的新记忆排在最前"""
+        self._load_user(user_id)
+        with self._lock:
+            fresh = list(self._pending.get(user_id, {}))
+            cached = self._matrices.get(user_id)
+            if cached is None:
+                vectors = self._vectors.get(user_id, {})
+                ids = list(vectors)
+                matrix = np.stack([v for _, v in vectors.values()]) if ids else np.zeros((0, 0), dtype=np.float32)
+                cached = self._matrices[user_id] = (ids, matrix)
+        ids, matrix = cached
+        if len(fresh) >= k or not ids:
+            return fresh[:k]
+
+        scores = matrix @ self._normalize(self.embedder.get_embedding(query))
+        n = min(k - len(fresh), len(ids))
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+        return fresh + [ids[i] for i in top]
+
+    def flush(self) -> None:
+        """等待后台嵌入全部完成，测试时使用"""
+        self._queue.join()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._embed_with_retry(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _embed_with_retry(self, batch: List[Tuple[str, str, str]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._embed_batch(batch)
+                return
+            except Exception as e:
+                self._embed_errors += 1
+                if attempt == self.max_retries:
+                    log_warning(f"Failed to embed {len(batch)} memories, giving up: {e}")
+                    break
+                delay = self.retry_delay * 2 ** attempt
+                log_warning(f"Failed to embed {len(batch)} memories, retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+        # 放弃的记忆不能一直留在待嵌入里，否则每次检索都排在最前；下次sync时会重新提交
+        with self._lock:
+            for user_id, memory_id, text in batch:
+                pending = self._pending.get(user_id, {})
+                if pending.get(memory_id) == _text_hash(text):
+                    del pending[memory_id]
+
+    def _embed_batch(self, batch: List[Tuple[str, str, str]]) -> None:
+        rows = []
+        for user_id, memory_id, text in batch:
+            h = _text_hash(text)
+            with self._lock:
+                if self._pending.get(user_id, {}).get(memory_id) != h:
+                    # 排队期间记忆又被修改或删除了
+                    continue
+            vector = self._normalize(self.embedder.get_embedding(text))
+            rows.append((memory_id, user_id, h, vector))
+
+        # 一批向量一个事务落盘
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table_name} VALUES (?, ?, ?, ?)",
+                [(m, u, h, v.tobytes()) for m, u, h, v in rows],
+            )
+        with self._lock:
+            for memory_id, user_id, h, vector in rows:
+                pending = self._pending.get(user_id, {})
+                if pending.get(memory_id) == h:
+                    del pending[memory_id]
+                    self._vectors.setdefault(user_id, {})[memory_id] = (h, vector)
+                    self._matrices.pop(user_id, None)
+        log_debug(f"Embedded {len(rows)} memories")
+
+
+class RetrievalMemory(Memory):
+    """
+    基于检索的用户记忆，参数与Memory一致，另外：
+    - 每个用户的记忆只从数据库加载一次，之后常驻内存，不再每轮全量读库
+    - 对话时只把与当前输入最相关的top_k条记忆放进提示词（需配合RetrievalMemoryAgent，或自行用memory_query包住调用）
+    - 记忆模型更新记忆时，也只把相关的记忆作为已有记忆传给它，提示词不随记忆数增长
+    - 记忆写库可配合WalSqliteMemoryDb批量提交，嵌入在后台线程完成
+    Args:
+        embedder: 嵌入模型，默认HashEmbedder
+        index: 向量索引，默认与db同一个数据库文件
+        top_k: 每轮放进提示词的记忆条数
+        manager_context: 更新记忆时传给记忆模型的相关记忆条数
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        index: Optional[MemoryVectorIndex] = None,
+        top_k: int = 5,
+        manager_context: int = 20,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        db_file = getattr(self.db, "db_file", None) or "tmp/agent.db"
+        self.index = index or MemoryVectorIndex(embedder=embedder, db_file=db_file)
+        self.top_k = top_k
+        self.manager_context = manager_context
+        self._loaded_users: set = set()
+
+    def _ensure_loaded(self, user_id: str) -> None:
+        if user_id not in self._loaded_users:
+            self.reload(user_id)
+
+    def reload(self, user_id: str) -> None:
+        """从数据库重新加载用户记忆，并同步向量索引（只嵌入新增或改动的记忆）"""
+        rows = self.db.read_memories(user_id=user_id) if self.db else []
+        # 原地更新，agent的各个副本共享同一个memories字典
+        self.memories[user_id] = {row.id: UserMemory.from_dict(row.memory) for row in rows if row.id is not None}
+        self._loaded_users.add(user_id)
+        self._sync(user_id)
+
+    def refresh_from_db(self, user_id: Optional[str] = None):
+        # 首次加载后以内存为准，不再每次调用都全量读库
+        if user_id is None:
+            return super().refresh_from_db()
+        self._ensure_loaded(user_id)
+
+    def _sync(self, user_id: str) -> None:
+        memories = self.memories.get(user_id, {}) if self.memories else {}
+        self.index.sync(user_id, {memory_id: m.memory for memory_id, m in memories.items()})
+
+    def get_user_memories(self, user_id: Optional[str] = None, refresh_from_db: bool = True) -> List[UserMemory]:
+        user_id = user_id or "default"
+        self._ensure_loaded(user_id)
+        query = current_query.get()
+        if query:
+            return self.search_user_memories(query=query, limit=self.top_k, user_id=user_id)
+        return super().get_user_memories(user_id=user_id, refresh_from_db=False)
+
+    def search_user_memories(
+        self,
+        query: Optional[str] = None,
+        limit: Optional[int] = None,
+        retrieval_method: Optional[Literal["last_n", "first_n", "agentic", "semantic"]] = None,
+        user_id: Optional[str] = None,
+        refresh_from_db: bool = True,
+    ) -> List[UserMemory]:
+        """检索用户记忆，有query时默认用向量检索（semantic），其余方式同Memory"""
+        user_id = user_id or "default"
+        self._ensure_loaded(user_id)
+        if query and retrieval_method in (None, "semantic"):
+            memories = self.memories.get(user_id, {}) if self.memories else {}
+            ids = self.index.search(user_id, query, limit or self.top_k)
+            return [memories[i] for i in ids if i in memories]
+        return super().search_user_memories(
+            query=query, limit=limit, retrieval_method=retrieval_method, user_id=user_id, refresh_from_db=False
+        )
+
+    def add_user_memory(self, memory: UserMemory, user_id: Optional[str] = None, refresh_from_db: bool = True) -> str:
+        user_id = user_id or "default"
+        self._ensure_loaded(user_id)
+        memory_id = super().add_user_memory(memory, user_id=user_id, refresh_from_db=False)
+        self._sync(user_id)
+        return memory_id
+
+    def replace_user_memory(
+        self, memory_id: str, memory: UserMemory, user_id: Optional[str] = None, refresh_from_db: bool = True
+    ) -> Optional[str]:
+        user_id = user_id or "default"
+        self._ensure_loaded(user_id)
+        result = super().replace_user_memory(memory_id, memory, user_id=user_id, refresh_from_db=False)
+        self._sync(user_id)
+        return result
+
+    def delete_user_memory(self, memory_id: str, user_id: Optional[str] = None, refresh_from_db: bool = True) -> None:
+        user_id = user_id or "default"
+        self._ensure_loaded(user_id)
+        super().delete_user_memory(memory_id, user_id=user_id, refresh_from_db=False)
+        self._sync(user_id)
+
+    def _relevant_existing(self, user_id: str, text: str) -> List[Dict[str, Any]]:
+        self._ensure_loaded(user_id)
+        memories = self.memories.get(user_id, {}) if self.memories else {}
+        ids = self.index.search(user_id, text, self.manager_context) if text else list(memories)[-self.manager_context:]
+        return [{"memory_id": i, "memory": memories[i].memory} for i in ids if i in memories]
+
+    def _check_manager(self) -> Optional[str]:
+        if not self.memory_manager:
+            raise ValueError("Memory manager not initialized")
+        if self.db is None:
+            log_warning("MemoryDb not provided.")
+            return "Please provide a db to store memories"
+        return None
+
+    def create_user_memories(
+        self,
+        message: Optional[str] = None,
+        messages: Optional[List[Message]] = None,
+        user_id: Optional[str] = None,
+        refresh_from_db: bool = True,
+    ) -> str:
+        """同Memory.create_user_memories，但只把相关的已有记忆传给记忆模型"""
+        self.set_log_level()
+        if not messages and not message:
+            raise ValueError("You must provide either a message or a list of messages")
+        if message:
+            messages = [Message(role="user", content=message)]
+        if not messages or not isinstance(messages, list):
+            raise ValueError("Invalid messages list")
+        error = self._check_manager()
+        if error:
+            return error
+
+        user_id = user_id or "default"
+        text = "\n".join(m.get_content_string() for m in messages)
+        response = self.memory_manager.create_or_update_memories(  # type: ignore
+            messages=messages,
+            existing_memories=self._relevant_existing(user_id, text),
+            user_id=user_id,
+            db=self.db,
+            delete_memories=self.delete_memories,
+            clear_memories=self.clear_memories,
+        )
+        # 记忆模型直接写库，重新加载并只嵌入变化的记忆
+        self.reload(user_id)
+        return response
+
+    async def acreate_user_memories(
+        self,
+        message: Optional[str] = None,
+        messages: Optional[List[Message]] = None,
+        user_id: Optional[str] = None,
+        refresh_from_db: bool = True,
+    ) -> str:
+        self.set_log_level()
+        if not messages and not message:
+            raise ValueError("You must provide either a message or a list of messages")
+        if message:
+            messages = [Message(role="user", content=message)]
+        if not messages or not isinstance(messages, list):
+            raise ValueError("Invalid messages list")
+        error = self._check_manager()
+        if error:
+            return error
+
+        user_id = user_id or "default"
+        text = "\n".join(m.get_content_string() for m in messages)
+        response = await self.memory_manager.acreate_or_update_memories(  # type: ignore
+            messages=messages,
+            existing_memories=self._relevant_existing(user_id, text),
+            user_id=user_id,
+            db=self.db,
+            delete_memories=self.delete_memories,
+            clear_memories=self.clear_memories,
+        )
+        self.reload(user_id)
+        return response
+
+    def update_memory_task(self, task: str, user_id: Optional[str] = None) -> str:
+        """同Memory.update_memory_task，但只把与任务相关的已有记忆传给记忆模型"""
+        error = self._check_manager()
+        if error:
+            return error
+        user_id = user_id or "default"
+        response = self.memory_manager.run_memory_task(  # type: ignore
+            task=task,
+            existing_memories=self._relevant_existing(user_id, task),
+            user_id=user_id,
+            db=self.db,
+            delete_memories=self.delete_memories,
+            clear_memories=self.clear_memories,
+        )
+        self.reload(user_id)
+        return response
+
+    async def aupdate_memory_task(self, task: str, user_id: Optional[str] = None) -> str:
+        self.set_log_level()
+        error = self._check_manager()
+        if error:
+            return error
+        user_id = user_id or "default"
+        response = await self.memory_manager.arun_memory_task(  # type: ignore
+            task=task,
+            existing_memories=self._relevant_existing(user_id, task),
+            user_id=user_id,
+            db=self.db,
+            delete_memories=self.delete_memories,
+            clear_memories=self.clear_memories,
+        )
+        self.reload(user_id)
+        return response
+
+    def __deepcopy__(self, memo):
+        # 记忆、索引和加载状态在副本之间共享，playground每个请求都会复制agent
+        for shared in (self.memories, self.index, self._loaded_users):
+            memo[id(shared)] = shared
+        return super().__deepcopy__(memo)
+
+    def deep_copy(self) -> "RetrievalMemory":
+        # Memory.deep_copy会重新调用__init__，这里会再建一个索引
+        from copy import deepcopy
+
+        return deepcopy(self)
+
+
+class RetrievalMemoryAgent(Agent):
+    """
+    配合RetrievalMemory使用的Agent：组装提示词时把本轮输入作为记忆检索的query，
+    系统提示词里只出现top_k条相关记忆，而不是该用户的全部记忆
+    """
+
+    def get_run_messages(self, *, message=None, messages=None, **kwargs):
+        query = message.get_content_string() if isinstance(message, Message) else message
+        if not isinstance(query, str) and messages:
+            last = messages[-1]
+            query = last.get_content_string() if isinstance(last, Message) else (last or {}).get("content")
+        with memory_query(query if isinstance(query, str) else None):
+            return super().get_run_messages(message=message, messages=messages, **kwargs)
@@ -0,0 +1,53 @@
+"""
+模型模块
+模型注册表，模型客户端的构建和复用，提示词前缀缓存
+
+依赖openai、agno.team的部分在第一次访问时才导入，入口脚本 `from models import get_model` 不拖慢启动
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+from .registry import MODELS, PROVIDERS, STUB_ENV, ModelSpec, get_model, register_model, stub_url
+
+if TYPE_CHECKING:
+    from .gemini_cache import CachedGemini
+    from .pooled import PooledOpenAILike, aclose_clients
+    from .prompt_cache import StablePromptMixin, stable_system_prompt
+    from .stub import point_at_stub, stub_model
+    from .tokens import estimate_tokens
+
+_LAZY = {
+    'CachedGemini': '.gemini_cache',
+    'PooledOpenAILike': '.pooled',
+    'aclose_clients': '.pooled',
+    'StablePromptMixin': '.prompt_cache',
+    'stable_system_prompt': '.prompt_cache',
+    'point_at_stub': '.stub',
+    'stub_model': '.stub',
+    'estimate_tokens': '.tokens',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    'get_model',
+    'register_model',
+    'ModelSpec',
+    'MODELS',
+    'PROVIDERS',
+    'PooledOpenAILike',
+    'aclose_clients',
+    'CachedGemini',
+    'StablePromptMixin',
+    'stable_system_prompt',
+    'point_at_stub',
+    'stub_model',
+    'estimate_tokens',
+    'stub_url',
+    'STUB_ENV',
+]
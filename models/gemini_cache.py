@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from agno.models.google import Gemini
+from agno.utils.gemini import format_function_definitions
+from agno.utils.log import log_debug, log_warning
+from google.genai.types import CreateCachedContentConfig, GenerateContentConfig
+
+from .tokens import estimate_tokens
+
+# 显式缓存的最小输入token数，以官方文档为准；不够时直接发送完整请求
+MIN_CACHE_TOKENS: Dict[str, int] = {
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-pro": 4096,
+}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+
+# 进程内同时保留的缓存条目上限；系统指令每次都变的agent会不断产生新键，满了之后新的前缀不再创建缓存
+MAX_CACHES = 32
+# 创建失败后隔多久重试（秒），临时的网络或配额错误不会让缓存在整个进程里失效
+RETRY_AFTER = 300
+
+# (模型id, 系统指令+工具定义的哈希) -> (缓存名, 过期时间)；缓存名为None表示创建失败或太短，过期前不再尝试
+_CACHES: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+# 正在创建的缓存，同一个键同时只创建一次
+_CREATING: Set[Tuple[str, str]] = set()
+_lock = threading.Lock()
+
+
+def min_cache_tokens(model_id: str) -> int:
+    return next((n for prefix, n in MIN_CACHE_TOKENS.items() if model_id.startswith(prefix)), DEFAULT_MIN_CACHE_TOKENS)
+
+
+@dataclass
+class CachedGemini(Gemini):
+    """
+    Gemini原生接口，系统指令和工具定义用显式上下文缓存（caches.create）保存在服务端，
+    之后的请求只引用缓存名，缓存部分的输入token按折扣计费；同一进程内系统指令和工具完全相同的请求共用一个缓存
+    Args:
+        context_cache: 是否使用显式缓存，False时与Gemini一致；只给系统提示词稳定的agent打开（如InstrumentedAgent，
+            见 models.prompt_cache），系统提示词每次都变时每次请求都会创建一个新的计费缓存
+        context_cache_ttl: 缓存保留的秒数，快过期时重新创建；缓存存储按时长计费
+    """
+
+    context_cache: bool = False
+    context_cache_ttl: int = 600
+
+    def _cache_name(self, system_message: Optional[str], tools: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+        if not system_message:
+            return None
+        payload = json.dumps([system_message, tools], ensure_ascii=False, sort_keys=True, default=str)
+        key = (self.id, hashlib.md5(payload.encode()).hexdigest())
+        now = time.time()
+        with _lock:
+            cached = _CACHES.get(key)
+            if cached is not None:
+                name, expires = cached
+                # 留一分钟余量，避免请求发出时缓存刚好过期
+                if (name is None and expires > now) or (name is not None and expires - now > 60):
+                    return name
+            if key in _CREATING:
+                # 其他请求正在创建同一个缓存，不等它，这次发送完整请求
+                return None
+            for stale in [k for k, (_, expires) in _CACHES.items() if expires <= now]:
+                del _CACHES[stale]
+            if key not in _CACHES and len(_CACHES) + len(_CREATING) >= MAX_CACHES:
+                log_debug(f"{len(_CACHES)} context caches live, sending the full prompt for {self.id}")
+                return None
+            _CREATING.add(key)
+
+        tokens = estimate_tokens(payload)
+        if tokens < min_cache_tokens(self.id):
+            log_debug(f"Prompt prefix for {self.id} is ~{tokens} tokens, below the context cache minimum")
+            self._record(key, None, now + self.context_cache_ttl)
+            return None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self._create_cache(key, system_message, tools, tokens)
+        # 异步调用时在事件循环线程里：caches.create是阻塞的网络请求，放到后台线程，这次先发送完整请求
+        threading.Thread(target=self._create_cache, args=(key, system_message, tools, tokens), daemon=True).start()
+        return None
+
+    def _create_cache(self, key: Tuple[str, str], system_message: str, tools: Optional[List[Dict[str, Any]]], tokens: int) -> Optional[str]:
+        """创建缓存并记录结果，不持有_lock，网络请求期间其他模型的请求照常进行"""
+        now = time.time()
+        try:
+            config = CreateCachedContentConfig(
+                system_instruction=system_message,
+                tools=[format_function_definitions(tools)] if tools else None,
+                ttl=f"{self.context_cache_ttl}s",
+                display_name=f"agno-{key[1][:12]}",
+            )
+            cache = self.get_client().caches.create(model=self.id, config=config)
+        except Exception as e:
+            log_warning(f"Could not create context cache for {self.id}, retrying in {RETRY_AFTER}s: {e}")
+            self._record(key, None, now + RETRY_AFTER)
+            return None
+        log_debug(f"Created context cache {cache.name} for {self.id} (~{tokens} tokens)")
+        self._record(key, cache.name, now + self.context_cache_ttl)
+        return cache.name
+
+    @staticmethod
+    def _record(key: Tuple[str, str], name: Optional[str], expires: float) -> None:
+        with _lock:
+            _CACHES[key] = (name, expires)
+            _CREATING.discard(key)
+
+    def get_request_params(self, system_message: Optional[str] = None, response_format: Any = None, tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        # 内置搜索会替换掉工具定义，不走缓存
+        name = self._cache_name(system_message, tools) if self.context_cache and not (self.grounding or self.search) else None
+        if name is None:
+            return super().get_request_params(system_message, response_format=response_format, tools=tools)
+        # 引用缓存时请求里不能再带系统指令和工具定义
+        params = super().get_request_params(None, response_format=response_format, tools=None)
+        config = params.get("config")
+        params["config"] = config.model_copy(update={"cached_content": name}) if config is not None else GenerateContentConfig(cached_content=name)
+        return params
@@ -0,0 +1,199 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import httpx
+from agno.models.message import Message
+from agno.models.openai import OpenAILike
+from agno.utils.log import log_debug
+from openai import AsyncOpenAI as AsyncOpenAIClient
+from openai import OpenAI as OpenAIClient
+
+# HTTP/2需要安装h2（pip install "httpx[http2]"），没有安装时退回HTTP/1.1 keep-alive
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# (kind, pid, 事件循环, base_url) -> httpx连接池；同一地址的所有模型共用一个，每个worker进程各自一套，fork后不复用父进程的连接
+_HTTP_CLIENTS: Dict[Tuple, Any] = {}
+# (kind, pid, 事件循环, 客户端参数) -> OpenAI客户端，很轻，底层连接池共用
+_CLIENTS: Dict[Tuple, Any] = {}
+# (pid, 事件循环, 限流键) -> 信号量
+_LIMITERS: Dict[Tuple, Any] = {}
+# id(事件循环) -> 事件循环的弱引用，用来发现已关闭或已回收的循环
+_LOOPS: Dict[int, weakref.ref] = {}
+_lock = threading.Lock()
+
+
+def _loop_id() -> int:
+    """
+    当前事件循环的键，不在事件循环里时为0。
+    异步客户端和信号量绑定在创建它们的事件循环上：每次遇到新的事件循环，先丢弃已关闭或已回收的循环留下的对象，
+    否则id被新循环复用时会拿到绑在旧循环上的客户端
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return 0
+    key = id(loop)
+    with _lock:
+        ref = _LOOPS.get(key)
+        if ref is None or ref() is not loop:
+            _drop_stale_loops()
+            _LOOPS[key] = weakref.ref(loop)
+    return key
+
+
+def _drop_stale_loops() -> None:
+    # 调用方持有_lock；旧循环已经关闭，上面的连接池无法再aclose，丢掉引用由垃圾回收释放
+    stale = set()
+    for key, ref in list(_LOOPS.items()):
+        loop = ref()
+        if loop is None or loop.is_closed():
+            stale.add(key)
+            del _LOOPS[key]
+    if not stale:
+        return
+    for pool, index in ((_HTTP_CLIENTS, 2), (_CLIENTS, 2), (_LIMITERS, 1)):
+        for k in [k for k in pool if k[index] in stale]:
+            del pool[k]
+
+
+@dataclass
+class PooledOpenAILike(OpenAILike):
+    """
+    OpenAILike的连接复用版本：agno每次请求都会新建OpenAI客户端（和一个新的连接池），
+    这里同一进程内base_url相同的模型共用一个httpx连接池，连接在请求和agent之间复用
+    Args:
+        max_connections: 连接池最大连接数，同一base_url以第一个创建连接池的模型为准
+        max_keepalive_connections: 保持的空闲连接数
+        keepalive_expiry: 空闲连接保持的秒数
+        http2: 安装了h2时使用HTTP/2，多个请求复用同一条连接
+        max_concurrency: 本进程内同时进行的请求上限，超出的请求排队，None为不限
+        concurrency_key: 共享同一个并发上限的键，默认为 base_url + 模型id
+        cache_control: 系统消息标记 cache_control（DashScope等服务的显式缓存），系统提示词和工具定义作为缓存前缀；
+            不标记时支持隐式缓存的服务仍会自动匹配相同前缀
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = True
+    max_concurrency: Optional[int] = None
+    concurrency_key: Optional[str] = None
+    cache_control: bool = False
+
+    def _pool_key(self, kind: str, loop: int) -> Tuple:
+        params = self._get_client_params()
+        return (kind, os.getpid(), loop, tuple(sorted((k, repr(v)) for k, v in params.items())))
+
+    def _http_client(self, kind: str, loop: int):
+        # 调用方持有_lock
+        key = (kind, os.getpid(), loop, str(self.base_url))
+        client = _HTTP_CLIENTS.get(key)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            )
+            http2 = self.http2 and _HTTP2_AVAILABLE
+            cls = httpx.AsyncClient if kind == "async" else httpx.Client
+            client = _HTTP_CLIENTS[key] = cls(limits=limits, http2=http2)
+            log_debug(f"Created {kind} connection pool for {self.base_url} (http2={http2})")
+        return client
+
+    def get_client(self) -> OpenAIClient:
+        if self.http_client is not None:
+            return super().get_client()
+        key = self._pool_key("sync", 0)
+        with _lock:
+            client = _CLIENTS.get(key)
+            if client is None:
+                client = _CLIENTS[key] = OpenAIClient(**self._get_client_params(), http_client=self._http_client("sync", 0))
+        return client
+
+    def get_async_client(self) -> AsyncOpenAIClient:
+        if self.http_client is not None:
+            return super().get_async_client()
+        loop = _loop_id()
+        key = self._pool_key("async", loop)
+        with _lock:
+            client = _CLIENTS.get(key)
+            if client is None:
+                http_client = self._http_client("async", loop)
+                client = _CLIENTS[key] = AsyncOpenAIClient(**self._get_client_params(), http_client=http_client)
+        return client
+
+    def _format_message(self, message: Message) -> Dict[str, Any]:
+        message_dict = super()._format_message(message)
+        if self.cache_control and message.role == "system" and isinstance(message_dict.get("content"), str):
+            message_dict["content"] = [{"type": "text", "text": message_dict["content"], "cache_control": {"type": "ephemeral"}}]
+        return message_dict
+
+    def _limiter(self, kind: str):
+        loop = _loop_id() if kind == "async" else 0
+        key = (os.getpid(), loop, self.concurrency_key or f"{self.base_url}#{self.id}")
+        with _lock:
+            limiter = _LIMITERS.get(key)
+            if limiter is None:
+                cls = asyncio.Semaphore if kind == "async" else threading.BoundedSemaphore
+                limiter = _LIMITERS[key] = cls(self.max_concurrency)
+        return limiter
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        if not self.max_concurrency:
+            yield
+            return
+        with self._limiter("sync"):
+            yield
+
+    @asynccontextmanager
+    async def _aslot(self) -> AsyncIterator[None]:
+        if not self.max_concurrency:
+            yield
+            return
+        async with self._limiter("async"):
+            yield
+
+    def invoke(self, *args, **kwargs):
+        with self._slot():
+            return super().invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        async with self._aslot():
+            return await super().ainvoke(*args, **kwargs)
+
+    def invoke_stream(self, *args, **kwargs):
+        # 流式请求占用名额直到流读完
+        with self._slot():
+            yield from super().invoke_stream(*args, **kwargs)
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        async with self._aslot():
+            async for chunk in super().ainvoke_stream(*args, **kwargs):
+                yield chunk
+
+
+async def aclose_clients() -> None:
+    """关闭当前进程的所有连接池，worker优雅退出时调用"""
+    pid = os.getpid()
+    with _lock:
+        for k in [k for k in _CLIENTS if k[1] == pid]:
+            del _CLIENTS[k]
+        for k in [k for k in _LIMITERS if k[0] == pid]:
+            del _LIMITERS[k]
+        pools = [_HTTP_CLIENTS.pop(k) for k in [k for k in _HTTP_CLIENTS if k[1] == pid]]
+    for pool in pools:
+        try:
+            if isinstance(pool, httpx.AsyncClient):
+                await pool.aclose()
+            else:
+                pool.close()
+        except Exception:
+            # 其他事件循环里建的连接池无法在这里关闭，进程退出时随之释放
+            pass
@@ -0,0 +1,46 @@
+"""
+稳定的提示词前缀：DashScope隐式缓存、Gemini隐式/显式缓存、OpenAI自动缓存都只匹配和之前请求完全相同的开头，
+工具定义、系统提示词里任何一处变化，之后的内容就都不能命中缓存
+agno的 add_datetime_to_instructions 把精确到微秒的当前时间写在系统提示词中间，
+之后的推理工具说明、成功标准等每次都不一样；这里把它挪到末尾并只保留日期
+"""
+import re
+from datetime import date, datetime
+from typing import Any, Optional
+
+_CURRENT_TIME = re.compile(r"^- The current time is [^\n]*\n?", re.M)
+_EMPTY_INFORMATION = re.compile(r"<additional_information>\s*</additional_information>\s*")
+
+
+def stable_system_prompt(content: str, today: Optional[date] = None) -> str:
+    """去掉agno写在中间的当前时间，在末尾补一行当天日期，同一天内系统提示词完全不变"""
+    if not _CURRENT_TIME.search(content):
+        return content
+    content = _EMPTY_INFORMATION.sub("", _CURRENT_TIME.sub("", content)).rstrip()
+    return f"{content}\n\nThe current date is {(today or date.today()).isoformat()}."
+
+
+class StablePromptMixin:
+    """
+    Agent / Team 的系统提示词按 stable_system_prompt 改写，stable_prompt为False时保持agno原样
+    时间只精确到日期，需要精确时间的agent不要打开
+    """
+
+    stable_prompt: bool = True
+
+    def _today(self) -> date:
+        tz = None
+        if getattr(self, "timezone_identifier", None):
+            try:
+                from zoneinfo import ZoneInfo
+
+                tz = ZoneInfo(self.timezone_identifier)
+            except Exception:
+                pass
+        return datetime.now(tz).date()
+
+    def get_system_message(self, *args, **kwargs) -> Optional[Any]:
+        message = super().get_system_message(*args, **kwargs)
+        if self.stable_prompt and message is not None and isinstance(message.content, str):
+            message.content = stable_system_prompt(message.content, self._today())
+        return message
@@ -0,0 +1,106 @@
+import importlib
+import os
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+
+# 设置后 get_model / serve.py / 压测脚本会把所有模型指向这个地址，如 http://127.0.0.1:8900/v1
+STUB_ENV = "AGNO_STUB_MODEL_URL"
+
+# provider -> "模块:类"，第一次取该provider的模型时才导入，入口脚本不用在顶部导入openai、google-genai等SDK
+PROVIDERS: Dict[str, str] = {
+    "openai_like": f"{__package__}.pooled:PooledOpenAILike",
+    "google": f"{__package__}.gemini_cache:CachedGemini",
+}
+
+
+def stub_url() -> Optional[str]:
+    return os.getenv(STUB_ENV) or None
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """
+    一个模型的配置
+    :param id: 模型id
+    :param provider: PROVIDERS中的名称
+    :param base_url: 默认服务地址，仅OpenAI兼容模型需要
+    :param api_key_env: 存放API Key的环境变量，None时由provider自己读取
+    :param base_url_env: 可覆盖服务地址的环境变量
+    :param max_concurrency: 每个进程同时进行的请求上限，None为不限，仅OpenAI兼容模型支持
+    :param context_cache: 服务端缓存系统提示词和工具定义：google为显式上下文缓存，OpenAI兼容模型为系统消息标记cache_control
+    """
+
+    id: str
+    provider: str = "openai_like"
+    base_url: Optional[str] = None
+    api_key_env: Optional[str] = None
+    base_url_env: Optional[str] = None
+    max_concurrency: Optional[int] = None
+    context_cache: bool = False
+
+
+MODELS: Dict[str, ModelSpec] = {
+    # qwen-turbo / qwen3-235b-a22b
+    # DashScope对相同的提示词前缀自动做隐式缓存，不需要标记
+    "qwen": ModelSpec(
+        id="qwen-turbo",
+        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1/",
+        api_key_env="QWEN_API_KEY",
+        base_url_env="QWEN_BASE_URL",
+    ),
+    "gemini": ModelSpec(
+        id="gemini-2.0-flash",
+        base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+        api_key_env="GEMINI_API_KEY",
+        base_url_env="GEMINI_BASE_URL",
+        # 免费额度的RPM很低，并发高了只会换来429
+        max_concurrency=8,
+    ),
+    # google-genai原生接口，API Key读取 GOOGLE_API_KEY
+    # 连接由google-genai SDK自己管理，不走共享连接池，也不支持max_concurrency；需要限流时用上面的OpenAI兼容接口"gemini"
+    # 显式上下文缓存按agent打开：系统提示词稳定的agent用 get_model("gemini-native", context_cache=True)
+    "gemini-native": ModelSpec(id="gemini-2.0-flash", provider="google"),
+}
+
+
+def register_model(name: str, spec: ModelSpec) -> None:
+    MODELS[name] = spec
+
+
+def _provider_class(provider: str) -> Any:
+    module_name, _, cls = PROVIDERS[provider].partition(":")
+    return getattr(importlib.import_module(module_name), cls)
+
+
+def get_model(name: str = "qwen", **overrides) -> Any:
+    """
+    按名称取模型，如 get_model("qwen")、get_model("gemini", id="gemini-2.5-flash")
+    模型对象很轻，每次调用返回新实例；provider的SDK在第一次取模型时才导入。
+    OpenAI兼容模型的客户端在第一次请求时才创建，同一base_url的所有模型共用一个连接池，同名模型共用一个并发上限。
+    设置了 AGNO_STUB_MODEL_URL 时任何provider都换成指向假模型服务的OpenAI兼容模型
+    :param name: MODELS中的名称
+    :param overrides: 覆盖ModelSpec或模型类的字段
+    """
+    if name not in MODELS:
+        raise KeyError(f"Unknown model {name!r}, registered: {', '.join(MODELS)}")
+    spec_fields = {k: overrides.pop(k) for k in list(overrides) if k in ModelSpec.__dataclass_fields__}
+    spec = replace(MODELS[name], **spec_fields)
+
+    if stub_url():
+        params: Dict[str, Any] = dict(id=spec.id, api_key="stub", base_url=stub_url(), concurrency_key=f"{name}:{spec.id}")
+        params.update(overrides)
+        return _provider_class("openai_like")(**params)
+
+    params = dict(id=spec.id)
+    if spec.api_key_env:
+        params["api_key"] = os.getenv(spec.api_key_env)
+    if spec.provider == "openai_like":
+        params.update(
+            base_url=(spec.base_url_env and os.getenv(spec.base_url_env)) or spec.base_url,
+            max_concurrency=spec.max_concurrency,
+            concurrency_key=f"{name}:{spec.id}",
+        )
+    if spec.context_cache:
+        params["cache_control" if spec.provider == "openai_like" else "context_cache"] = True
+    params.update(overrides)
+    return _provider_class(spec.provider)(**params)
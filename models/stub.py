@@ -0,0 +1,63 @@
+from typing import Any, Optional, Set
+
+from agno.agent import Agent
+from agno.models.base import Model
+from agno.team.team import Team
+from agno.utils.log import log_debug
+from agno.workflow import Workflow
+
+from .pooled import PooledOpenAILike
+from .registry import STUB_ENV, stub_url
+
+
+def stub_model(model: Optional[Model], base_url: str) -> PooledOpenAILike:
+    """与原模型同id的假模型，原模型的id会出现在请求里，便于在假模型服务的脚本里区分"""
+    return PooledOpenAILike(id=getattr(model, "id", None) or "stub", api_key="stub", base_url=base_url)
+
+
+def _stub_tools(tools: Any) -> None:
+    # 延迟导入，models包不依赖tools包
+    from tools import CachedDuckDuckGoTools, CachedYFinanceTools, StubFinanceSource, StubSearchBackend
+
+    for toolkit in tools or []:
+        if isinstance(toolkit, CachedYFinanceTools):
+            toolkit.source = StubFinanceSource()
+        elif isinstance(toolkit, CachedDuckDuckGoTools):
+            toolkit.backend = StubSearchBackend()
+
+
+def point_at_stub(obj: Any, base_url: Optional[str] = None, offline_tools: bool = True, _seen: Optional[Set[int]] = None) -> Any:
+    """
+    把Agent/Team/Workflow（含团队成员、Workflow里的agent、记忆和推理模型）的所有模型换成假模型服务，
+    offline_tools为True时YFinance和DuckDuckGo工具也换成本地假数据，整条链路不联网
+    :param obj: Agent、Team或Workflow
+    :param base_url: 假模型服务地址，默认读取环境变量 AGNO_STUB_MODEL_URL
+    :return: obj本身
+    """
+    base_url = base_url or stub_url()
+    if base_url is None:
+        raise ValueError(f"No stub url given and {STUB_ENV} is not set")
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return obj
+    seen.add(id(obj))
+
+    if isinstance(obj, (Agent, Team)):
+        for attr in ("model", "reasoning_model", "parser_model"):
+            if getattr(obj, attr, None) is not None:
+                setattr(obj, attr, stub_model(getattr(obj, attr), base_url))
+        memory = getattr(obj, "memory", None)
+        for holder in (memory, getattr(memory, "memory_manager", None), getattr(memory, "summary_manager", None)):
+            if holder is not None and getattr(holder, "model", None) is not None:
+                holder.model = stub_model(holder.model, base_url)
+        if offline_tools:
+            _stub_tools(obj.tools)
+        for member in getattr(obj, "members", None) or []:
+            point_at_stub(member, base_url, offline_tools, seen)
+    elif isinstance(obj, Workflow):
+        # Workflow的agent/team一般定义为类属性，实例上也可能有
+        for value in list(vars(type(obj)).values()) + list(vars(obj).values()):
+            if isinstance(value, (Agent, Team)):
+                point_at_stub(value, base_url, offline_tools, seen)
+    log_debug(f"Pointed {type(obj).__name__} {getattr(obj, 'name', '')} at stub model server {base_url}")
+    return obj
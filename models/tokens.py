@@ -0,0 +1,15 @@
+"""
+token数估计，不依赖分词器：models（缓存门槛）、tools（输出预算）、telemetry（用量拆分）共用
+"""
+import re
+from typing import Optional
+
+_CJK = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """粗略估计token数：中日韩字符每个约1个，其余约4个字符1个"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
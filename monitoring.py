@@ -1,26 +1,18 @@
-from agno.agent import Agent
+from models import get_model
+from telemetry import InstrumentedAgent, get_latency_store
+from telemetry.dashboard import print_dashboard
 
-from agno.models.openai import OpenAILike
-from agno.models.google import Gemini
-import os
-GEMINI_API_KEY= os.getenv("GEMINI_API_KEY")
-QWEN_API_KEY=os.getenv("QWEN_API_KEY")
  
 
-qw_model = OpenAILike(
-    id= 'qwen-turbo', # qwen-turbo / qwen3-235b-a22b / gemini-2.0-flash
-    api_key=QWEN_API_KEY,
-    base_url='https://dashscope.aliyuncs.com/compatible-mode/v1/',
-)
-gemini_model = OpenAILike(
-    id='gemini-2.0-flash',
-    api_key=GEMINI_API_KEY,
-    base_url='https://generativelanguage.googleapis.com/v1beta/openai/',
-)
 
-agent = Agent(
-    model=Gemini(id="gemini-2.0-flash"),
+# Every run records model TTFT, generation time, tool calls and knowledge retrieval to tmp/telemetry.db
+# `python -m telemetry.dashboard` shows p50/p95 per stage across runs
+agent = InstrumentedAgent(
+    name="Monitoring Agent",
+    model=get_model("gemini-native"),
     markdown=True, 
     monitoring=True
     )
-agent.print_response("Share a 3 sentence horror story.")
\ No newline at end of file
+if __name__ == "__main__":
+    agent.print_response("Share a 3 sentence horror story.", stream=True)
+    print_dashboard(get_latency_store(), component=agent.name)
@@ -1,65 +1,59 @@
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from agno.playground import Playground
-from agno.storage.sqlite import SqliteStorage
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.tools.yfinance import YFinanceTools
 
-from agno.models.openai import OpenAILike
-from agno.models.google import Gemini
-import os
-GEMINI_API_KEY= os.getenv("GEMINI_API_KEY")
-QWEN_API_KEY=os.getenv("QWEN_API_KEY")
+from models import get_model
+from storage import WalRunHistorySqliteStorage
+from telemetry import InstrumentedAgent
+from tools import CachedDuckDuckGoTools, CachedYFinanceTools, LocalAShareTools
  
 
-qw_model = OpenAILike(
-    id= 'qwen-turbo', # qwen-turbo / qwen3-235b-a22b / gemini-2.0-flash
-    api_key=QWEN_API_KEY,
-    base_url='https://dashscope.aliyuncs.com/compatible-mode/v1/',
-)
-gemini_model = OpenAILike(
-    id='gemini-2.0-flash',
-    api_key=GEMINI_API_KEY,
-    base_url='https://generativelanguage.googleapis.com/v1beta/openai/'
-)
 
 agent_storage: str = "tmp/agents.db"
 
-web_agent = Agent(
+# Per-stage latency of every run goes to tmp/telemetry.db, see `python -m telemetry.dashboard`
+web_agent = InstrumentedAgent(
     name="Web Agent",
-    model=gemini_model,
+    # 固定id，多worker时每个进程里的agent id一致
+    agent_id="web-agent",
+    model=get_model("gemini"),
     tools=[
-        DuckDuckGoTools()
+        CachedDuckDuckGoTools()
         ],
     instructions=["Always include sources"],
-    # Store the agent sessions in a sqlite database
-    storage=SqliteStorage(table_name="web_agent", db_file=agent_storage),
+    # Store the agent sessions in a sqlite database, WAL mode with a connection pool per worker and batched commits
+    storage=WalRunHistorySqliteStorage(table_name="web_agent", db_file=agent_storage, num_history_runs=5),
     # Adds the current date and time to the instructions
     add_datetime_to_instructions=True,
     # Adds the history of the conversation to the messages
     add_history_to_messages=True,
     # Number of history responses to add to the messages
     num_history_responses=5,
+    # Older turns are folded into a rolling summary by the storage, add it to the system message
+    add_session_summary_references=True,
     # Adds markdown formatting to the messages
     markdown=True,
 )
 
-finance_agent = Agent(
+finance_agent = InstrumentedAgent(
     name="Finance Agent",
-    model=Gemini(id="gemini-2.0-flash"),# gemini_model, # OpenAIChat(id="gpt-4o"),
+    agent_id="finance-agent",
+    model=get_model("gemini-native"),
     tools=[
-        YFinanceTools(stock_price=True, analyst_recommendations=True, company_info=True, company_news=True)
+        CachedYFinanceTools(stock_price=True, analyst_recommendations=True, company_info=True, company_news=True),
+        # A股财报/公告/舆情走本地爬取数据，不需要联网
+        LocalAShareTools(),
         ],
     instructions=["Always use tables to display data"],
-    storage=SqliteStorage(table_name="finance_agent", db_file=agent_storage),
+    storage=WalRunHistorySqliteStorage(table_name="finance_agent", db_file=agent_storage, num_history_runs=5),
     add_datetime_to_instructions=True,
     add_history_to_messages=True,
     num_history_responses=5,
+    add_session_summary_references=True,
     markdown=True,
 )
 
 playground = Playground(agents=[web_agent, finance_agent])
 app = playground.get_app()
 
+# 开发模式；生产环境用 python serve.py playground:app --workers 4
 if __name__ == "__main__":
     playground.serve("playground:app", reload=True)
\ No newline at end of file
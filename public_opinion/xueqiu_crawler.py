@@ -13,7 +13,7 @@ import re
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from crawler.logger_config import create_logger
+    from public_opinion.logger_config import create_logger
 except ImportError:
     # 如果相对导入失败，尝试直接导入
     from logger_config import create_logger
@@ -0,0 +1,44 @@
+"""
+研报模块
+个股研报工作流：并行整理本地报表、比率、公告和舆情，按数据版本缓存各阶段结果，一次模型调用合成研报
+批量生成：多只股票并发，限制模型并发和各provider的QPS，检查点支持断点续跑
+
+子模块可以直接用 `python -m research.xxx` 运行，所以在第一次访问对应名称时才导入
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .artifacts import ArtifactStore
+    from .batch import BatchCheckpoint, BatchReportRunner, ModelGate
+    from .stages import STAGES, Stage
+    from .workflow import ResearchReportWorkflow, StageResult
+
+_LAZY = {
+    'ArtifactStore': '.artifacts',
+    'BatchCheckpoint': '.batch',
+    'BatchReportRunner': '.batch',
+    'ModelGate': '.batch',
+    'STAGES': '.stages',
+    'Stage': '.stages',
+    'ResearchReportWorkflow': '.workflow',
+    'StageResult': '.workflow',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    'ArtifactStore',
+    'BatchCheckpoint',
+    'BatchReportRunner',
+    'ModelGate',
+    'STAGES',
+    'Stage',
+    'ResearchReportWorkflow',
+    'StageResult',
+]
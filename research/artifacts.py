@@ -0,0 +1,48 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+ARTIFACT_DIR = "tmp/report_artifacts"
+
+
+class ArtifactStore:
+    """
+    研报各阶段的中间结果，每只股票每个阶段一个JSON文件 {root}/{code}/{stage}.json，只保留最新版本
+    版本号不一致时视为未命中，由调用方重新生成后覆盖
+    :param root: 保存目录
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR):
+        self.root = root
+
+    def path(self, code: str, stage: str) -> str:
+        return os.path.join(self.root, code, f"{stage}.json")
+
+    def read(self, code: str, stage: str) -> Optional[Dict[str, Any]]:
+        path = self.path(code, stage)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, code: str, stage: str, version: str) -> Optional[str]:
+        """版本一致时返回内容，否则返回None"""
+        record = self.read(code, stage)
+        if record is None or record.get("version") != version:
+            return None
+        return record["content"]
+
+    def put(self, code: str, stage: str, version: str, content: str, **extra: Any) -> None:
+        path = self.path(code, stage)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {"version": version, "content": content, "created_at": time.time(), **extra}
+        # 同一只股票的不同阶段可能在不同线程里同时写，临时文件名带上线程id
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, path)
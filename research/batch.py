@@ -0,0 +1,281 @@
+"""
+批量生成研报：一组股票并发运行 ResearchReportWorkflow
+- 模型调用受两层限制：每个provider一个令牌桶（QPS），以及所有模型共用的并发上限，股票按顺序轮流分给 --models
+  先取令牌再占并发名额，限速慢的provider排队时不占名额，不会拖住其他provider
+- 所有股票最近年报的对比表只计算一次，作为行业背景放在每份研报消息的开头
+- 每只股票的状态写入检查点 tmp/research_batches/{batch}.json，中断或失败后用同一个 --batch 重跑，
+  已完成的跳过，失败的重新执行
+- 结束时输出每分钟生成的研报数和单份研报耗时的p50/p95
+
+    python -m research.batch 600519 000858 000568 002304 --models qwen gemini --batch baijiu
+    python -m research.batch 600519 000858 000568 002304 --batch baijiu      # 只重跑失败和未完成的
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agno.agent import Agent
+from agno.run.response import RunResponseContentEvent
+from agno.utils.log import log_info, log_warning
+
+from fundamental.universe import normalize_code
+from models import get_model
+from telemetry.store import percentile
+from tools.local_ashare import LocalDataIndex
+from tools.ratelimit import TokenBucket
+
+from .artifacts import ArtifactStore
+from .stages import INDUSTRY_REVISION, build_industry, data_version, industry_files
+from .workflow import WRITER_INSTRUCTIONS, ResearchReportWorkflow
+
+BATCH_DIR = "tmp/research_batches"
+REPORT_DIR = "tmp/research_reports"
+# 行业背景在ArtifactStore里的代码目录，阶段名为批次名
+INDUSTRY_CODE = "_industry"
+
+# provider -> (每秒请求数, 突发数)；provider取模型名第一段，gemini和gemini-native共用一个令牌桶
+RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "qwen": (2.0, 4),
+    # 免费额度约15 RPM
+    "gemini": (0.25, 2),
+}
+DEFAULT_RATE_LIMIT = (1.0, 2)
+
+
+def provider_of(model: str) -> str:
+    return model.split("-")[0]
+
+
+class ModelGate:
+    """
+    一次模型调用的入场券：先从provider的令牌桶取令牌，再占全局并发名额，退出时归还并发名额
+    顺序反过来的话，等令牌的调用（如gemini 0.25 QPS）会一直占着名额，其他provider的调用跟着排队
+    :param semaphore: 所有模型共用的并发上限
+    :param bucket: 该provider的令牌桶
+    """
+
+    def __init__(self, semaphore: threading.Semaphore, bucket: TokenBucket):
+        self.semaphore = semaphore
+        self.bucket = bucket
+        self.waited = 0.0
+
+    def __enter__(self) -> "ModelGate":
+        start = time.perf_counter()
+        self.bucket.acquire()
+        self.semaphore.acquire()
+        self.waited += time.perf_counter() - start
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.semaphore.release()
+
+
+@dataclass
+class BatchItem:
+    """
+    检查点里一只股票的状态
+    :param status: pending / done / failed
+    :param model: 写作模型在 models.MODELS 里的名称
+    :param seconds: 最近一次执行的耗时，包括排队等待模型的时间
+    :param waited: 最近一次执行等待并发名额和令牌的秒数
+    """
+
+    code: str
+    model: str
+    status: str = "pending"
+    attempts: int = 0
+    cached: bool = False
+    seconds: Optional[float] = None
+    waited: Optional[float] = None
+    version: Optional[str] = None
+    path: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchCheckpoint:
+    """
+    批次检查点，每只股票执行完立即整体重写（先写临时文件再替换），进程中途退出也不会留下半个文件
+    :param path: JSON文件路径
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.items: Dict[str, BatchItem] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.items = {code: BatchItem(**item) for code, item in json.load(f)["items"].items()}
+
+    def add(self, code: str, model: str) -> BatchItem:
+        """已有的条目保留状态，未完成的换成新分配的模型"""
+        with self._lock:
+            item = self.items.get(code)
+            if item is None:
+                item = self.items[code] = BatchItem(code, model)
+            elif item.status != "done":
+                item.model = model
+            return item
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"updated_at": time.time(), "items": {c: asdict(i) for c, i in self.items.items()}}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+
+
+class BatchReportRunner:
+    """
+    :param codes: 股票代码，重复的只生成一次
+    :param models: 写作模型名称，股票按顺序轮流分配
+    :param batch: 批次名，决定检查点和输出目录
+    :param workers: 同时处理的股票数，数据整理阶段不占模型名额
+    :param max_concurrency: 所有模型合计的并发调用上限
+    :param rate_limits: provider -> (每秒请求数, 突发数)，默认 RATE_LIMITS
+    :param crawl: 本地没有数据时是否调用爬虫补抓
+    :param industry: 是否把所有股票的年报对比表作为共享背景
+    """
+
+    def __init__(
+        self,
+        codes: List[str],
+        models: List[str],
+        batch: str = "default",
+        workers: int = 4,
+        max_concurrency: int = 4,
+        rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+        index: Optional[LocalDataIndex] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        crawl: bool = True,
+        industry: bool = True,
+        batch_dir: str = BATCH_DIR,
+        report_dir: str = REPORT_DIR,
+    ):
+        self.codes = list(dict.fromkeys(normalize_code(c) for c in codes))
+        self.models = models
+        self.batch = batch
+        self.workers = workers
+        self.index = index or LocalDataIndex()
+        self.artifacts = artifacts or ArtifactStore()
+        self.crawl = crawl
+        self.industry = industry
+        self.out_dir = os.path.join(report_dir, batch)
+        self.checkpoint = BatchCheckpoint(os.path.join(batch_dir, f"{batch}.json"))
+        self._semaphore = threading.Semaphore(max_concurrency)
+        limits = {**RATE_LIMITS, **(rate_limits or {})}
+        self._buckets = {p: TokenBucket(*limits.get(p, DEFAULT_RATE_LIMIT)) for p in {provider_of(m) for m in models}}
+
+    def industry_context(self) -> str:
+        """所有股票最近年报的对比表，报表文件不变时读缓存"""
+        version = data_version(industry_files(self.index, self.codes), f"industry@{INDUSTRY_REVISION}")
+        version = hashlib.md5(f"{','.join(self.codes)}|{version}".encode()).hexdigest()[:16]
+        content = self.artifacts.get(INDUSTRY_CODE, self.batch, version)
+        if content is None:
+            content = build_industry(self.index, self.codes)
+            self.artifacts.put(INDUSTRY_CODE, self.batch, version, content, codes=self.codes)
+        return content
+
+    def _run_item(self, item: BatchItem, context: Optional[str]) -> BatchItem:
+        gate = ModelGate(self._semaphore, self._buckets[provider_of(item.model)])
+        item.attempts += 1
+        start = time.perf_counter()
+        try:
+            writer = Agent(model=get_model(item.model), instructions=WRITER_INSTRUCTIONS, markdown=True)
+            workflow = ResearchReportWorkflow(index=self.index, artifacts=self.artifacts, crawl=self.crawl, gate=gate, writer=writer)
+            content = "".join(
+                event.content
+                for event in workflow.run(code=item.code, context=context)
+                if isinstance(event, RunResponseContentEvent) and isinstance(event.content, str)
+            )
+            if not content.strip():
+                raise RuntimeError("empty report")
+            record = workflow.session_state["reports"][item.code]
+            item.path = os.path.join(self.out_dir, f"{item.code}.md")
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(item.path, "w", encoding="utf-8") as f:
+                f.write(content)
+            item.status, item.cached, item.version, item.error = "done", record["cached"], record["version"], None
+        except Exception as e:
+            log_warning(f"Report {item.code} ({item.model}) failed: {e}")
+            item.status, item.error = "failed", f"{type(e).__name__}: {e}"
+        item.seconds = round(time.perf_counter() - start, 3)
+        item.waited = round(gate.waited, 3)
+        self.checkpoint.save()
+        return item
+
+    def run(self, restart: bool = False) -> Dict[str, object]:
+        """
+        执行未完成的股票，返回本次运行的统计
+        :param restart: 忽略检查点，所有股票都重新执行（各阶段和研报仍按数据版本读缓存）
+        """
+        items = [self.checkpoint.add(code, self.models[i % len(self.models)]) for i, code in enumerate(self.codes)]
+        todo = [item for item in items if restart or item.status != "done"]
+        log_info(f"Batch {self.batch}: {len(todo)}/{len(items)} reports to generate")
+        context = self.industry_context() if self.industry and todo else None
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="research-batch") as pool:
+            done = list(pool.map(lambda item: self._run_item(item, context), todo))
+        elapsed = time.perf_counter() - start
+
+        succeeded = [item for item in done if item.status == "done"]
+        generated = [item for item in succeeded if not item.cached]
+        latencies = [item.seconds for item in generated]
+        return {
+            "total": len(items),
+            "skipped": len(items) - len(todo),
+            "done": len(succeeded),
+            "cached": len(succeeded) - len(generated),
+            "failed": len(done) - len(succeeded),
+            "seconds": round(elapsed, 2),
+            # 只算真正调用了模型的研报
+            "reports_per_min": round(len(generated) / elapsed * 60, 2) if generated and elapsed else 0.0,
+            "p50_s": percentile(latencies, 0.5),
+            "p95_s": percentile(latencies, 0.95),
+            "waited_s": round(sum(item.waited or 0 for item in generated), 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate research reports for many tickers concurrently")
+    parser.add_argument("codes", nargs="+")
+    parser.add_argument("--models", nargs="+", default=["qwen"], help="写作模型，股票按顺序轮流分配")
+    parser.add_argument("--batch", default="default", help="批次名，同名批次从检查点继续")
+    parser.add_argument("--workers", type=int, default=4, help="同时处理的股票数")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="所有模型合计的并发调用上限")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点，所有股票重新执行")
+    parser.add_argument("--no-crawl", action="store_true", help="只用本地数据，不调用爬虫")
+    parser.add_argument("--no-industry", action="store_true", help="不加行业对比背景")
+    args = parser.parse_args()
+
+    runner = BatchReportRunner(
+        args.codes,
+        args.models,
+        batch=args.batch,
+        workers=args.workers,
+        max_concurrency=args.max_concurrency,
+        crawl=not args.no_crawl,
+        industry=not args.no_industry,
+    )
+    stats = runner.run(restart=args.restart)
+    for item in runner.checkpoint.items.values():
+        line = f"{item.code:>10} {item.model:>8} {item.status:>7} attempts={item.attempts}"
+        if item.seconds is not None:
+            line += f" {item.seconds:.1f}s (waited {item.waited or 0:.1f}s){' cached' if item.cached else ''}"
+        print(line + (f"  {item.error}" if item.error else ""))
+    print(
+        f"{stats['done']} done ({stats['cached']} cached, {stats['skipped']} skipped), {stats['failed']} failed in {stats['seconds']}s; "
+        f"{stats['reports_per_min']} reports/min, p50 {stats['p50_s'] or 0:.1f}s p95 {stats['p95_s'] or 0:.1f}s"
+    )
+    print(f"reports: {runner.out_dir}  checkpoint: {runner.checkpoint.path}")
+
+
+if __name__ == "__main__":
+    main()
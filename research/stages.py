@@ -0,0 +1,216 @@
+"""
+研报工作流的数据阶段：每个阶段从本地数据（tools.local_ashare.LocalDataIndex）生成一段给模型看的摘要
+- 数据版本：阶段依赖的文件的 路径+大小+修改时间 加上阶段生成逻辑的修订号的哈希，
+  文件和生成逻辑都不变则版本不变、直接用缓存的摘要；改了某个阶段的build函数或参数时，把该阶段的revision加1
+- 本地没有数据时调用 scheduler.sources 里对应的爬虫补抓
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+
+from tools.local_ashare import STATEMENTS, LocalAShareTools, LocalDataIndex, wide_statement
+
+# 空数据的版本号，补抓到数据后版本变化，摘要会重新生成
+EMPTY_VERSION = "empty"
+
+
+def local_code(code: str) -> str:
+    """本地数据目录里的代码：A股6位数字，港股5位数字（不带.HK）"""
+    return code[:-3] if code.endswith(".HK") else code
+
+
+def data_version(paths: List[str], revision: str = "") -> str:
+    """
+    :param paths: 依赖的本地文件
+    :param revision: 生成逻辑的标识，生成逻辑变了版本也跟着变
+    """
+    if not paths:
+        return EMPTY_VERSION
+    digest = hashlib.md5(f"{revision}\n".encode())
+    for path in sorted(paths):
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def statement_frame(index: LocalDataIndex, code: str, name: str) -> Optional[pd.DataFrame]:
+    """某张报表按报告期升序的宽表，列名统一为A股字段名；港股长表按映射表透视并改名"""
+    path = index.statements.get(local_code(code), {}).get(name)
+    if path is None:
+        return None
+    df = wide_statement(index.load(path), name)
+    if "REPORT_DATE" not in df.columns:
+        return None
+    df = df.copy()
+    df["REPORT_DATE"] = df["REPORT_DATE"].astype(str).str[:10]
+    return df.drop_duplicates("REPORT_DATE").set_index("REPORT_DATE").sort_index()
+
+
+def statement_files(index: LocalDataIndex, code: str) -> List[str]:
+    return list(index.statements.get(local_code(code), {}).values())
+
+
+def announcement_files(index: LocalDataIndex, code: str) -> List[str]:
+    return index.announcements.get(local_code(code), [])
+
+
+def sentiment_files(prefix: str) -> Callable[[LocalDataIndex, str], List[str]]:
+    def files(index: LocalDataIndex, code: str) -> List[str]:
+        return [p for p in index.sentiment.get(local_code(code), []) if os.path.basename(p).startswith(prefix)]
+
+    return files
+
+
+def build_statements(index: LocalDataIndex, code: str, periods: int = 8) -> str:
+    tools = LocalAShareTools(index=index)
+    parts = []
+    for name in STATEMENTS:
+        text = tools.get_financial_statement(local_code(code), name, page_size=periods)
+        if not text.startswith("No local"):
+            parts.append(f"## {name}（最近{periods}期）\n{text.split(chr(10), 1)[1].strip()}")
+    return "\n\n".join(parts)
+
+
+def _ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    return numerator / denominator.where(denominator != 0)
+
+
+def ratio_frame(index: LocalDataIndex, code: str) -> Optional[pd.DataFrame]:
+    """由三大报表计算的核心比率，按报告期升序对齐；没有利润表时为None"""
+    profit = statement_frame(index, code, "利润表")
+    if profit is None:
+        return None
+    balance = statement_frame(index, code, "资产负债表")
+    cashflow = statement_frame(index, code, "现金流量表")
+    frame = profit.join(balance, how="left", rsuffix="_balance") if balance is not None else profit
+    if cashflow is not None:
+        frame = frame.join(cashflow, how="left", rsuffix="_cashflow")
+
+    def column(name: str) -> pd.Series:
+        return pd.to_numeric(frame[name], errors="coerce") if name in frame.columns else pd.Series(float("nan"), index=frame.index)
+
+    ratios = pd.DataFrame(index=frame.index)
+    ratios["毛利率%"] = (1 - _ratio(column("OPERATE_COST"), column("OPERATE_INCOME"))) * 100
+    ratios["净利率%"] = _ratio(column("PARENT_NETPROFIT"), column("OPERATE_INCOME")) * 100
+    # 报告期内的累计利润除以期末权益，季报期间不是年化值
+    ratios["ROE%"] = _ratio(column("PARENT_NETPROFIT"), column("PARENT_EQUITY")) * 100
+    ratios["资产负债率%"] = _ratio(column("TOTAL_LIAB"), column("TOTAL_ASSETS")) * 100
+    ratios["经营现金流/净利润"] = _ratio(column("NET_CASH_OPERATE"), column("NETPROFIT"))
+    ratios["营收同比%"] = column("OPERATE_INCOME_YOY")
+    ratios["归母净利同比%"] = column("PARENT_NETPROFIT_YOY")
+    ratios["营业收入(亿)"] = column("OPERATE_INCOME") / 1e8
+    ratios["归母净利润(亿)"] = column("PARENT_NETPROFIT") / 1e8
+    return ratios
+
+
+def build_ratios(index: LocalDataIndex, code: str, periods: int = 8) -> str:
+    ratios = ratio_frame(index, code)
+    if ratios is None:
+        return ""
+    ratios = ratios.drop(columns=["营业收入(亿)", "归母净利润(亿)"])
+    ratios = ratios.dropna(axis=1, how="all").dropna(axis=0, how="all").tail(periods)
+    if ratios.empty:
+        return ""
+    return ratios.iloc[::-1].round(2).to_csv()
+
+
+# build_industry 的修订号，改了对比表的内容或格式时加1
+INDUSTRY_REVISION = 1
+
+
+def industry_files(index: LocalDataIndex, codes: List[str]) -> List[str]:
+    return [path for code in codes for path in statement_files(index, code)]
+
+
+def build_industry(index: LocalDataIndex, codes: List[str]) -> str:
+    """多只股票最近一个年报期的规模和比率对比表，批量生成时作为所有研报共用的行业背景"""
+    rows = []
+    for code in codes:
+        ratios = ratio_frame(index, code)
+        if ratios is None:
+            continue
+        annual = ratios[ratios.index.str.endswith("12-31")].dropna(how="all")
+        if not annual.empty:
+            rows.append(annual.iloc[-1].rename(code).to_frame().T.assign(报告期=annual.index[-1]))
+    if not rows:
+        return ""
+    table = pd.concat(rows).dropna(axis=1, how="all")
+    columns = ["报告期"] + [c for c in table.columns if c != "报告期"]
+    return f"同行业{len(rows)}家公司最近年报对比\n" + table[columns].round(2).to_csv(index_label="代码")
+
+
+def _find_column(df: pd.DataFrame, keywords: Tuple[str, ...]) -> Optional[str]:
+    return next((c for c in df.columns if any(k in str(c) for k in keywords)), None)
+
+
+def build_announcements(index: LocalDataIndex, code: str, limit: int = 30) -> str:
+    """最近的公告标题，按日期倒序；上交所、深交所表格的列名不同，按列名里的关键字找标题和日期列"""
+    lines = set()
+    for path in announcement_files(index, code):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        title_col, date_col = _find_column(df, ("标题", "名称")), _find_column(df, ("时间", "日期"))
+        if title_col is None or date_col is None:
+            continue
+        lines.update(f"{d.strip()[:10]} {t.strip()}" for d, t in zip(df[date_col], df[title_col]) if t.strip())
+    lines = sorted(lines, reverse=True)[:limit]
+    return f"最近{len(lines)}条公告（日期 标题）\n" + "\n".join(lines) if lines else ""
+
+
+def build_sentiment(prefix: str) -> Callable[[LocalDataIndex, str], str]:
+    def build(index: LocalDataIndex, code: str, top: int = 15) -> str:
+        paths = sentiment_files(prefix)(index, code)
+        if not paths:
+            return ""
+        df = pd.concat([index.load(p) for p in paths], ignore_index=True)
+        if "title" not in df.columns:
+            return ""
+        df = df.drop_duplicates("title")
+        dates = df["parsed_time"].dropna().astype(str).str[:10] if "parsed_time" in df.columns else pd.Series(dtype=str)
+        lines = [f"{len(df)}条帖子" + (f"，{dates.min()} 至 {dates.max()}" if len(dates) else "")]
+        for col, label in (("read_count", "总阅读"), ("reply_count", "总评论")):
+            if col in df.columns:
+                lines[0] += f"，{label}{int(pd.to_numeric(df[col], errors='coerce').sum())}"
+        if "read_count" in df.columns:
+            df = df.sort_values("read_count", ascending=False)
+        lines.append(f"阅读量最高的{min(top, len(df))}条：")
+        for _, row in df.head(top).iterrows():
+            date = str(row.get("parsed_time", ""))[:10]
+            lines.append(f"{date} {str(row['title']).strip()}")
+        return "\n".join(lines)
+
+    return build
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    :param name: 阶段名，也是缓存的键
+    :param title: 合成报告时该段数据的标题
+    :param files: (index, code) -> 依赖的本地文件，决定数据版本
+    :param build: (index, code) -> 摘要文本，没有数据时返回空字符串
+    :param sources: 本地没有数据时补抓用的 scheduler.sources.SOURCES 名称
+    :param revision: 生成逻辑的修订号，改了build函数或其参数（期数、条数）后加1，旧的摘要和研报随之失效
+    """
+
+    name: str
+    title: str
+    files: Callable[[LocalDataIndex, str], List[str]]
+    build: Callable[[LocalDataIndex, str], str]
+    sources: Tuple[str, ...] = ()
+    revision: int = 1
+
+    def version(self, index: LocalDataIndex, code: str) -> str:
+        return data_version(self.files(index, code), f"{self.name}@{self.revision}")
+
+
+STAGES: List[Stage] = [
+    Stage("statements", "三大会计报表", statement_files, build_statements, ("financial_reports",)),
+    # 比率由报表计算，和报表共用数据版本；报表阶段负责补抓
+    Stage("ratios", "核心财务比率", statement_files, build_ratios),
+    Stage("announcements", "交易所公告", announcement_files, build_announcements, ("sse", "szse")),
+    Stage("eastmoney", "东方财富舆情", sentiment_files("eastmoney"), build_sentiment("eastmoney"), ("eastmoney",)),
+    Stage("xueqiu", "雪球舆情", sentiment_files("xueqiu"), build_sentiment("xueqiu"), ("xueqiu_discussions", "xueqiu_news")),
+]
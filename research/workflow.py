@@ -0,0 +1,188 @@
+"""
+个股研报工作流
+1. 补抓：本地缺少的数据（报表、公告、舆情）并行调用对应爬虫
+2. 整理：报表、比率、公告、东方财富和雪球舆情各阶段并行生成摘要，按数据版本缓存，数据没变的阶段直接读缓存
+3. 合成：所有摘要拼成一条消息，一次模型调用写成研报；所有阶段版本都没变时直接返回上次的研报
+
+新增一条公告后重新生成，只有公告阶段和最后的合成会重新执行
+
+    python -m research.workflow 600519
+    python -m research.workflow 002594 --refresh --no-crawl
+"""
+import argparse
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import ContextManager, Dict, Iterator, List, Optional
+
+from agno.agent import Agent
+from agno.run.response import RunResponseContentEvent, RunResponseEvent
+from agno.utils.log import log_debug, log_info, log_warning
+from agno.utils.pprint import pprint_run_response
+from agno.workflow import Workflow
+
+from fundamental.universe import normalize_code
+from models import get_model
+from tools.local_ashare import LocalDataIndex
+
+from .artifacts import ArtifactStore
+from .stages import EMPTY_VERSION, STAGES, Stage
+
+REPORT_STAGE = "report"
+
+WRITER_INSTRUCTIONS = [
+    "You are a sell-side equity analyst writing a research report in Chinese.",
+    "Base every number and claim on the data sections provided, do not invent figures. Say so when a section has no data.",
+    "Structure: 投资要点, 财务分析 (growth, profitability, balance sheet, cash flow), 公告与事件, 市场情绪, 风险提示, 结论.",
+    "Use tables to display data.",
+]
+
+
+@dataclass
+class StageResult:
+    name: str
+    title: str
+    version: str
+    content: str
+    cached: bool
+    seconds: float
+
+
+class ResearchReportWorkflow(Workflow):
+    """
+    :param index: 本地数据索引，默认扫描当前目录下的data/financial/logs
+    :param artifacts: 中间结果缓存，默认 tmp/report_artifacts
+    :param stages: 数据阶段，默认 research.stages.STAGES
+    :param crawl: 本地没有数据时是否调用爬虫补抓
+    :param gate: 合成调用前进入的上下文，批量生成时用来限制模型并发和QPS（见 research.batch）
+    :param writer: 替换默认的写作agent；不传时每个工作流实例各建一个，并发运行的工作流不共用
+    """
+
+    description = "Generate a research report for one ticker from local statements, ratios, announcements and sentiment"
+    writer: Agent
+
+    def __init__(
+        self,
+        index: Optional[LocalDataIndex] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        stages: Optional[List[Stage]] = None,
+        crawl: bool = True,
+        gate: Optional[ContextManager] = None,
+        writer: Optional[Agent] = None,
+        **kwargs,
+    ):
+        self.index = index or LocalDataIndex()
+        self.artifacts = artifacts or ArtifactStore()
+        self.stages = stages or STAGES
+        self.crawl = crawl
+        self.gate = gate
+        self.writer = writer or Agent(model=get_model("qwen"), instructions=WRITER_INSTRUCTIONS, markdown=True)
+        super().__init__(**kwargs)
+
+    def _crawl_missing(self, code: str) -> None:
+        """并行补抓本地没有数据的阶段；多个阶段共用的数据源只抓一次"""
+        from scheduler.sources import SOURCES, check_result
+
+        names = {
+            name
+            for stage in self.stages
+            if stage.sources and stage.version(self.index, code) == EMPTY_VERSION
+            for name in stage.sources
+            if name in SOURCES and SOURCES[name].accepts(code)
+        }
+        if not names:
+            return
+
+        def run(name: str) -> None:
+            spec = SOURCES[name]
+            try:
+                items = check_result(spec.load()(code, **spec.kwargs))
+                log_debug(f"Crawled {name}:{code} ({items} items)")
+            except Exception as e:
+                log_warning(f"Crawl {name}:{code} failed: {e}")
+
+        log_info(f"Crawling missing data for {code}: {', '.join(sorted(names))}")
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="research-crawl") as pool:
+            list(pool.map(run, sorted(names)))
+        self.index.refresh()
+
+    def _stage(self, stage: Stage, code: str, refresh: bool) -> StageResult:
+        start = time.perf_counter()
+        version = stage.version(self.index, code)
+        content = None if refresh else self.artifacts.get(code, stage.name, version)
+        cached = content is not None
+        if content is None:
+            content = stage.build(self.index, code)
+            self.artifacts.put(code, stage.name, version, content)
+        return StageResult(stage.name, stage.title, version, content, cached, time.perf_counter() - start)
+
+    def gather(self, code: str, refresh: bool = False) -> Dict[str, StageResult]:
+        """补抓缺失数据后并行执行所有阶段，返回 阶段名 -> 结果"""
+        if self.crawl:
+            self._crawl_missing(code)
+        with ThreadPoolExecutor(max_workers=len(self.stages), thread_name_prefix="research-stage") as pool:
+            results = list(pool.map(lambda stage: self._stage(stage, code, refresh), self.stages))
+        log_info(f"{code} stages: " + ", ".join(f"{r.name}={'cached' if r.cached else 'built'}" for r in results))
+        return {r.name: r for r in results}
+
+    def report_version(self, results: Dict[str, StageResult], context: Optional[str] = None) -> str:
+        """研报的版本：所有阶段的数据版本 + 共享背景 + 写作模型和指令，任何一项变了都要重新合成"""
+        key = "|".join(f"{name}:{r.version}" for name, r in sorted(results.items()))
+        key += f"|{context or ''}|{self.writer.model.id if self.writer.model else ''}|{self.writer.instructions}"
+        return hashlib.md5(key.encode()).hexdigest()[:16]
+
+    def prompt(self, code: str, results: Dict[str, StageResult], context: Optional[str] = None) -> str:
+        sections = [f"# {r.title}\n{r.content or '（无数据）'}" for r in results.values()]
+        # 多只股票共用的背景放在最前面，批量生成时每次请求的开头都相同
+        head = f"# 行业背景\n{context}\n\n" if context else ""
+        return head + f"为股票 {code} 撰写研报，数据如下。\n\n" + "\n\n".join(sections)
+
+    def run(self, code: str, refresh: bool = False, context: Optional[str] = None) -> Iterator[RunResponseEvent]:
+        """
+        :param code: 股票代码
+        :param refresh: 忽略缓存，所有阶段和研报都重新生成
+        :param context: 多只股票共用的背景（如行业对比数据），放在消息开头
+        """
+        code = normalize_code(code)
+        results = self.gather(code, refresh)
+        version = self.report_version(results, context)
+        cached = None if refresh else self.artifacts.get(code, REPORT_STAGE, version)
+        self.session_state.setdefault("reports", {})[code] = {
+            "version": version,
+            "cached": cached is not None,
+            "stages": {name: {"version": r.version, "cached": r.cached, "seconds": round(r.seconds, 3)} for name, r in results.items()},
+        }
+        if cached is not None:
+            log_info(f"Report cache hit for {code}")
+            yield RunResponseContentEvent(run_id=self.run_id, content=cached)
+            return
+
+        # 从本次调用的流式事件里拼出研报，不读agent上的run_response
+        parts = []
+        with self.gate or nullcontext():
+            for event in self.writer.run(self.prompt(code, results, context), stream=True):
+                if isinstance(event, RunResponseContentEvent) and isinstance(event.content, str):
+                    parts.append(event.content)
+                yield event
+        content = "".join(parts)
+        if content:
+            self.artifacts.put(code, REPORT_STAGE, version, content, stages={name: r.version for name, r in results.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a research report for a ticker from local data")
+    parser.add_argument("code")
+    parser.add_argument("--refresh", action="store_true", help="忽略缓存，所有阶段和研报都重新生成")
+    parser.add_argument("--no-crawl", action="store_true", help="只用本地数据，不调用爬虫")
+    args = parser.parse_args()
+
+    workflow = ResearchReportWorkflow(crawl=not args.no_crawl)
+    pprint_run_response(workflow.run(code=args.code, refresh=args.refresh), markdown=True, show_time=True)
+    for name, stage in workflow.session_state["reports"][normalize_code(args.code)]["stages"].items():
+        print(f"{name:>14}: {'cached' if stage['cached'] else 'built':>6} {stage['seconds'] * 1000:.0f}ms  {stage['version']}")
+
+
+if __name__ == "__main__":
+    main()
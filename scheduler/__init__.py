@@ -0,0 +1,21 @@
+"""
+抓取调度模块
+基本面（上交所、深交所公告，三大会计报表）和舆情（东方财富、雪球）爬虫共用的持久化任务队列和线程池，
+支持优先级、截止时间、按数据源限流、失败退避重试，并记录每个数据源的吞吐和排队延迟
+命令行见 `python -m scheduler`
+"""
+
+from .jobs import Job, JobQueue
+from .service import CrawlScheduler
+from .sources import SOURCES, Source, earnings_season, next_disclosure_deadline, register_source
+
+__all__ = [
+    'CrawlScheduler',
+    'Job',
+    'JobQueue',
+    'SOURCES',
+    'Source',
+    'earnings_season',
+    'next_disclosure_deadline',
+    'register_source',
+]
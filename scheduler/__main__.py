@@ -0,0 +1,93 @@
+"""
+抓取调度命令行
+
+    python -m scheduler enqueue 002594 300474 600036 688981                  # 加入所有适用的数据源
+    python -m scheduler enqueue 600519 --source sse eastmoney --earnings     # 财报季优先，截止日为下一个披露截止日
+    python -m scheduler run --workers 4                                      # 常驻执行，Ctrl+C退出
+    python -m scheduler run --until-idle
+    python -m scheduler stats --since 3600
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from .jobs import DEFAULT_DB, JobQueue
+from .service import CrawlScheduler
+from .sources import EARNINGS_PRIORITY, SOURCES, next_disclosure_deadline
+
+
+def _s(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_stats(queue: JobQueue, since: float = 3600, console: Optional[Console] = None) -> None:
+    console = console or Console()
+    table = Table(title=f"Crawl jobs by source (last {since / 60:.0f} min, lag/crawl/wait in seconds)")
+    columns = ("source", "done", "err", "/min", "lag p50", "lag p95", "crawl p50", "crawl p95", "pend", "run", "fail", "wait", "late")
+    for column in columns:
+        table.add_column(column, justify="left" if column == "source" else "right", overflow="fold")
+    for s in queue.stats(since, sources=SOURCES):
+        table.add_row(
+            s["source"], str(s["done"]), str(s["errors"]), f"{s['throughput']:.2f}",
+            _s(s["lag_p50"]), _s(s["lag_p95"]), _s(s["duration_p50"]), _s(s["duration_p95"]),
+            str(s["pending"]), str(s["running"]), str(s["failed"]), _s(s["oldest_wait"]), str(s["deadline_missed"]),
+        )
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unified crawl scheduler")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="加入抓取任务")
+    enqueue.add_argument("codes", nargs="+", help="股票代码，如 600519、002594、00020.HK")
+    enqueue.add_argument("--source", nargs="+", choices=sorted(SOURCES), default=None, help="数据源，默认所有接受该代码的数据源")
+    enqueue.add_argument("--priority", type=int, default=0, help="越大越先执行")
+    enqueue.add_argument("--deadline", default=None, help="截止日期，如 2025-04-30")
+    enqueue.add_argument("--earnings", action="store_true", help="财报季优先：提高优先级，截止日取下一个定期报告披露截止日")
+
+    run = sub.add_parser("run", help="执行队列里的任务")
+    run.add_argument("--workers", type=int, default=4)
+    run.add_argument("--until-idle", action="store_true", help="队列清空（含等待重试的任务）后退出")
+    run.add_argument("--backoff", type=float, default=30.0, help="第一次重试的等待秒数")
+
+    stats = sub.add_parser("stats", help="每个数据源的吞吐和延迟")
+    stats.add_argument("--since", type=float, default=3600, help="统计最近多少秒")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.command == "enqueue":
+        scheduler = CrawlScheduler(queue)
+        priority, deadline = args.priority, None
+        if args.deadline:
+            deadline = datetime.strptime(args.deadline, "%Y-%m-%d").timestamp()
+        if args.earnings:
+            priority += EARNINGS_PRIORITY
+            deadline = deadline or next_disclosure_deadline().timestamp()
+        count = 0
+        for code in args.codes:
+            if args.source:
+                count += sum(scheduler.enqueue(name, code, priority, deadline) for name in args.source)
+            else:
+                count += scheduler.enqueue_all(code, priority, deadline)
+        print(f"Enqueued {count} jobs")
+    elif args.command == "run":
+        scheduler = CrawlScheduler(queue, workers=args.workers, backoff=args.backoff)
+        start = time.time()
+        try:
+            scheduler.run(until_idle=args.until_idle)
+        except KeyboardInterrupt:
+            # 线程池里正在执行的任务会跑完；没跑完的在心跳过期后由任一调度进程放回队列
+            scheduler.stop()
+        print_stats(queue, since=time.time() - start)
+    else:
+        print_stats(queue, since=args.since)
+
+
+if __name__ == "__main__":
+    main()
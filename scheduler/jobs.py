@@ -0,0 +1,257 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from telemetry.store import percentile
+
+DEFAULT_DB = "tmp/crawl_jobs.db"
+# 执行中的任务超过这么多秒没有心跳，认为取走它的进程已经退出
+STALE_AFTER = 120.0
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """
+    一个抓取任务：某个数据源抓某只股票
+    :param priority: 越大越先执行
+    :param deadline: 希望在此时间戳之前抓完，同优先级里截止时间早的先执行
+    :param ready_at: 可以开始执行的时间戳，重试退避时往后推
+    """
+
+    id: int
+    source: str
+    code: str
+    priority: int
+    deadline: Optional[float]
+    attempts: int
+    max_attempts: int
+    enqueued_at: float
+    ready_at: float
+
+
+class JobQueue:
+    """
+    持久化的抓取任务队列（SQLite），进程崩溃或重启后未完成的任务继续执行
+    同一数据源、同一股票只保留一个未完成的任务，重复入队时取更高的优先级和更早的截止时间
+    多个进程可以共用一个队列：取走任务时记下owner，执行期间owner定期写心跳，只有心跳过期的任务才会被放回队列
+    :param db_file: SQLite文件
+    :param owner: 本进程的标识，默认 主机名-pid-随机串
+    """
+
+    def __init__(self, db_file: str = DEFAULT_DB, owner: Optional[str] = None):
+        self.db_file = db_file
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                code TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                deadline REAL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                enqueued_at REAL NOT NULL,
+                ready_at REAL NOT NULL,
+                finished_at REAL,
+                last_error TEXT,
+                owner TEXT,
+                heartbeat_at REAL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_open ON jobs (source, code) WHERE status IN ('pending', 'running');
+            CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, ready_at);
+            CREATE TABLE IF NOT EXISTS runs (
+                job_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                code TEXT NOT NULL,
+                ready_at REAL NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL NOT NULL,
+                ok INTEGER NOT NULL,
+                items INTEGER,
+                deadline_missed INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_finished ON runs (finished_at, source);
+            """
+        )
+        # 旧版本建的表没有owner和心跳两列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def enqueue(self, source: str, code: str, priority: int = 0, deadline: Optional[float] = None, max_attempts: int = 3) -> None:
+        now = time.time()
+        self._execute(
+            """
+            INSERT INTO jobs (source, code, priority, deadline, status, max_attempts, enqueued_at, ready_at)
+            VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)
+            ON CONFLICT (source, code) WHERE status IN ('pending', 'running') DO UPDATE SET
+                priority = max(priority, excluded.priority),
+                deadline = CASE WHEN deadline IS NULL THEN excluded.deadline
+                                WHEN excluded.deadline IS NULL THEN deadline
+                                ELSE min(deadline, excluded.deadline) END
+            """,
+            (source, code, priority, deadline, max_attempts, now, now),
+        )
+
+    def ready(self, limit: int = 100, now: Optional[float] = None) -> List[Job]:
+        """
+        可以执行的任务，按 优先级高 > 截止时间早 > 入队早 排序
+        """
+        rows = self._query(
+            """
+            SELECT id, source, code, priority, deadline, attempts, max_attempts, enqueued_at, ready_at FROM jobs
+            WHERE status = 'pending' AND ready_at <= ?
+            ORDER BY priority DESC, deadline IS NULL, deadline, enqueued_at
+            LIMIT ?
+            """,
+            (now or time.time(), limit),
+        )
+        return [Job(*row) for row in rows]
+
+    def next_ready_at(self) -> Optional[float]:
+        """最早一个等待中任务的可执行时间，没有则返回None"""
+        return self._query("SELECT min(ready_at) FROM jobs WHERE status = 'pending'")[0][0]
+
+    def claim(self, job: Job) -> bool:
+        """标记为由本进程执行，别的进程已经取走时返回False"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, heartbeat_at = ? WHERE id = ? AND status = 'pending'",
+            (self.owner, time.time(), job.id),
+        )
+        if cursor.rowcount:
+            job.attempts += 1
+        return bool(cursor.rowcount)
+
+    def heartbeat(self) -> int:
+        """刷新本进程所有执行中任务的心跳，返回任务数"""
+        return self._execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?", (time.time(), self.owner)
+        ).rowcount
+
+    def complete(self, job: Job, started_at: float, items: Optional[int] = None) -> bool:
+        """任务已被当作过期放回队列、由别的进程取走时不更新也不记录，返回False"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, last_error = NULL WHERE id = ? AND status = 'running' AND owner = ?",
+                (now, job.id, self.owner),
+            )
+            if cursor.rowcount:
+                self._record_run(job, started_at, now, True, items, None)
+            self._conn.commit()
+            return bool(cursor.rowcount)
+
+    def fail(self, job: Job, started_at: float, error: str, retry_in: Optional[float]) -> bool:
+        """执行失败：retry_in为None时不再重试，否则退避retry_in秒后重新执行；任务已不归本进程时返回False"""
+        now = time.time()
+        with self._lock:
+            if retry_in is None:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, last_error = ? WHERE id = ? AND status = 'running' AND owner = ?",
+                    (now, error, job.id, self.owner),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = 'pending', ready_at = ?, last_error = ? WHERE id = ? AND status = 'running' AND owner = ?",
+                    (now + retry_in, error, job.id, self.owner),
+                )
+            if cursor.rowcount:
+                self._record_run(job, started_at, now, False, None, error)
+            self._conn.commit()
+            return bool(cursor.rowcount)
+
+    def _record_run(self, job: Job, started_at: float, finished_at: float, ok: bool, items: Optional[int], error: Optional[str]) -> None:
+        missed = job.deadline is not None and finished_at > job.deadline
+        self._conn.execute(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job.id, job.source, job.code, job.ready_at, started_at, finished_at, int(ok), items, int(missed), error),
+        )
+
+    def recover(self, stale_after: float = STALE_AFTER) -> int:
+        """
+        把执行进程已经退出（心跳超过stale_after秒没有更新）的任务放回队列，返回任务数
+        其他进程正在执行的任务保持不动
+        """
+        return self._execute(
+            "UPDATE jobs SET status = 'pending', owner = NULL WHERE status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+            (time.time() - stale_after,),
+        ).rowcount
+
+    def depth(self) -> Dict[str, Dict[str, int]]:
+        """每个数据源各状态的任务数"""
+        result: Dict[str, Dict[str, int]] = {}
+        for source, status, count in self._query("SELECT source, status, count(*) FROM jobs GROUP BY source, status"):
+            result.setdefault(source, {})[status] = count
+        return result
+
+    def stats(self, since: float = 3600, sources: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        最近since秒内每个数据源的吞吐和延迟：
+        throughput为每分钟成功任务数，lag为任务可执行到开始执行的等待秒数，duration为单次抓取耗时
+        """
+        start = time.time() - since
+        runs: Dict[str, List[tuple]] = {}
+        for row in self._query(
+            "SELECT source, ready_at, started_at, finished_at, ok, deadline_missed FROM runs WHERE finished_at >= ?", (start,)
+        ):
+            runs.setdefault(row[0], []).append(row[1:])
+        depth = self.depth()
+        oldest = dict(self._query("SELECT source, min(ready_at) FROM jobs WHERE status = 'pending' AND ready_at <= ? GROUP BY source", (time.time(),)))
+
+        result = []
+        for source in sorted(set(runs) | set(depth) | set(sources or [])):
+            rows = runs.get(source, [])
+            ok = [r for r in rows if r[3]]
+            lags = [started - ready for ready, started, _, _, _ in rows]
+            durations = [finished - started for _, started, finished, _, _ in rows]
+            window = max(1.0, min(since, time.time() - min((r[1] for r in rows), default=time.time())))
+            result.append({
+                "source": source,
+                "done": len(ok),
+                "errors": len(rows) - len(ok),
+                "deadline_missed": sum(r[4] for r in rows),
+                "throughput": len(ok) / window * 60,
+                "lag_p50": percentile(lags, 0.5),
+                "lag_p95": percentile(lags, 0.95),
+                "duration_p50": percentile(durations, 0.5),
+                "duration_p95": percentile(durations, 0.95),
+                "pending": depth.get(source, {}).get(PENDING, 0),
+                "running": depth.get(source, {}).get(RUNNING, 0),
+                "failed": depth.get(source, {}).get(FAILED, 0),
+                "oldest_wait": time.time() - oldest[source] if oldest.get(source) else 0.0,
+            })
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,157 @@
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from agno.utils.log import log_debug, log_warning
+
+from fundamental.universe import normalize_code
+from tools.ratelimit import TokenBucket
+
+from .jobs import STALE_AFTER, Job, JobQueue
+from .sources import SOURCES, Source, check_result
+
+
+class CrawlScheduler:
+    """
+    所有数据源共用一个线程池执行队列里的抓取任务
+    - 按 优先级 > 截止时间 > 入队时间 取任务，每个数据源有独立的令牌桶和并发上限，
+      某个数据源限流时跳过它的任务，不阻塞其他数据源
+    - 失败按指数退避加随机抖动重试，超过max_attempts后标记为failed
+    - 多个进程可以共用一个队列：本进程执行中的任务定期写心跳，只有心跳过期（进程已退出）的任务才会被放回队列
+    :param queue: 任务队列
+    :param sources: 数据源，默认为 SOURCES
+    :param workers: 线程池大小
+    :param backoff: 第一次重试的等待秒数，之后每次翻倍
+    :param max_backoff: 退避等待的上限（秒）
+    :param poll_interval: 没有可执行任务时的最长等待秒数
+    :param heartbeat_interval: 写心跳、回收过期任务的间隔秒数
+    :param stale_after: 心跳超过这么多秒没有更新的执行中任务放回队列，应远大于heartbeat_interval
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        sources: Optional[Dict[str, Source]] = None,
+        workers: int = 4,
+        backoff: float = 30.0,
+        max_backoff: float = 900.0,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 15.0,
+        stale_after: float = STALE_AFTER,
+    ):
+        self.queue = queue
+        self.sources = sources if sources is not None else SOURCES
+        self.workers = workers
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._last_heartbeat = 0.0
+        self._buckets = {name: TokenBucket(s.rate, s.burst) for name, s in self.sources.items()}
+        self._funcs: Dict[str, Callable] = {}
+        self._running: Dict[str, int] = {}
+        self._inflight = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def enqueue(self, source: str, code: str, priority: int = 0, deadline: Optional[float] = None) -> bool:
+        """入队，数据源不接受该股票代码时返回False"""
+        spec = self.sources[source]
+        code = normalize_code(code)
+        if not spec.accepts(code):
+            return False
+        self.queue.enqueue(source, code, priority=priority, deadline=deadline, max_attempts=spec.max_attempts)
+        with self._cond:
+            self._cond.notify_all()
+        return True
+
+    def enqueue_all(self, code: str, priority: int = 0, deadline: Optional[float] = None) -> int:
+        """把一只股票加入所有接受它的数据源，返回入队的任务数"""
+        return sum(self.enqueue(name, code, priority, deadline) for name in self.sources)
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def run(self, until_idle: bool = False) -> None:
+        """
+        执行任务直到stop()，until_idle时队列里没有任务（包括等待重试的）就返回
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl") as pool:
+            while not self._stop.is_set():
+                self._maintain()
+                dispatched = self._dispatch(pool)
+                with self._cond:
+                    if until_idle and not self._inflight and self.queue.next_ready_at() is None:
+                        break
+                    if not dispatched:
+                        self._cond.wait(self._idle_wait())
+
+    def _maintain(self) -> None:
+        """刷新本进程任务的心跳，顺便把已退出进程留下的任务放回队列"""
+        now = time.monotonic()
+        if now - self._last_heartbeat < self.heartbeat_interval:
+            return
+        self._last_heartbeat = now
+        self.queue.heartbeat()
+        recovered = self.queue.recover(self.stale_after)
+        if recovered:
+            log_debug(f"Recovered {recovered} crawl jobs abandoned by exited schedulers")
+
+    def _idle_wait(self) -> float:
+        next_ready = self.queue.next_ready_at()
+        if next_ready is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.01, next_ready - time.time()))
+
+    def _dispatch(self, pool: ThreadPoolExecutor) -> int:
+        dispatched = 0
+        for job in self.queue.ready(limit=self.workers * 4):
+            with self._cond:
+                if self._inflight >= self.workers:
+                    break
+                spec = self.sources.get(job.source)
+                if spec is None or self._running.get(job.source, 0) >= spec.concurrency:
+                    continue
+                if not self._buckets[job.source].try_acquire():
+                    continue
+                if not self.queue.claim(job):
+                    # 别的进程已经取走，令牌还回去
+                    self._buckets[job.source].release()
+                    continue
+                self._inflight += 1
+                self._running[job.source] = self._running.get(job.source, 0) + 1
+            pool.submit(self._execute, job, spec)
+            dispatched += 1
+        return dispatched
+
+    def _load(self, name: str, spec: Source) -> Callable:
+        func = self._funcs.get(name)
+        if func is None:
+            func = self._funcs[name] = spec.load()
+        return func
+
+    def _execute(self, job: Job, spec: Source) -> None:
+        started = time.time()
+        try:
+            items = check_result(self._load(job.source, spec)(job.code, **spec.kwargs))
+            if not self.queue.complete(job, started, items):
+                log_warning(f"Crawl {job.source}:{job.code} finished after its job was handed to another scheduler")
+        except Exception as e:
+            retry_in = self.retry_delay(job.attempts) if job.attempts < job.max_attempts else None
+            log_warning(f"Crawl {job.source}:{job.code} failed (attempt {job.attempts}/{job.max_attempts}): {e}")
+            log_debug(traceback.format_exc())
+            self.queue.fail(job, started, f"{type(e).__name__}: {e}", retry_in)
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._running[job.source] -= 1
+                self._cond.notify_all()
@@ -0,0 +1,138 @@
+import importlib
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from fundamental.universe import SSE, SZSE, exchange_of
+
+# A股定期报告的法定披露截止日：年报和一季报4月30日，半年报8月31日，三季报10月31日
+DISCLOSURE_DEADLINES = [(4, 30), (8, 31), (10, 31)]
+EARNINGS_PRIORITY = 10
+
+
+@dataclass
+class Source:
+    """
+    一个数据源
+    :param target: 抓取函数，格式为 "模块:函数"，签名为 (code, **kwargs)，首次执行时才导入
+    :param rate: 每秒最多发起的任务数（长期平均）
+    :param burst: 允许的突发任务数
+    :param concurrency: 同时执行的最大任务数，Selenium类的数据源应设为1
+    :param max_attempts: 最多执行次数（含第一次）
+    :param match: 该数据源接受的股票代码（正则），其他代码入队时跳过
+    :param exchange: 只接受该交易所的股票（SSE / SZSE / BSE / HKEX），按 fundamental.universe 路由
+    :param kwargs: 调用抓取函数时的额外参数
+    """
+
+    target: str
+    rate: float = 0.5
+    burst: int = 1
+    concurrency: int = 1
+    max_attempts: int = 3
+    match: str = r".+"
+    exchange: Optional[str] = None
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    def accepts(self, code: str) -> bool:
+        if self.exchange is not None and exchange_of(code) != self.exchange:
+            return False
+        return re.fullmatch(self.match, code) is not None
+
+    def load(self) -> Callable[..., Any]:
+        module_name, _, attr = self.target.partition(":")
+        return getattr(importlib.import_module(module_name), attr)
+
+
+def check_result(result: Any) -> Optional[int]:
+    """
+    把各个爬虫的返回值统一成抓到的条数，爬虫报告失败时抛异常以便重试
+    """
+    if isinstance(result, dict) and "success" in result:
+        if not result["success"]:
+            raise RuntimeError(result.get("error") or "crawl failed")
+        return result.get("tables_count")
+    if isinstance(result, int):
+        return result
+    return None
+
+
+def _save_sentiment(df, code: str, name: str, out_dir: str) -> int:
+    # 与各爬虫__main__的保存位置一致，tools.local_ashare.LocalDataIndex 按这个命名读取
+    if df is None or df.empty:
+        return 0
+    os.makedirs(out_dir, exist_ok=True)
+    df.to_csv(os.path.join(out_dir, f"{name}_{code}.csv"), index=False, encoding="utf-8-sig")
+    return len(df)
+
+
+def fetch_and_save_financial_reports(code: str, out_dir: str = "data") -> int:
+    """抓取三大会计报表并保存到 data/{code}/financial_reports，返回抓到的报表数"""
+    from fundamental.financial_reports import fetch_financial_reports_akshare, save_financial_reports
+
+    reports = fetch_financial_reports_akshare(code)
+    fetched = sum(df is not None for df in reports.values())
+    if not fetched:
+        raise RuntimeError(f"no financial reports fetched for {code}")
+    save_financial_reports(reports, code, out_dir=out_dir, is_hk=code.endswith(".HK"))
+    return fetched
+
+
+def crawl_eastmoney_to_csv(code: str, out_dir: str = "logs", **kwargs) -> int:
+    """抓取东方财富个股新闻并保存到 logs/eastmoney_news_{code}.csv"""
+    from public_opinion.eastmoney_crawler import crawl_eastmoney
+
+    return _save_sentiment(crawl_eastmoney(code, **kwargs), code, "eastmoney_news", out_dir)
+
+
+def crawl_xueqiu_discussions_to_csv(code: str, out_dir: str = "logs", **kwargs) -> int:
+    """抓取雪球个股讨论并保存到 logs/xueqiu_discussions_{code}.csv"""
+    from public_opinion.xueqiu_crawler import crawl_xueqiu_discussions
+
+    return _save_sentiment(crawl_xueqiu_discussions(code, **kwargs), code, "xueqiu_discussions", out_dir)
+
+
+def crawl_xueqiu_news_to_csv(code: str, out_dir: str = "logs", **kwargs) -> int:
+    """抓取雪球个股新闻并保存到 logs/xueqiu_news_{code}.csv"""
+    from public_opinion.xueqiu_crawler import crawl_xueqiu_news
+
+    return _save_sentiment(crawl_xueqiu_news(code, **kwargs), code, "xueqiu_news", out_dir)
+
+
+SOURCES: Dict[str, Source] = {
+    # 交易所公告页面走Selenium，每个交易所同时只开一个浏览器
+    "sse": Source("fundamental.sse_crawler:crawl_sse", rate=0.5, concurrency=1, exchange=SSE),
+    "szse": Source(
+        "fundamental.szse_crawler:crawl_szse_multiple_pages_with_click",
+        rate=0.5,
+        concurrency=1,
+        exchange=SZSE,
+        kwargs={"max_pages": 5},
+    ),
+    "financial_reports": Source("scheduler.sources:fetch_and_save_financial_reports", rate=1.0, burst=2, concurrency=2),
+    "eastmoney": Source("scheduler.sources:crawl_eastmoney_to_csv", rate=0.5, concurrency=2, match=r"\d{6}", kwargs={"max_pages": 5, "days_limit": 7}),
+    "xueqiu_discussions": Source("scheduler.sources:crawl_xueqiu_discussions_to_csv", rate=0.3, match=r"\d{6}", kwargs={"max_pages": 5, "days_limit": 7}),
+    "xueqiu_news": Source("scheduler.sources:crawl_xueqiu_news_to_csv", rate=0.3, match=r"\d{6}", kwargs={"max_pages": 3, "days_limit": 7}),
+}
+
+
+def register_source(name: str, source: Source) -> None:
+    SOURCES[name] = source
+
+
+def next_disclosure_deadline(now: Optional[datetime] = None) -> datetime:
+    """下一个定期报告披露截止日（当天结束时）"""
+    now = now or datetime.now()
+    for month, day in DISCLOSURE_DEADLINES:
+        deadline = datetime(now.year, month, day) + timedelta(days=1)
+        if deadline > now:
+            return deadline
+    month, day = DISCLOSURE_DEADLINES[0]
+    return datetime(now.year + 1, month, day) + timedelta(days=1)
+
+
+def earnings_season(now: Optional[datetime] = None, window_days: int = 45) -> Optional[datetime]:
+    """处于财报季（离披露截止日不到window_days天）时返回截止日，否则返回None"""
+    deadline = next_disclosure_deadline(now)
+    return deadline if deadline - (now or datetime.now()) <= timedelta(days=window_days) else None
@@ -0,0 +1,93 @@
+"""
+Playground应用的生产模式入口：多worker、keep-alive、优雅退出
+
+    python serve.py playground:app --workers 4 --port 7777
+    python serve.py main:app --workers 2
+
+与 playground.serve(..., reload=True) 的区别：
+- uvicorn多进程，每个worker各自导入一次应用模块，agent和模型客户端每个worker只构建一次
+- 主进程不导入应用模块，不会在fork之前建好连接池和数据库连接
+- 请求会落到任意worker上，agent/team/workflow需要显式指定固定的id，否则每个进程随机生成的id不一致
+- 收到SIGTERM/SIGINT后停止接收新请求，等待进行中的请求完成（最长--graceful-timeout秒），
+  然后关闭模型客户端连接池；存储写缓冲和记忆提取队列在进程退出时落盘
+"""
+import argparse
+import importlib
+import os
+from contextlib import asynccontextmanager
+
+APP_ENV = "AGNO_SERVE_APP"
+
+
+def load_app(target: str):
+    """按 "模块:属性" 导入应用"""
+    module_name, _, attr = target.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr or "app")
+
+
+def production_app():
+    """uvicorn应用工厂，每个worker进程调用一次"""
+    from models import aclose_clients, stub_url
+
+    app = load_app(os.environ[APP_ENV])
+    if stub_url():
+        from agno.agent import Agent
+        from agno.team.team import Team
+        from agno.workflow import Workflow
+
+        from models import point_at_stub
+
+        # 压测模式：应用模块里的agent/team/workflow全部指向假模型服务
+        module = importlib.import_module(os.environ[APP_ENV].partition(":")[0])
+        for value in list(vars(module).values()):
+            if isinstance(value, (Agent, Team, Workflow)):
+                point_at_stub(value)
+    original = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(a):
+        async with original(a) as state:
+            yield state
+        # 进行中的请求都结束之后才会走到这里
+        await aclose_clients()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a Playground app with multiple workers")
+    parser.add_argument("app", nargs="?", default="playground:app", help="应用，格式为 模块:属性")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--keep-alive", type=int, default=30, help="客户端连接的keep-alive秒数")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="退出时等待进行中请求的最长秒数")
+    parser.add_argument("--limit-concurrency", type=int, default=None, help="每个worker的最大并发连接数，超出返回503")
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--stub-url", default=None, help="把所有模型指向假模型服务，如 http://127.0.0.1:8900/v1")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    from models import STUB_ENV
+
+    os.environ[APP_ENV] = args.app
+    if args.stub_url:
+        os.environ[STUB_ENV] = args.stub_url
+    uvicorn.run(
+        "serve:production_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_concurrency=args.limit_concurrency,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
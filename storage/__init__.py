@@ -0,0 +1,17 @@
+"""
+存储模块
+agno SqliteStorage 的扩展，用于长会话和并发服务场景
+"""
+
+from .history import RunHistorySqliteStorage, extractive_summary
+from .wal import WalRunHistorySqliteStorage, WalSqliteMemoryDb, WalSqliteStorage, WriteBatcher, get_wal_engine
+
+__all__ = [
+    'RunHistorySqliteStorage',
+    'extractive_summary',
+    'WalSqliteStorage',
+    'WalRunHistorySqliteStorage',
+    'WalSqliteMemoryDb',
+    'WriteBatcher',
+    'get_wal_engine',
+]
@@ -0,0 +1,225 @@
+import json
+import time
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional
+
+from agno.storage.session import Session
+from agno.storage.sqlite import SqliteStorage
+from agno.utils.log import log_debug, log_warning
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, Text, inspect, select
+from sqlalchemy.dialects import sqlite
+
+
+def _shorten(text: Any, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def _run_input(run: Dict[str, Any]) -> str:
+    """取出本轮用户输入（跳过历史消息）"""
+    for message in reversed(run.get("messages") or []):
+        if message.get("role") == "user" and not message.get("from_history"):
+            return message.get("content") or ""
+    return ""
+
+
+def extractive_summary(previous: str, runs: List[Dict[str, Any]], max_chars: int = 2000) -> str:
+    """
+    默认的滚动摘要：每轮压缩成一行“问 | 答”，超长时只保留最近的部分。
+    不调用模型，零额外延迟；需要更好的摘要时可以传入基于模型的summarizer
+    """
+    lines = [previous] if previous else []
+    for run in runs:
+        lines.append(f"- User: {_shorten(_run_input(run), 150)} | Assistant: {_shorten(run.get('content'), 250)}")
+    summary = "\n".join(lines)
+    if len(summary) > max_chars:
+        summary = "..." + summary[-max_chars:]
+    return summary
+
+
+class RunHistorySqliteStorage(SqliteStorage):
+    """
+    会话历史有界的SqliteStorage，参数与SqliteStorage一致，另外：
+    - 每个run单独存一行（{table_name}_runs，按(session_id, seq)建索引），会话本身不再保存越来越大的runs JSON
+    - read()只用一次索引查询取最近num_history_runs个run
+    - 更早的run折叠进滚动摘要（{table_name}_summaries），作为session summary注入agent，
+      agent需要开启add_session_summary_references=True才会把摘要放进提示词
+    Args:
+        num_history_runs: 读取会话时加载的最近run数量，应不小于agent的num_history_runs/num_history_responses
+        summarizer: (旧摘要, 被折叠的runs) -> 新摘要，默认extractive_summary
+        max_summary_chars: 默认摘要的最大长度
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        num_history_runs: int = 5,
+        summarizer: Optional[Callable[[str, List[Dict[str, Any]]], str]] = None,
+        max_summary_chars: int = 2000,
+        **kwargs,
+    ):
+        super().__init__(table_name=table_name, **kwargs)
+        self.num_history_runs = num_history_runs
+        self.max_summary_chars = max_summary_chars
+        self.summarizer = summarizer or (lambda previous, runs: extractive_summary(previous, runs, self.max_summary_chars))
+
+        self.history_metadata = MetaData()
+        self.runs_table = Table(
+            f"{table_name}_runs",
+            self.history_metadata,
+            Column("seq", Integer, primary_key=True, autoincrement=True),
+            Column("run_id", String, unique=True),
+            Column("session_id", String, nullable=False),
+            Column("run", sqlite.JSON),
+            Column("created_at", Integer, default=lambda: int(time.time())),
+            Index(f"ix_{table_name}_runs_session_seq", "session_id", "seq"),
+            sqlite_autoincrement=True,
+        )
+        self.summaries_table = Table(
+            f"{table_name}_summaries",
+            self.history_metadata,
+            Column("session_id", String, primary_key=True),
+            Column("summary", Text),
+            # 已经折叠进摘要的最大seq
+            Column("summarized_seq", Integer, default=0),
+            Column("updated_at", Integer, default=lambda: int(time.time())),
+        )
+        self.history_metadata.create_all(self.db_engine, checkfirst=True)
+
+    def _tracks_runs(self, session: Optional[Session]) -> bool:
+        return self.mode in ("agent", "team") and session is not None and isinstance(session.memory, dict)
+
+    def append_runs(self, session_id: str, runs: List[Dict[str, Any]]) -> None:
+        """写入（或更新）run行，run_id相同的行原地更新，不改变顺序"""
+        if not runs:
+            return
+        with self.SqlSession() as sess, sess.begin():
+            for run in runs:
+                stmt = sqlite.insert(self.runs_table).values(run_id=run.get("run_id"), session_id=session_id, run=run)
+                stmt = stmt.on_conflict_do_update(index_elements=["run_id"], set_=dict(run=run))
+                sess.execute(stmt)
+
+    def get_last_runs(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """最近limit个run，按时间正序返回"""
+        stmt = (
+            select(self.runs_table.c.run)
+            .where(self.runs_table.c.session_id == session_id)
+            .order_by(self.runs_table.c.seq.desc())
+            .limit(limit or self.num_history_runs)
+        )
+        with self.SqlSession() as sess:
+            rows = sess.execute(stmt).fetchall()
+        return [row[0] if isinstance(row[0], dict) else json.loads(row[0]) for row in reversed(rows)]
+
+    def get_summary(self, session_id: str) -> Optional[str]:
+        with self.SqlSession() as sess:
+            row = sess.execute(
+                select(self.summaries_table.c.summary).where(self.summaries_table.c.session_id == session_id)
+            ).fetchone()
+        return row[0] if row else None
+
+    def roll_summary(self, session_id: str) -> None:
+        """把最近num_history_runs个之外、尚未摘要的run折叠进滚动摘要"""
+        with self.SqlSession() as sess, sess.begin():
+            row = sess.execute(
+                select(self.summaries_table.c.summary, self.summaries_table.c.summarized_seq).where(
+                    self.summaries_table.c.session_id == session_id
+                )
+            ).fetchone()
+            summary, summarized_seq = (row[0] or "", row[1] or 0) if row else ("", 0)
+
+            # 窗口内最老的run的seq，比它小的都应该进入摘要
+            window_start = sess.execute(
+                select(self.runs_table.c.seq)
+                .where(self.runs_table.c.session_id == session_id)
+                .order_by(self.runs_table.c.seq.desc())
+                .offset(self.num_history_runs - 1)
+                .limit(1)
+            ).scalar()
+            if window_start is None:
+                return
+            evicted = sess.execute(
+                select(self.runs_table.c.seq, self.runs_table.c.run)
+                .where(self.runs_table.c.session_id == session_id)
+                .where(self.runs_table.c.seq > summarized_seq)
+                .where(self.runs_table.c.seq < window_start)
+                .order_by(self.runs_table.c.seq)
+            ).fetchall()
+            if not evicted:
+                return
+
+            summary = self.summarizer(summary, [r[1] for r in evicted])
+            stmt = sqlite.insert(self.summaries_table).values(
+                session_id=session_id, summary=summary, summarized_seq=evicted[-1][0], updated_at=int(time.time())
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["session_id"],
+                set_=dict(summary=summary, summarized_seq=evicted[-1][0], updated_at=int(time.time())),
+            )
+            sess.execute(stmt)
+            log_debug(f"Folded {len(evicted)} runs into the summary of session {session_id}")
+
+    def read(self, session_id: str, user_id: Optional[str] = None) -> Optional[Session]:
+        session = super().read(session_id=session_id, user_id=user_id)
+        if not self._tracks_runs(session):
+            return session
+
+        # 旧格式的会话把runs存在JSON里，第一次读取时迁移到runs表
+        legacy_runs = session.memory.get("runs") or []
+        if legacy_runs:
+            self.append_runs(session_id, legacy_runs)
+            self.roll_summary(session_id)
+
+        session.memory["runs"] = self.get_last_runs(session_id)
+        summary = self.get_summary(session_id)
+        if summary:
+            summaries = session.memory.get("summaries") or {}
+            summaries.setdefault(session.user_id or "default", {})[session_id] = {"summary": summary}
+            session.memory["summaries"] = summaries
+        return session
+
+    def upsert(self, session: Session, create_and_retry: bool = True) -> Optional[Session]:
+        if self._tracks_runs(session):
+            runs = session.memory.get("runs") or []
+            try:
+                self.append_runs(session.session_id, runs)
+                self.roll_summary(session.session_id)
+                # 不修改调用方的session对象，agent和写缓冲可能还持有它
+                session = replace(session, memory={**session.memory, "runs": []})
+            except Exception as e:
+                # runs表写入失败时退回到原来的整块存储，保证不丢历史
+                log_warning(f"Failed to write runs for session {session.session_id}: {e}")
+        return super().upsert(session, create_and_retry=create_and_retry)
+
+    def delete_session(self, session_id: Optional[str] = None):
+        super().delete_session(session_id)
+        if session_id is None:
+            return
+        with self.SqlSession() as sess, sess.begin():
+            sess.execute(self.runs_table.delete().where(self.runs_table.c.session_id == session_id))
+            sess.execute(self.summaries_table.delete().where(self.summaries_table.c.session_id == session_id))
+
+    def drop(self) -> None:
+        super().drop()
+        self.history_metadata.drop_all(self.db_engine, checkfirst=True)
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+
+        # 与SqliteStorage.__deepcopy__相同，另外runs/summaries表结构和摘要函数直接共享
+        shared = {"db_engine", "SqlSession", "history_metadata", "runs_table", "summaries_table", "summarizer"}
+        cls = self.__class__
+        copied_obj = cls.__new__(cls)
+        memo[id(self)] = copied_obj
+        for k, v in self.__dict__.items():
+            if k in {"metadata", "table", "inspector"}:
+                continue
+            elif k in shared:
+                setattr(copied_obj, k, v)
+            else:
+                setattr(copied_obj, k, deepcopy(v, memo))
+
+        copied_obj.metadata = MetaData()
+        copied_obj.inspector = inspect(copied_obj.db_engine)
+        copied_obj.table = copied_obj.get_table()
+        return copied_obj
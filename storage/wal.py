@@ -0,0 +1,468 @@
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agno.memory.v2.db.schema import MemoryRow
+from agno.memory.v2.db.sqlite import SqliteMemoryDb
+from agno.storage.session import Session
+from agno.storage.sqlite import SqliteStorage
+from agno.utils.log import log_debug, log_warning
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from .history import RunHistorySqliteStorage
+
+
+class LockStats:
+    """记录一个engine上获取写锁（BEGIN IMMEDIATE）的等待时间和提交次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lock_waits: List[float] = []
+        self.commits = 0
+        self.writes = 0
+        self.busy_retries = 0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.lock_waits.append(seconds)
+
+    def record_commit(self, writes: int) -> None:
+        with self._lock:
+            self.commits += 1
+            self.writes += writes
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self.lock_waits)
+        pct = lambda p: waits[min(len(waits) - 1, int(p * len(waits)))] if waits else 0.0
+        return {
+            "commits": self.commits,
+            "writes": self.writes,
+            "busy_retries": self.busy_retries,
+            "lock_wait_total": sum(waits),
+            "lock_wait_p50": pct(0.5),
+            "lock_wait_p95": pct(0.95),
+        }
+
+
+# (pid, 数据库路径) -> engine，每个worker进程各自建连接池，fork出来的进程不会复用父进程的连接
+_ENGINES: Dict[Tuple[int, str], Engine] = {}
+_STATS: Dict[int, LockStats] = {}
+_BATCHERS: Dict[Tuple[int, int], "WriteBatcher"] = {}
+_registry_lock = threading.Lock()
+# 当前线程上没有指定模式的事务也用BEGIN IMMEDIATE，见 immediate_transactions
+_begin_mode = threading.local()
+
+
+@contextmanager
+def immediate_transactions():
+    """
+    这段代码里当前线程开始的所有事务都是BEGIN IMMEDIATE，用于建表：
+    DEFERRED事务先读表结构再升级成写锁，另一个进程在这之间提交过就直接报 database is locked，busy_timeout不起作用；
+    IMMEDIATE一开始就排队拿写锁，多个worker同时启动时依次建表
+    """
+    previous = getattr(_begin_mode, "mode", None)
+    _begin_mode.mode = "IMMEDIATE"
+    try:
+        yield
+    finally:
+        _begin_mode.mode = previous
+
+
+def get_wal_engine(db_file: str, pool_size: int = 5, max_overflow: int = 10, busy_timeout: float = 5.0) -> Engine:
+    """
+    获取（或创建）当前进程的WAL模式SQLite engine
+    :param db_file: 数据库文件
+    :param pool_size: 连接池常驻连接数
+    :param max_overflow: 高峰时允许额外创建的连接数
+    :param busy_timeout: 等待其他写事务释放锁的最长秒数
+    """
+    db_path = str(Path(db_file).resolve())
+    key = (os.getpid(), db_path)
+    with _registry_lock:
+        engine = _ENGINES.get(key)
+        if engine is not None:
+            return engine
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        engine = create_engine(
+            f"sqlite:///{db_path}",
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            connect_args={"timeout": busy_timeout, "check_same_thread": False},
+        )
+        stats = LockStats()
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_conn, _record):
+            # 由我们自己发BEGIN，这样写事务可以用BEGIN IMMEDIATE提前拿写锁
+            dbapi_conn.isolation_level = None
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+            cursor.close()
+
+        @event.listens_for(engine, "begin")
+        def _on_begin(conn):
+            mode = conn.get_execution_options().get("sqlite_begin") or getattr(_begin_mode, "mode", None) or "DEFERRED"
+            start = time.perf_counter()
+            conn.exec_driver_sql(f"BEGIN {mode}")
+            if mode == "IMMEDIATE":
+                stats.record_wait(time.perf_counter() - start)
+
+        _ENGINES[key] = engine
+        _STATS[id(engine)] = stats
+        log_debug(f"Created WAL engine for {db_path} in pid {os.getpid()}")
+        return engine
+
+
+def get_lock_stats(engine: Engine) -> LockStats:
+    return _STATS.setdefault(id(engine), LockStats())
+
+
+class WriteBatcher:
+    """
+    后台线程批量提交写操作：把一段时间内的多次写合并成一个BEGIN IMMEDIATE事务，
+    并发写入时大幅减少获取写锁和fsync的次数
+    :param engine: WAL engine
+    :param max_batch: 单个事务最多合并的写操作数
+    :param max_delay: 攒批的最长等待秒数
+    :param max_retries: 遇到database is locked时的重试次数
+    """
+
+    def __init__(self, engine: Engine, max_batch: int = 64, max_delay: float = 0.02, max_retries: int = 5):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.stats = get_lock_stats(engine)
+        self._queue: "queue.Queue[Optional[Tuple[Callable, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-write-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, write: Callable[[Any], Any]) -> Future:
+        """提交一个写操作，write接收当前批次的connection"""
+        future: Future = Future()
+        self._queue.put((write, future))
+        return future
+
+    def flush(self) -> None:
+        """阻塞直到已提交的写操作全部落盘"""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def __deepcopy__(self, memo):
+        # agent.deep_copy会复制storage/memory，写缓冲是进程内共享的，不复制
+        return self
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)
+                    self._queue.task_done()
+                    break
+                batch.append(nxt)
+            try:
+                self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _execute(self, batch) -> List[Any]:
+        """执行一批写操作并提交，单个写操作抛出的异常作为它的结果返回，不影响同批的其他写"""
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(sqlite_begin="IMMEDIATE")
+            with conn.begin():
+                results = []
+                for write, _ in batch:
+                    # 每个写操作一个SAVEPOINT：agno的存储类自己捕获异常并回滚session，
+                    # 加入的是外层事务时会把整批一起回滚，之后的写都报 closed transaction
+                    try:
+                        with conn.begin_nested():
+                            results.append(write(conn))
+                    except OperationalError as e:
+                        if "locked" in str(e):
+                            raise
+                        results.append(e)
+                    except Exception as e:
+                        results.append(e)
+                    if not conn.in_transaction():
+                        raise RuntimeError("A batched write ended the shared transaction")
+        self.stats.record_commit(len(batch))
+        return results
+
+    def _commit(self, batch) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                results = self._execute(batch)
+                for (_, future), result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        log_warning(f"Batched write failed: {result}")
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+                return
+            except OperationalError as e:
+                if "locked" not in str(e) or attempt == self.max_retries:
+                    break
+                # busy_timeout用完仍然拿不到锁，说明其他进程写得很多，退避后重试
+                self.stats.busy_retries += 1
+                time.sleep(min(1.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.5))
+            except Exception:
+                break
+
+        if len(batch) == 1:
+            write, future = batch[0]
+            try:
+                result = self._execute(batch)[0]
+            except Exception as e:
+                result = e
+            if isinstance(result, Exception):
+                log_warning(f"Batched write failed: {result}")
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+            return
+        # 整批失败时逐个提交，避免一条坏数据拖垮整批
+        for item in batch:
+            self._commit([item])
+
+
+def _flush_all() -> None:
+    # 写线程是daemon线程，进程退出前把还在队列里的写落盘
+    for (pid, _), batcher in list(_BATCHERS.items()):
+        if pid == os.getpid():
+            batcher.flush()
+
+
+atexit.register(_flush_all)
+
+
+def get_batcher(engine: Engine, **kwargs) -> WriteBatcher:
+    # fork出来的子进程里父进程的写线程已经不存在，按pid区分
+    key = (os.getpid(), id(engine))
+    with _registry_lock:
+        batcher = _BATCHERS.get(key)
+        if batcher is None:
+            batcher = _BATCHERS[key] = WriteBatcher(engine, **kwargs)
+        return batcher
+
+
+class _BoundSessions:
+    """让agno存储类里的 `with self.SqlSession() as sess` 在批量写线程中加入当前批次的事务"""
+
+    def __init__(self, default_factory):
+        self.default_factory = default_factory
+        self._local = threading.local()
+
+    def factory(self):
+        return getattr(self._local, "factory", None) or self.default_factory
+
+    @contextmanager
+    def bind(self, conn):
+        self._local.factory = sessionmaker(bind=conn)
+        try:
+            yield
+        finally:
+            self._local.factory = None
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class _PendingSessions:
+    """已提交到写缓冲、尚未落盘的会话，session_id -> Session"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Session] = {}
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def put(self, session: Session) -> None:
+        with self._lock:
+            self._sessions[session.session_id] = session
+
+    def done(self, session: Session) -> None:
+        """落盘后移除；期间又有更新的写入则保留更新的版本"""
+        with self._lock:
+            if self._sessions.get(session.session_id) is session:
+                del self._sessions[session.session_id]
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class _WalEngineMixin:
+    """固定使用WAL engine：agno 1.7的SqliteStorage/SqliteMemoryDb传入db_engine时会忽略它，改用内存数据库"""
+
+    def _init_wal(self, db_file: str, pool_size: int, busy_timeout: float, batcher: Optional[WriteBatcher]) -> None:
+        self._wal_engine = get_wal_engine(db_file, pool_size=pool_size, busy_timeout=busy_timeout)
+        self.batcher = batcher or get_batcher(self._wal_engine)
+
+    @property
+    def db_engine(self) -> Engine:
+        return self._wal_engine
+
+    @db_engine.setter
+    def db_engine(self, value):
+        pass
+
+
+class WalStorageMixin(_WalEngineMixin):
+    """
+    SqliteStorage的WAL + 连接池 + 批量提交模式
+    upsert放进后台批量提交队列，和其他线程同一时间的写合并成一个事务，提交后返回写入结果（失败时为None，与SqliteStorage一致）；
+    同一进程内read能读到尚未提交的写（read-your-writes）
+    """
+
+    def _init_wal(self, *args) -> None:
+        super()._init_wal(*args)
+        self._pending = _PendingSessions()
+
+    def __deepcopy__(self, memo):
+        # 预先放进memo，父类逐个属性deepcopy时engine直接共享
+        memo[id(self._wal_engine)] = self._wal_engine
+        return super().__deepcopy__(memo)
+
+    @property
+    def SqlSession(self):
+        return self._sessions.factory()
+
+    @SqlSession.setter
+    def SqlSession(self, value):
+        self._sessions = _BoundSessions(value)
+
+    def read(self, session_id: str, user_id: Optional[str] = None) -> Optional[Session]:
+        pending = self._pending.get(session_id)
+        if pending is not None and (user_id is None or pending.user_id == user_id):
+            return pending
+        return super().read(session_id=session_id, user_id=user_id)
+
+    def upsert(self, session: Session, create_and_retry: bool = True) -> Optional[Session]:
+        self._pending.put(session)
+
+        def write(conn):
+            with self._sessions.bind(conn):
+                return super(WalStorageMixin, self).upsert(session, create_and_retry=create_and_retry)
+
+        try:
+            return self.batcher.submit(write).result()
+        except Exception as e:
+            log_warning(f"Exception upserting session {session.session_id}: {e}")
+            return None
+        finally:
+            self._pending.done(session)
+
+    def flush(self) -> None:
+        """等待写缓冲落盘，进程退出前或需要跨进程可见时调用"""
+        self.batcher.flush()
+
+    def delete_session(self, session_id: Optional[str] = None):
+        self.batcher.flush()
+        super().delete_session(session_id)
+
+
+class WalSqliteStorage(WalStorageMixin, SqliteStorage):
+    """
+    WAL模式的SqliteStorage，适合playground多用户并发
+    Args:
+        table_name: 表名
+        db_file: 数据库文件
+        pool_size: 每个worker进程的连接池大小
+        busy_timeout: 等待写锁的秒数
+        batcher: 写缓冲，默认每个engine共享一个
+    """
+
+    def __init__(self, table_name: str, db_file: str, pool_size: int = 5, busy_timeout: float = 5.0, batcher: Optional[WriteBatcher] = None, **kwargs):
+        self._init_wal(db_file, pool_size, busy_timeout, batcher)
+        with immediate_transactions():
+            super().__init__(table_name=table_name, db_engine=self.db_engine, **kwargs)
+            # 提前建表：批量事务持有写锁时再建表会在另一个连接上等锁
+            self.create()
+
+
+class WalRunHistorySqliteStorage(WalStorageMixin, RunHistorySqliteStorage):
+    """WAL模式的RunHistorySqliteStorage，参数为两者之和"""
+
+    def __init__(self, table_name: str, db_file: str, pool_size: int = 5, busy_timeout: float = 5.0, batcher: Optional[WriteBatcher] = None, **kwargs):
+        self._init_wal(db_file, pool_size, busy_timeout, batcher)
+        with immediate_transactions():
+            super().__init__(table_name=table_name, db_engine=self.db_engine, **kwargs)
+            # 提前建表：批量事务持有写锁时再建表会在另一个连接上等锁
+            self.create()
+
+
+class WalSqliteMemoryDb(_WalEngineMixin, SqliteMemoryDb):
+    """
+    WAL模式的SqliteMemoryDb，记忆写入走批量提交，读取前先把待提交的写刷盘
+    """
+
+    def __init__(self, table_name: str = "memory", db_file: str = "tmp/agent.db", pool_size: int = 5, busy_timeout: float = 5.0, batcher: Optional[WriteBatcher] = None):
+        self._init_wal(db_file, pool_size, busy_timeout, batcher)
+        with immediate_transactions():
+            super().__init__(table_name=table_name, db_file=db_file, db_engine=self.db_engine)
+            self.create()
+
+    @property
+    def Session(self):
+        return self._sessions.factory()
+
+    @Session.setter
+    def Session(self, value):
+        self._sessions = _BoundSessions(value)
+
+    def upsert_memory(self, memory: MemoryRow, create_and_retry: bool = True) -> Future:
+        """放进写缓冲后立即返回，返回的Future在落盘后完成，写入失败时带异常并记录日志"""
+
+        def write(conn):
+            with self._sessions.bind(conn):
+                super(WalSqliteMemoryDb, self).upsert_memory(memory, create_and_retry=create_and_retry)
+
+        def report(future: Future) -> None:
+            if future.exception() is not None:
+                log_warning(f"Exception upserting memory {memory.id}: {future.exception()}")
+
+        future = self.batcher.submit(write)
+        future.add_done_callback(report)
+        return future
+
+    def read_memories(self, *args, **kwargs) -> List[MemoryRow]:
+        self.batcher.flush()
+        return super().read_memories(*args, **kwargs)
+
+    def delete_memory(self, memory_id: str) -> None:
+        self.batcher.flush()
+        super().delete_memory(memory_id)
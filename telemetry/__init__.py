@@ -0,0 +1,30 @@
+"""
+遥测模块
+agent / team 运行的分阶段延迟记录（模型TTFT、工具调用、知识库检索）和token/成本账本，写入本地SQLite
+每次模型调用可命中服务商前缀缓存的token测量（TELEMETRY_PREFIX_CACHE=1）
+看板见 `python -m telemetry.dashboard`
+"""
+
+from .instrument import InstrumentedAgent, InstrumentedTeam, LatencyInstrumentationMixin, PrefixCacheMixin, TokenLedgerMixin, run_spans
+from .ledger import PRICES, TokenLedger, attribute_tokens, estimate_tokens, get_token_ledger
+from .prefix_cache import PrefixCacheMeter, get_prefix_cache_meter
+from .store import LatencyStore, Span, get_latency_store
+
+__all__ = [
+    'InstrumentedAgent',
+    'InstrumentedTeam',
+    'LatencyInstrumentationMixin',
+    'TokenLedgerMixin',
+    'PrefixCacheMixin',
+    'run_spans',
+    'TokenLedger',
+    'attribute_tokens',
+    'estimate_tokens',
+    'get_token_ledger',
+    'PRICES',
+    'PrefixCacheMeter',
+    'get_prefix_cache_meter',
+    'LatencyStore',
+    'Span',
+    'get_latency_store',
+]
@@ -0,0 +1,91 @@
+"""
+延迟看板：各阶段（模型、工具、推理、检索）的次数和p50/p95，判断慢在哪里；
+token看板：输入token花在系统提示词、历史、知识库、工具输出还是成员回答上，按agent/模型/用户汇总成本
+
+    python -m telemetry.dashboard --since 3600
+    python -m telemetry.dashboard --db tmp/telemetry.db --component "Finance Agent" --series model
+    python -m telemetry.dashboard --tokens --by component part
+    python -m telemetry.dashboard --tokens --by model user_id
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from .ledger import TokenLedger
+from .store import DEFAULT_DB, LatencyStore
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def print_dashboard(store: LatencyStore, since: float = 3600, component: Optional[str] = None, series: Optional[str] = None, console: Optional[Console] = None) -> None:
+    console = console or Console()
+    window = f"last {since / 60:.0f} min" + (f", {component}" if component else "")
+
+    by_stage = Table(title=f"Latency by stage ({window})")
+    for column in ("stage", "count", "p50 ms", "p95 ms", "total s", "share"):
+        by_stage.add_column(column, justify="left" if column == "stage" else "right")
+    stages = [s for s in store.stats(since, component=component, by_name=False) if s["stage"] != "run"]
+    grand_total = sum(s["total"] for s in stages) or 1.0
+    for s in stages:
+        by_stage.add_row(s["stage"], str(s["count"]), _ms(s["p50"]), _ms(s["p95"]), f"{s['total']:.1f}", f"{s['total'] / grand_total:.0%}")
+    console.print(by_stage)
+
+    detail = Table(title=f"Latency by model / tool ({window})")
+    for column in ("stage", "name", "count", "p50 ms", "p95 ms", "ttft p50 ms", "ttft p95 ms"):
+        detail.add_column(column, justify="left" if column in ("stage", "name") else "right", overflow="fold")
+    for s in store.stats(since, component=component):
+        detail.add_row(s["stage"], s["name"] or "", str(s["count"]), _ms(s["p50"]), _ms(s["p95"]), _ms(s["ttft_p50"]), _ms(s["ttft_p95"]))
+    console.print(detail)
+
+    if series:
+        timeline = Table(title=f"{series} over time")
+        for column in ("minute", "count", "p50 ms", "p95 ms"):
+            timeline.add_column(column, justify="left" if column == "minute" else "right")
+        for point in store.series(series, since=since, component=component):
+            timeline.add_row(datetime.fromtimestamp(point["ts"]).strftime("%H:%M"), str(point["count"]), _ms(point["p50"]), _ms(point["p95"]))
+        console.print(timeline)
+
+
+def print_ledger(ledger: TokenLedger, since: float = 24 * 3600, by=("component", "part"), component: Optional[str] = None, console: Optional[Console] = None) -> None:
+    console = console or Console()
+    rows = ledger.totals(since, by=by, component=component)
+    total_input = sum(r["input_tokens"] for r in rows) or 1
+    table = Table(title=f"Tokens by {' / '.join(by)} (last {since / 3600:.0f} h)")
+    for column in (*by, "runs", "input", "share", "output", "cost $"):
+        table.add_column(column, justify="left" if column in by else "right", overflow="fold")
+    for r in rows:
+        table.add_row(
+            *[str(r[d]) for d in by], str(r["runs"]), f"{r['input_tokens']:,}", f"{r['input_tokens'] / total_input:.0%}",
+            f"{r['output_tokens']:,}", f"{r['cost']:.4f}",
+        )
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print p50/p95 latency per run stage")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--since", type=float, default=3600, help="统计最近多少秒")
+    parser.add_argument("--component", default=None, help="只看某个agent/team（按name）")
+    parser.add_argument("--series", default=None, help="按分钟显示某个阶段的p50/p95，如 model、tool")
+    parser.add_argument("--tokens", action="store_true", help="显示token账本而不是延迟")
+    parser.add_argument("--by", nargs="+", default=["component", "part"], help="token汇总维度：component model user_id part kind")
+    args = parser.parse_args()
+
+    store = TokenLedger(args.db) if args.tokens else LatencyStore(args.db)
+    start = time.perf_counter()
+    if args.tokens:
+        print_ledger(store, since=args.since, by=args.by, component=args.component)
+    else:
+        print_dashboard(store, since=args.since, component=args.component, series=args.series)
+    Console().print(f"[dim]queried {args.db} in {(time.perf_counter() - start) * 1000:.0f}ms[/dim]")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
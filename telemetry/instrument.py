@@ -0,0 +1,280 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+from agno.agent import Agent
+from agno.team.team import Team
+from agno.utils.log import log_debug, log_info, log_warning
+
+from models.prompt_cache import StablePromptMixin
+
+from .ledger import TokenLedger, attribute_tokens, get_token_ledger
+from .prefix_cache import PrefixCacheMeter, get_prefix_cache_meter, measuring
+from .store import LatencyStore, Span, get_latency_store
+
+# ReasoningTools的函数单独归为reasoning阶段，和外部工具（YFinance、DuckDuckGo）区分开
+REASONING_TOOLS = {"think", "analyze"}
+
+# run()/arun() 开始的时刻，_run等方法进入时取走
+_RUN_STARTED: ContextVar[Optional[float]] = ContextVar("run_started", default=None)
+# 正在执行的运行：(run_response, 开始时刻)。同一个agent并发处理多个请求时，
+# 每个线程/协程、每个流式生成器各自看到自己的运行，不读agent上会被其他请求覆盖的 run_response
+_CURRENT_RUN: ContextVar[Optional[Tuple[Any, Optional[float]]]] = ContextVar("current_run", default=None)
+
+
+def run_spans(run_response: Any, total: Optional[float] = None) -> List[Span]:
+    """
+    从一次运行的结果里拆出各阶段耗时：每次模型调用（含TTFT）、每次工具调用、知识库检索
+    :param run_response: RunResponse 或 TeamRunResponse
+    :param total: 整个运行的秒数
+    """
+    spans: List[Span] = []
+    if total is not None:
+        spans.append(Span("run", "total", total))
+    for message in run_response.messages or []:
+        if message.from_history or message.metrics is None or message.metrics.time is None:
+            continue
+        if message.role == "assistant":
+            spans.append(Span("model", run_response.model or "model", message.metrics.time, message.metrics.time_to_first_token))
+        elif message.role == "tool":
+            name = message.tool_name or "tool"
+            spans.append(Span("reasoning" if name in REASONING_TOOLS else "tool", name, message.metrics.time))
+    extra = getattr(run_response, "extra_data", None)
+    for references in (extra.references if extra is not None else None) or []:
+        if references.time is not None:
+            spans.append(Span("retrieval", "knowledge", references.time))
+    return spans
+
+
+def _bind_stream(events: Iterator[Any], current: Tuple[Any, Optional[float]]) -> Iterator[Any]:
+    # 每次推进生成器时绑定这次运行，多个流在同一线程里交替消费也不会串
+    try:
+        while True:
+            token = _CURRENT_RUN.set(current)
+            try:
+                event = next(events)
+            except StopIteration:
+                return
+            finally:
+                _CURRENT_RUN.reset(token)
+            yield event
+    finally:
+        events.close()
+
+
+async def _abind_stream(events: AsyncIterator[Any], current: Tuple[Any, Optional[float]]) -> AsyncIterator[Any]:
+    try:
+        while True:
+            token = _CURRENT_RUN.set(current)
+            try:
+                event = await events.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _CURRENT_RUN.reset(token)
+            yield event
+    finally:
+        await events.aclose()
+
+
+class RunEndHookMixin:
+    """
+    运行结束时调用 _after_run，同步/异步、流式/非流式都覆盖。
+    挂在agno写运行日志的位置（_log_agent_run / _log_team_run），运行失败时不调用。
+    _after_run 拿到的是这一次运行的 run_response 和开始时刻，同一个agent/team并发运行时互不干扰
+    """
+
+    def _after_run(self, user_id: Optional[str], run_response: Any, started: Optional[float]) -> None:
+        pass
+
+    def run(self, *args, **kwargs):
+        # 流式时这里只创建生成器，运行时间从此刻算起，包含调用方消费前的等待，误差可以忽略
+        token = _RUN_STARTED.set(time.perf_counter())
+        try:
+            return super().run(*args, **kwargs)
+        finally:
+            _RUN_STARTED.reset(token)
+
+    async def arun(self, *args, **kwargs):
+        token = _RUN_STARTED.set(time.perf_counter())
+        try:
+            return await super().arun(*args, **kwargs)
+        finally:
+            _RUN_STARTED.reset(token)
+
+    @staticmethod
+    def _current(args: tuple, kwargs: dict) -> Tuple[Any, Optional[float]]:
+        run_response = kwargs["run_response"] if "run_response" in kwargs else args[0]
+        return run_response, _RUN_STARTED.get() or time.perf_counter()
+
+    def _run(self, *args, **kwargs):
+        token = _CURRENT_RUN.set(self._current(args, kwargs))
+        try:
+            return super()._run(*args, **kwargs)
+        finally:
+            _CURRENT_RUN.reset(token)
+
+    def _run_stream(self, *args, **kwargs):
+        # 普通函数：在run()里立即取到开始时刻，返回包装过的生成器
+        return _bind_stream(super()._run_stream(*args, **kwargs), self._current(args, kwargs))
+
+    async def _arun(self, *args, **kwargs):
+        token = _CURRENT_RUN.set(self._current(args, kwargs))
+        try:
+            return await super()._arun(*args, **kwargs)
+        finally:
+            _CURRENT_RUN.reset(token)
+
+    def _arun_stream(self, *args, **kwargs):
+        return _abind_stream(super()._arun_stream(*args, **kwargs), self._current(args, kwargs))
+
+    def _run_ended(self, user_id: Optional[str]) -> None:
+        # continue_run等没有经过上面入口的运行，退回agent上的run_response
+        run_response, started = _CURRENT_RUN.get() or (self.run_response, None)
+        if run_response is not None:
+            self._after_run(user_id, run_response, started)
+
+    def _log_agent_run(self, session_id: str, user_id: Optional[str] = None) -> None:
+        super()._log_agent_run(session_id=session_id, user_id=user_id)
+        self._run_ended(user_id)
+
+    async def _alog_agent_run(self, session_id: str, user_id: Optional[str] = None) -> None:
+        await super()._alog_agent_run(session_id=session_id, user_id=user_id)
+        self._run_ended(user_id)
+
+    def _log_team_run(self, session_id: str, user_id: Optional[str] = None) -> None:
+        super()._log_team_run(session_id=session_id, user_id=user_id)
+        self._run_ended(user_id)
+
+    async def _alog_team_run(self, session_id: str, user_id: Optional[str] = None) -> None:
+        await super()._alog_team_run(session_id=session_id, user_id=user_id)
+        self._run_ended(user_id)
+
+
+class LatencyInstrumentationMixin(RunEndHookMixin):
+    """每次运行结束时把各阶段耗时写入LatencyStore"""
+
+    latency_store: Optional[LatencyStore]
+
+    def _after_run(self, user_id: Optional[str], run_response: Any, started: Optional[float]) -> None:
+        super()._after_run(user_id, run_response, started)
+        try:
+            spans = run_spans(run_response, total=time.perf_counter() - started if started else None)
+            store = self.latency_store or get_latency_store()
+            store.record(spans, run_id=run_response.run_id, session_id=run_response.session_id, component=self.name)
+            log_debug(f"Recorded {len(spans)} latency spans for run {run_response.run_id}")
+        except Exception as e:
+            log_warning(f"Could not record latency: {e}")
+
+
+class TokenLedgerMixin(RunEndHookMixin):
+    """每次运行结束时把输入token按系统提示词、记忆、历史、知识库、工具输出、成员回答等拆开记账"""
+
+    token_ledger: Optional[TokenLedger]
+
+    def _after_run(self, user_id: Optional[str], run_response: Any, started: Optional[float]) -> None:
+        super()._after_run(user_id, run_response, started)
+        try:
+            if not run_response.messages:
+                return
+            rows = attribute_tokens(run_response.messages, tools=getattr(self, "_tools_for_model", None))
+            ledger = self.token_ledger or get_token_ledger()
+            ledger.record(
+                rows,
+                model=run_response.model,
+                run_id=run_response.run_id,
+                session_id=run_response.session_id,
+                user_id=user_id,
+                component=self.name,
+            )
+        except Exception as e:
+            log_warning(f"Could not record token usage: {e}")
+
+
+class PrefixCacheMixin(RunEndHookMixin):
+    """设置了 TELEMETRY_PREFIX_CACHE 或指定了meter时，每次运行结束测量各次模型调用的提示词有多少token可以命中前缀缓存"""
+
+    prefix_cache_meter: Optional[PrefixCacheMeter]
+
+    def _after_run(self, user_id: Optional[str], run_response: Any, started: Optional[float]) -> None:
+        super()._after_run(user_id, run_response, started)
+        meter = self.prefix_cache_meter or (get_prefix_cache_meter() if measuring() else None)
+        if meter is None:
+            return
+        try:
+            if not run_response.messages:
+                return
+            rows = meter.measure(run_response.messages, tools=getattr(self, "_tools_for_model", None), model=run_response.model, component=self.name)
+            for row in rows:
+                log_info(
+                    f"{self.name} call {row['call']}: {row['eligible_tokens']}/{row['prompt_tokens']} prompt tokens cache-eligible, "
+                    f"{row['cached_tokens']} cached by provider"
+                )
+        except Exception as e:
+            log_warning(f"Could not measure prefix cache: {e}")
+
+
+@dataclass(init=False)
+class InstrumentedAgent(StablePromptMixin, LatencyInstrumentationMixin, TokenLedgerMixin, PrefixCacheMixin, Agent):
+    """
+    记录各阶段耗时和token用量的Agent，参数与Agent一致，另外：
+    Args:
+        latency_store: 延迟写入的存储，默认 tmp/telemetry.db
+        token_ledger: token账本，默认 tmp/telemetry.db
+        prefix_cache_meter: 前缀缓存测量，默认只在设置了 TELEMETRY_PREFIX_CACHE 时测量
+        stable_prompt: 系统提示词里的时间只保留日期并放到末尾，前缀可以命中服务商缓存（见 models.prompt_cache）
+    """
+
+    latency_store: Optional[LatencyStore] = None
+    token_ledger: Optional[TokenLedger] = None
+    prefix_cache_meter: Optional[PrefixCacheMeter] = None
+    stable_prompt: bool = True
+
+    def __init__(
+        self,
+        *args,
+        latency_store: Optional[LatencyStore] = None,
+        token_ledger: Optional[TokenLedger] = None,
+        prefix_cache_meter: Optional[PrefixCacheMeter] = None,
+        stable_prompt: bool = True,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.latency_store = latency_store
+        self.token_ledger = token_ledger
+        self.prefix_cache_meter = prefix_cache_meter
+        self.stable_prompt = stable_prompt
+
+
+@dataclass(init=False)
+class InstrumentedTeam(StablePromptMixin, LatencyInstrumentationMixin, TokenLedgerMixin, PrefixCacheMixin, Team):
+    """
+    记录各阶段耗时和token用量的Team，参数与Team一致，另外：
+    Args:
+        latency_store: 延迟写入的存储，默认 tmp/telemetry.db
+        token_ledger: token账本，默认 tmp/telemetry.db
+        prefix_cache_meter: 前缀缓存测量，默认只在设置了 TELEMETRY_PREFIX_CACHE 时测量
+        stable_prompt: 系统提示词里的时间只保留日期并放到末尾，前缀可以命中服务商缓存（见 models.prompt_cache）
+    成员要单独计时和记账时，成员也使用InstrumentedAgent
+    """
+
+    latency_store: Optional[LatencyStore] = None
+    token_ledger: Optional[TokenLedger] = None
+    prefix_cache_meter: Optional[PrefixCacheMeter] = None
+    stable_prompt: bool = True
+
+    def __init__(
+        self,
+        *args,
+        latency_store: Optional[LatencyStore] = None,
+        token_ledger: Optional[TokenLedger] = None,
+        prefix_cache_meter: Optional[PrefixCacheMeter] = None,
+        stable_prompt: bool = True,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.latency_store = latency_store
+        self.token_ledger = token_ledger
+        self.prefix_cache_meter = prefix_cache_meter
+        self.stable_prompt = stable_prompt
@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from models.tokens import estimate_tokens
+
+from .store import DEFAULT_DB, BufferedTable
+
+# 参考价格（美元 / 百万token，输入、输出），以服务商最新价格为准，可在TokenLedger(prices=...)里覆盖
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "qwen-turbo": (0.05, 0.20),
+}
+
+# 团队把任务交给成员的工具，返回内容是成员的回答
+MEMBER_TOOLS = {"transfer_task_to_member", "forward_task_to_member", "run_member_agents", "run_member_tasks"}
+
+# 系统提示词里agno用标签包起来的块
+_TAGGED_BLOCKS = [
+    ("memory", re.compile(r"<memories_from_previous_interactions>.*?</memories_from_previous_interactions>", re.S)),
+    ("history", re.compile(r"<summary_of_previous_interactions>.*?</summary_of_previous_interactions>", re.S)),
+]
+_REFERENCES = re.compile(r"<references>.*?</references>", re.S)
+
+# 输入token的归属
+PARTS = ("system", "memory", "history", "knowledge", "user", "tool_schemas", "assistant", "tool", "member")
+
+
+def _content(message: Any) -> str:
+    content = message.get_content_string() if hasattr(message, "get_content_string") else message.content
+    if message.tool_calls:
+        content = (content or "") + json.dumps(message.tool_calls, ensure_ascii=False, default=str)
+    return content or ""
+
+
+def message_parts(message: Any) -> Dict[str, int]:
+    """一条消息在提示词里占的token，按归属拆开"""
+    text = _content(message)
+    parts: Dict[str, int] = {}
+    if message.from_history:
+        return {"history": estimate_tokens(text)}
+    if message.role == "system":
+        for part, pattern in _TAGGED_BLOCKS:
+            for block in pattern.findall(text):
+                parts[part] = parts.get(part, 0) + estimate_tokens(block)
+            text = pattern.sub("", text)
+        parts["system"] = estimate_tokens(text)
+    elif message.role == "user":
+        parts["knowledge"] = sum(estimate_tokens(block) for block in _REFERENCES.findall(text))
+        parts["user"] = estimate_tokens(_REFERENCES.sub("", text))
+    elif message.role == "tool":
+        parts["member" if message.tool_name in MEMBER_TOOLS else "tool"] = estimate_tokens(text)
+    else:
+        parts["assistant"] = estimate_tokens(text)
+    return {k: v for k, v in parts.items() if v}
+
+
+def attribute_tokens(messages: Sequence[Any], tools: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    把一次运行里每次模型调用的输入token拆到各部分：第k次调用的提示词是它之前的全部消息（加上工具定义），
+    各部分先按字符估计，再按服务商返回的input_tokens等比缩放；没有返回用量时直接用估计值
+    :return: [{"part", "kind": "input"/"output", "tokens", "estimated"}]，每次调用各一组
+    """
+    schema_tokens = estimate_tokens(json.dumps(tools, ensure_ascii=False, default=str)) if tools else 0
+    context: Dict[str, int] = {}
+    rows: List[Dict[str, Any]] = []
+    for message in messages:
+        if message.role == "assistant" and not message.from_history:
+            prompt = dict(context)
+            if schema_tokens:
+                prompt["tool_schemas"] = schema_tokens
+            metrics = message.metrics
+            reported = metrics.input_tokens if metrics is not None else 0
+            estimate = sum(prompt.values()) or 1
+            scale = reported / estimate if reported else 1.0
+            for part, tokens in prompt.items():
+                rows.append({"part": part, "kind": "input", "tokens": round(tokens * scale), "estimated": not reported})
+            output = metrics.output_tokens if metrics is not None and metrics.output_tokens else estimate_tokens(_content(message))
+            rows.append({"part": "completion", "kind": "output", "tokens": output, "estimated": not (metrics and metrics.output_tokens)})
+        for part, tokens in message_parts(message).items():
+            context[part] = context.get(part, 0) + tokens
+    return rows
+
+
+class TokenLedger(BufferedTable):
+    """
+    token和成本账本（SQLite），每行是一次运行里某个模型在某个部分上消耗的token
+    :param db_file: SQLite文件，默认与延迟存储同一个文件
+    :param prices: 模型id -> (输入, 输出) 美元/百万token
+    """
+
+    def __init__(self, db_file: str = DEFAULT_DB, prices: Optional[Dict[str, Tuple[float, float]]] = None, flush_interval: float = 1.0):
+        self.prices = dict(PRICES, **(prices or {}))
+        super().__init__(
+            db_file,
+            schema="""
+            CREATE TABLE IF NOT EXISTS token_ledger (
+                ts REAL NOT NULL,
+                run_id TEXT,
+                session_id TEXT,
+                user_id TEXT,
+                component TEXT,
+                model TEXT,
+                part TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                cost REAL NOT NULL,
+                estimated INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ledger_ts ON token_ledger (ts);
+            """,
+            insert_sql="INSERT INTO token_ledger VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            flush_interval=flush_interval,
+        )
+
+    def cost(self, model: Optional[str], kind: str, tokens: int) -> float:
+        price_in, price_out = self.prices.get(model or "", (0.0, 0.0))
+        return tokens * (price_in if kind == "input" else price_out) / 1e6
+
+    def record(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        model: Optional[str],
+        run_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        component: Optional[str] = None,
+        ts: Optional[float] = None,
+    ) -> None:
+        # 同一次运行里多次模型调用按 (part, kind) 合并成一行
+        merged: Dict[Tuple[str, str], List[int]] = {}
+        for row in rows:
+            entry = merged.setdefault((row["part"], row["kind"]), [0, 0])
+            entry[0] += row["tokens"]
+            entry[1] |= int(row["estimated"])
+        ts = ts or time.time()
+        self._append([
+            (ts, run_id, session_id, user_id, component, model, part, kind, tokens, self.cost(model, kind, tokens), estimated)
+            for (part, kind), (tokens, estimated) in merged.items()
+        ])
+
+    def totals(self, since: float = 24 * 3600, by: Sequence[str] = ("component",), component: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按维度汇总：by 取 component / model / user_id / part / kind 的组合，按成本和token数从高到低
+        """
+        allowed = {"component", "model", "user_id", "part", "kind", "run_id", "session_id"}
+        if not set(by) <= allowed:
+            raise ValueError(f"Unknown dimensions: {set(by) - allowed}")
+        columns = ", ".join(by)
+        sql = (
+            f"SELECT {columns}, SUM(CASE WHEN kind = 'input' THEN tokens ELSE 0 END), "
+            f"SUM(CASE WHEN kind = 'output' THEN tokens ELSE 0 END), SUM(cost), COUNT(DISTINCT run_id) "
+            f"FROM token_ledger WHERE ts >= ?"
+        )
+        params: List[Any] = [time.time() - since]
+        if component:
+            sql += " AND component = ?"
+            params.append(component)
+        sql += f" GROUP BY {columns} ORDER BY SUM(cost) DESC, SUM(tokens) DESC"
+        return [
+            dict(zip(by, row[: len(by)]), input_tokens=row[-4], output_tokens=row[-3], cost=row[-2], runs=row[-1])
+            for row in self._query(sql, params)
+        ]
+
+
+_DEFAULT: Dict[Tuple[int, str], TokenLedger] = {}
+_default_lock = threading.Lock()
+
+
+def get_token_ledger(db_file: str = DEFAULT_DB) -> TokenLedger:
+    """进程内共享的账本，按 (pid, 文件) 缓存"""
+    key = (os.getpid(), os.path.abspath(db_file))
+    with _default_lock:
+        ledger = _DEFAULT.get(key)
+        if ledger is None:
+            ledger = _DEFAULT[key] = TokenLedger(db_file)
+    return ledger
@@ -0,0 +1,124 @@
+"""
+前缀缓存测量：每次模型调用的提示词里，有多少token和同一模型之前某次调用的开头完全相同（可以命中服务商的前缀缓存），
+和服务商实际返回的缓存命中token（cached_tokens）放在一起对比
+
+    TELEMETRY_PREFIX_CACHE=1 python level_4_team.py        # InstrumentedAgent/Team 每次运行结束输出各次调用的可缓存token
+    python benchmarks/offline_bench.py level_4_team:reasoning_finance_team --runs 3 --prefix-cache
+    python benchmarks/offline_bench.py level_4_team:reasoning_finance_team --runs 3 --prefix-cache --unstable-prompt
+
+提示词按服务商的顺序近似为：工具定义，然后逐条消息；token数按字符估计，有服务商返回的input_tokens时等比缩放
+"""
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from .ledger import _content, estimate_tokens
+
+# 设置为1时 InstrumentedAgent/Team 在每次运行结束后测量
+PREFIX_CACHE_ENV = "TELEMETRY_PREFIX_CACHE"
+
+# 服务商前缀缓存的最小长度（token），共同前缀不够长时不会缓存；按模型id前缀匹配，以官方文档为准
+MIN_PREFIX_TOKENS: Dict[str, int] = {
+    "qwen": 256,
+    "gemini": 1024,
+    "gpt": 1024,
+}
+DEFAULT_MIN_PREFIX_TOKENS = 1024
+
+
+def measuring() -> bool:
+    return os.getenv(PREFIX_CACHE_ENV, "") not in ("", "0")
+
+
+def min_prefix_tokens(model: Optional[str]) -> int:
+    return next((n for prefix, n in MIN_PREFIX_TOKENS.items() if (model or "").startswith(prefix)), DEFAULT_MIN_PREFIX_TOKENS)
+
+
+def prompt_segments(messages: Sequence[Any], tools: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+    """一次调用的提示词按服务商拼接的顺序拆成段：工具定义，然后每条消息"""
+    segments = [json.dumps(tools, ensure_ascii=False, sort_keys=True, default=str)] if tools else []
+    return segments + [f"{message.role}\n{_content(message)}" for message in messages]
+
+
+def shared_prefix_tokens(segments: Sequence[str], other: Sequence[str]) -> int:
+    """两次调用提示词的共同开头的token数：完全相同的段，加上第一个不同段的共同前缀"""
+    tokens = 0
+    for a, b in zip(segments, other):
+        if a == b:
+            tokens += estimate_tokens(a)
+            continue
+        return tokens + estimate_tokens(os.path.commonprefix([a, b]))
+    return tokens
+
+
+class PrefixCacheMeter:
+    """
+    按模型保留最近的提示词，新的调用和它们逐一比较，取最长的共同前缀
+    :param history: 每个模型保留的提示词数
+    """
+
+    def __init__(self, history: int = 256):
+        self._prompts: Dict[str, Deque[List[str]]] = {}
+        self._totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.history = history
+
+    def measure(self, messages: Sequence[Any], tools: Optional[List[Dict[str, Any]]] = None, model: Optional[str] = None, component: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        测量一次运行里的每次模型调用：第k次调用的提示词是它之前的全部消息
+        :return: [{"call", "prompt_tokens", "shared_tokens", "eligible_tokens", "cached_tokens", "estimated"}]
+        """
+        rows = []
+        minimum = min_prefix_tokens(model)
+        for i, message in enumerate(messages):
+            if message.role != "assistant" or message.from_history:
+                continue
+            segments = prompt_segments(messages[:i], tools)
+            estimate = sum(estimate_tokens(s) for s in segments) or 1
+            with self._lock:
+                previous = self._prompts.setdefault(model or "", deque(maxlen=self.history))
+                shared = max((shared_prefix_tokens(segments, p) for p in previous), default=0)
+                previous.append(segments)
+            metrics = message.metrics
+            reported = metrics.input_tokens if metrics is not None else 0
+            scale = reported / estimate if reported else 1.0
+            shared = round(shared * scale)
+            rows.append({
+                "call": len(rows) + 1,
+                "prompt_tokens": reported or estimate,
+                "shared_tokens": shared,
+                "eligible_tokens": shared if shared >= minimum else 0,
+                "cached_tokens": (metrics.cached_tokens or 0) if metrics is not None else 0,
+                "estimated": not reported,
+            })
+        with self._lock:
+            totals = self._totals.setdefault((component or "", model or ""), {"calls": 0, "prompt_tokens": 0, "eligible_tokens": 0, "cached_tokens": 0})
+            for row in rows:
+                totals["calls"] += 1
+                for key in ("prompt_tokens", "eligible_tokens", "cached_tokens"):
+                    totals[key] += row[key]
+        return rows
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """按 (component, model) 汇总"""
+        with self._lock:
+            return [dict(component=c, model=m, **t) for (c, m), t in self._totals.items()]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._prompts.clear()
+            self._totals.clear()
+
+
+_DEFAULT: Optional[PrefixCacheMeter] = None
+_default_lock = threading.Lock()
+
+
+def get_prefix_cache_meter() -> PrefixCacheMeter:
+    global _DEFAULT
+    with _default_lock:
+        if _DEFAULT is None:
+            _DEFAULT = PrefixCacheMeter()
+    return _DEFAULT
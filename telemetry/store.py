@@ -0,0 +1,206 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_DB = "tmp/telemetry.db"
+
+
+@dataclass
+class Span:
+    """
+    一次运行中某个阶段的耗时
+    :param stage: run / model / tool / reasoning / retrieval
+    :param name: 模型id、工具名等
+    :param duration: 秒
+    :param ttft: 首个token的秒数，只有流式的模型调用有
+    """
+
+    stage: str
+    name: str
+    duration: float
+    ttft: Optional[float] = None
+
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+class BufferedTable:
+    """
+    SQLite表的缓冲写入：记录先放内存，由后台线程定期批量提交，运行结束时不阻塞在磁盘IO上
+    :param db_file: SQLite文件
+    :param schema: 建表和索引的SQL
+    :param insert_sql: 插入一行的SQL
+    :param flush_interval: 落盘间隔（秒）
+    """
+
+    def __init__(self, db_file: str, schema: str, insert_sql: str, flush_interval: float = 1.0):
+        self.db_file = db_file
+        self.insert_sql = insert_sql
+        os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(schema)
+        self._db_lock = threading.Lock()
+        self._buffer: List[Tuple] = []
+        self._buffer_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(flush_interval,), name=type(self).__name__, daemon=True)
+        self._thread.start()
+        _STORES.add(self)
+
+    def _append(self, rows: List[Tuple]) -> None:
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+
+    def flush(self) -> None:
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        with self._db_lock:
+            self._conn.executemany(self.insert_sql, rows)
+            self._conn.commit()
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # 数据库被其他进程锁住时留到下一轮
+                pass
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        self.flush()
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # agent.deep_copy() 出来的副本写同一个存储
+        return self
+
+
+class LatencyStore(BufferedTable):
+    """
+    本地时序存储（SQLite），每行是一次运行里的一个阶段
+    :param db_file: SQLite文件
+    :param flush_interval: 落盘间隔（秒）
+    """
+
+    def __init__(self, db_file: str = DEFAULT_DB, flush_interval: float = 1.0):
+        super().__init__(
+            db_file,
+            schema="""
+            CREATE TABLE IF NOT EXISTS spans (
+                ts REAL NOT NULL,
+                run_id TEXT,
+                session_id TEXT,
+                component TEXT,
+                stage TEXT NOT NULL,
+                name TEXT,
+                duration REAL NOT NULL,
+                ttft REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_spans_ts ON spans (ts);
+            CREATE INDEX IF NOT EXISTS idx_spans_stage ON spans (stage, name, ts);
+            """,
+            insert_sql="INSERT INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            flush_interval=flush_interval,
+        )
+
+    def record(
+        self,
+        spans: Iterable[Span],
+        run_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        component: Optional[str] = None,
+        ts: Optional[float] = None,
+    ) -> None:
+        ts = ts or time.time()
+        self._append([(ts, run_id, session_id, component, s.stage, s.name, s.duration, s.ttft) for s in spans])
+
+    def _select(self, since: float, stage: Optional[str], component: Optional[str], columns: str) -> List[Tuple]:
+        sql = f"SELECT {columns} FROM spans WHERE ts >= ?"
+        params: List[Any] = [time.time() - since]
+        if stage:
+            sql += " AND stage = ?"
+            params.append(stage)
+        if component:
+            sql += " AND component = ?"
+            params.append(component)
+        return self._query(sql, params)
+
+    def stats(self, since: float = 3600, stage: Optional[str] = None, component: Optional[str] = None, by_name: bool = True) -> List[Dict[str, Any]]:
+        """
+        最近since秒内每个阶段（by_name时细分到模型/工具）的次数、p50/p95耗时和TTFT
+        """
+        groups: Dict[Tuple, Tuple[List[float], List[float]]] = {}
+        for stage_, name, duration, ttft in self._select(since, stage, component, "stage, name, duration, ttft"):
+            durations, ttfts = groups.setdefault((stage_, name if by_name else None), ([], []))
+            durations.append(duration)
+            if ttft is not None:
+                ttfts.append(ttft)
+        return [
+            {
+                "stage": stage_,
+                "name": name,
+                "count": len(durations),
+                "p50": percentile(durations, 0.5),
+                "p95": percentile(durations, 0.95),
+                "ttft_p50": percentile(ttfts, 0.5),
+                "ttft_p95": percentile(ttfts, 0.95),
+                "total": sum(durations),
+            }
+            for (stage_, name), (durations, ttfts) in sorted(groups.items(), key=lambda kv: -sum(kv[1][0]))
+        ]
+
+    def series(self, stage: str, since: float = 3600, bucket: float = 60, component: Optional[str] = None) -> List[Dict[str, Any]]:
+        """某个阶段按时间分桶的p50/p95，用于看延迟随时间的变化"""
+        buckets: Dict[float, List[float]] = {}
+        for ts, duration in self._select(since, stage, component, "ts, duration"):
+            buckets.setdefault(ts - ts % bucket, []).append(duration)
+        return [
+            {"ts": ts, "count": len(values), "p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+            for ts, values in sorted(buckets.items())
+        ]
+
+_STORES: "weakref.WeakSet[BufferedTable]" = weakref.WeakSet()
+_DEFAULT: Dict[Tuple[int, str], LatencyStore] = {}
+_default_lock = threading.Lock()
+
+
+def get_latency_store(db_file: str = DEFAULT_DB) -> LatencyStore:
+    """进程内共享的存储，按 (pid, 文件) 缓存"""
+    key = (os.getpid(), os.path.abspath(db_file))
+    with _default_lock:
+        store = _DEFAULT.get(key)
+        if store is None:
+            store = _DEFAULT[key] = LatencyStore(db_file)
+    return store
+
+
+@atexit.register
+def _flush_all() -> None:
+    for store in list(_STORES):
+        try:
+            store.flush()
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,30 @@
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+
+from benchmarks.stub_openai_server import StubConfig, create_app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def stub_server():
+    """进程内启动假模型服务，返回 (base_url, config)，首token延迟固定0.3秒"""
+    config = StubConfig(ttft=0.3, tokens=5, tokens_per_sec=1000)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}/v1", config
+    server.should_exit = True
+    thread.join(timeout=5)
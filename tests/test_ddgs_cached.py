@@ -0,0 +1,68 @@
+import json
+import time
+
+from tools.ddgs_cached import CachedDuckDuckGoTools, SearchResultStore, StubSearchBackend, normalize_query
+from tools.ratelimit import TokenBucket
+
+
+def make_tools(tmp_path, backend, **kwargs):
+    store = SearchResultStore(db_file=str(tmp_path / "search_cache.db"))
+    return CachedDuckDuckGoTools(store=store, backend=backend, limiter=TokenBucket(rate=1000, capacity=100), **kwargs)
+
+
+def test_normalize_query_keeps_order_and_symbols():
+    assert normalize_query("AAPL  news, today") == normalize_query("aapl NEWS today")
+    assert normalize_query("china exports to us") != normalize_query("us exports to china")
+    assert normalize_query("S&P 500") != normalize_query("S P 500")
+
+
+def test_cache_hit(tmp_path):
+    backend = StubSearchBackend()
+    tools = make_tools(tmp_path, backend)
+
+    first = tools.duckduckgo_search("AAPL news")
+    assert tools.duckduckgo_search("aapl  NEWS.") == first
+    assert backend.calls == ["AAPL news"]
+
+    # 新的实例读同一个磁盘缓存
+    assert make_tools(tmp_path, backend).duckduckgo_search("AAPL news") == first
+    assert len(backend.calls) == 1
+
+
+def test_backoff_on_rate_limit(tmp_path, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("tools.ddgs_cached.random.uniform", lambda a, b: 0.0)
+    monkeypatch.setattr("tools.ddgs_cached.time.sleep", sleeps.append)
+    backend = StubSearchBackend(rate_limit_first=2)
+    tools = make_tools(tmp_path, backend)
+
+    results = json.loads(tools.duckduckgo_search("AAPL news"))
+    assert results[0]["title"] == "Result for AAPL news"
+    assert len(backend.calls) == 3
+    # 退避时间按指数增长；StubSearchBackend每次调用也会sleep(0)
+    assert [s for s in sleeps if s] == [1.0, 2.0]
+
+
+def test_rate_limit_exhausted(tmp_path, monkeypatch):
+    monkeypatch.setattr("tools.ddgs_cached.time.sleep", lambda s: None)
+    backend = StubSearchBackend(rate_limit_first=10)
+    tools = make_tools(tmp_path, backend, max_retries=2)
+
+    assert tools.duckduckgo_search("AAPL news").startswith("DuckDuckGo rate limit reached")
+    assert len(backend.calls) == 3
+
+
+def test_search_many_runs_concurrently(tmp_path):
+    backend = StubSearchBackend(latency=0.3)
+    tools = make_tools(tmp_path, backend, max_workers=4)
+    queries = ["AAPL news", "MSFT earnings", "GOOGL outlook", "aapl NEWS"]
+
+    start = time.perf_counter()
+    results = json.loads(tools.duckduckgo_search_many(queries))
+    elapsed = time.perf_counter() - start
+
+    assert list(results) == queries
+    assert results["aapl NEWS"] == results["AAPL news"]
+    # 只差大小写的查询只搜一次，三个查询并发执行
+    assert sorted(backend.calls) == ["AAPL news", "GOOGL outlook", "MSFT earnings"]
+    assert elapsed < 0.3 * 3 * 0.7
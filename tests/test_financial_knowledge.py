@@ -0,0 +1,49 @@
+import pytest
+from agno.document.base import Document
+from agno.vectordb.lancedb import SearchType
+
+from knowledge.financial import STATEMENT, FinancialLanceDb, build_where
+from memories.retrieval import HashEmbedder
+
+
+def statements():
+    documents = []
+    for code in ("600519", "000858", "000568"):
+        for year in (2022, 2023, 2024):
+            for report_type, period_end in (("年报", "12-31"), ("中报", "06-30")):
+                date = f"{year}-{period_end}"
+                documents.append(Document(
+                    content=f"[{code} 利润表 {date} {report_type}] 营业总收入 {year - 1900}.5亿；毛利率 {50 + year % 7}%",
+                    name=f"{code}_利润表_{date}",
+                    meta_data={"code": code, "doc_type": STATEMENT, "report_type": report_type, "date": date},
+                ))
+    return documents
+
+
+@pytest.fixture(params=[SearchType.vector, SearchType.keyword, SearchType.hybrid])
+def vector_db(request, tmp_path):
+    db = FinancialLanceDb(uri=str(tmp_path / "lancedb"), table_name="financial_reports", search_type=request.param, embedder=HashEmbedder())
+    db.create()
+    db.insert(statements())
+    return db
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"report_type": "年报", "since": "2024"}, {("600519", "2024-12-31"), ("000858", "2024-12-31"), ("000568", "2024-12-31")}),
+    ({"code": "600519", "since": "2023"}, {("600519", d) for d in ("2023-06-30", "2023-12-31", "2024-06-30", "2024-12-31")}),
+    ({"code": "SH600519", "report_type": "年报", "until": "2023"}, {("600519", "2022-12-31"), ("600519", "2023-12-31")}),
+])
+def test_filtered_search_returns_every_match(vector_db, filters, expected):
+    results = vector_db.search("营业总收入 毛利率", 5, filters)
+    assert {(d.meta_data["code"], d.meta_data["date"]) for d in results} == expected
+
+
+def test_filtered_search_respects_limit(vector_db):
+    results = vector_db.search("营业总收入 毛利率", 2, {"code": "600519"})
+    assert len(results) == 2 and all(d.meta_data["code"] == "600519" for d in results)
+
+
+def test_build_where():
+    where, rest = build_where({"code": ["600519", "SZ000858"], "since": "2023", "until": "2024-06", "statement": "利润表"})
+    assert where == "code IN ('600519', '000858') AND date >= '2023' AND date <= '2024-06-31'"
+    assert rest == {"statement": "利润表"}
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from models import gemini_cache
+from models.gemini_cache import CachedGemini
+
+
+class FakeCaches:
+    def __init__(self, fail: int = 0, latency: float = 0.0):
+        self.fail = fail
+        self.latency = latency
+        self.created = []
+        self.lock_held = []
+
+    def create(self, model, config):
+        self.lock_held.append(gemini_cache._lock.locked())
+        time.sleep(self.latency)
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("transient")
+        self.created.append(config.display_name)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(gemini_cache, "_CACHES", {})
+    monkeypatch.setattr(gemini_cache, "_CREATING", set())
+    monkeypatch.setitem(gemini_cache.MIN_CACHE_TOKENS, "gemini-2.0-flash", 1)
+    caches = FakeCaches()
+    gemini = CachedGemini(id="gemini-2.0-flash", api_key="test", context_cache=True)
+    monkeypatch.setattr(gemini, "get_client", lambda: SimpleNamespace(caches=caches))
+    return gemini, caches
+
+
+def test_same_prompt_shares_one_cache(model):
+    gemini, caches = model
+    assert gemini._cache_name("You are a finance agent.", None) == gemini._cache_name("You are a finance agent.", None)
+    assert len(caches.created) == 1
+
+
+def test_live_caches_are_bounded(model, monkeypatch):
+    gemini, caches = model
+    monkeypatch.setattr(gemini_cache, "MAX_CACHES", 3)
+    # 系统提示词每次都不一样，如带精确时间
+    names = [gemini._cache_name(f"You are a finance agent. The time is 10:00:{i:02d}", None) for i in range(10)]
+    assert len(caches.created) == 3 and names[3:] == [None] * 7
+    assert len(gemini_cache._CACHES) == 3
+
+
+def test_expired_entries_are_pruned(model, monkeypatch):
+    gemini, caches = model
+    monkeypatch.setattr(gemini_cache, "MAX_CACHES", 2)
+    now = 1_000_000.0
+    monkeypatch.setattr(gemini_cache.time, "time", lambda: now)
+    gemini._cache_name("prompt a", None)
+    gemini._cache_name("prompt b", None)
+    now += gemini.context_cache_ttl + 1
+    assert gemini._cache_name("prompt c", None) is not None
+    assert len(gemini_cache._CACHES) == 1
+
+
+def test_failure_is_retried_after_a_while(model, monkeypatch):
+    gemini, caches = model
+    caches.fail = 1
+    now = 1_000_000.0
+    monkeypatch.setattr(gemini_cache.time, "time", lambda: now)
+    assert gemini._cache_name("You are a finance agent.", None) is None
+    assert gemini._cache_name("You are a finance agent.", None) is None
+    now += gemini_cache.RETRY_AFTER + 1
+    assert gemini._cache_name("You are a finance agent.", None) == "cachedContents/1"
+
+
+def test_create_runs_outside_the_lock_once_per_key(model):
+    gemini, caches = model
+    caches.latency = 0.3
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gemini._cache_name("You are a finance agent.", None))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # 创建期间其他模型的请求不被挡住
+    time.sleep(0.05)
+    start = time.perf_counter()
+    assert CachedGemini(id="gemini-2.5-pro", api_key="test", context_cache=True)._cache_name("short prompt", None) is None
+    assert time.perf_counter() - start < 0.2
+    for thread in threads:
+        thread.join()
+    assert caches.lock_held == [False]
+    assert results.count("cachedContents/1") == 1 and results.count(None) == 3
+
+
+def test_async_path_does_not_block_the_loop(model):
+    gemini, caches = model
+    caches.latency = 0.3
+
+    async def request():
+        start = time.perf_counter()
+        name = gemini._cache_name("You are a finance agent.", None)
+        return name, time.perf_counter() - start
+
+    name, seconds = asyncio.run(request())
+    assert name is None and seconds < 0.2
+    deadline = time.time() + 5
+    while gemini._cache_name("You are a finance agent.", None) is None and time.time() < deadline:
+        time.sleep(0.05)
+    assert gemini._cache_name("You are a finance agent.", None) == "cachedContents/1"
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models import stub_model
+from telemetry.instrument import InstrumentedAgent
+
+
+class Recorder:
+    """LatencyStore / TokenLedger 的替身，只记下每次record的参数"""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, items, run_id=None, **kwargs):
+        with self._lock:
+            self.records.append(dict(kwargs, run_id=run_id, items=list(items)))
+
+    def by_run(self):
+        runs = {}
+        for record in self.records:
+            assert record["run_id"] not in runs, f"run {record['run_id']} recorded twice"
+            runs[record["run_id"]] = record
+        return runs
+
+
+@pytest.fixture
+def agent(stub_server):
+    base_url, _ = stub_server
+    # 同一个agent被多个请求共用，和playground、serve.py一样
+    return InstrumentedAgent(name="Finance Agent", model=stub_model(None, base_url), latency_store=Recorder(), token_ledger=Recorder())
+
+
+def prompt(size):
+    return "营收" * (size * 200)
+
+
+def user_tokens(record):
+    return sum(row["tokens"] for row in record["items"] if row["part"] == "user")
+
+
+def check_runs(agent, run_ids, sizes):
+    spans = agent.latency_store.by_run()
+    ledger = agent.token_ledger.by_run()
+    assert set(spans) == set(ledger) == set(run_ids)
+    for run_id in run_ids:
+        stages = [s.stage for s in spans[run_id]["items"]]
+        assert stages == ["run", "model"]
+        total = spans[run_id]["items"][0].duration
+        # 每次运行至少等一次0.3秒的首token延迟，且不会把别的请求的开始时间算进来
+        assert 0.3 <= total < 2.0
+    # 账本里每次运行记的是自己的提示词：提示词越长，user部分的token越多
+    tokens = [user_tokens(ledger[run_id]) for run_id in run_ids]
+    assert tokens == sorted(tokens) and len(set(tokens)) == len(sizes)
+
+
+def test_concurrent_runs_on_a_shared_agent(agent):
+    sizes = [1, 2, 3, 4]
+    with ThreadPoolExecutor(max_workers=len(sizes)) as pool:
+        responses = list(pool.map(lambda size: agent.run(prompt(size)), sizes))
+    check_runs(agent, [r.run_id for r in responses], sizes)
+
+
+def test_interleaved_streams(agent):
+    sizes = [1, 2]
+    streams = [agent.run(prompt(size), stream=True) for size in sizes]
+    run_ids = [None, None]
+    # 两个流在同一线程里交替消费
+    active = [iter(s) for s in streams]
+    while any(active):
+        for i, stream in enumerate(active):
+            if stream is None:
+                continue
+            event = next(stream, None)
+            if event is None:
+                active[i] = None
+            else:
+                run_ids[i] = event.run_id
+    check_runs(agent, run_ids, sizes)
+
+
+def test_concurrent_async_runs(agent):
+    sizes = [1, 2, 3]
+
+    async def main():
+        return await asyncio.gather(*(agent.arun(prompt(size)) for size in sizes))
+
+    responses = asyncio.run(main())
+    check_runs(agent, [r.run_id for r in responses], sizes)
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from tools.local_ashare import LocalAShareTools, LocalDataIndex, wide_statement
+
+
+def write_statement(root, code, df):
+    path = root / "data" / code / "financial_reports" / "利润表.csv"
+    path.parent.mkdir(parents=True)
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+
+
+@pytest.fixture
+def toolkit(tmp_path):
+    # A股：每期一行的宽表
+    write_statement(tmp_path, "600519", pd.DataFrame([
+        {"REPORT_DATE": f"{year}-12-31 00:00:00", "REPORT_TYPE": "年报", "OPERATE_INCOME": (year - 2000) * 1e10, "NETPROFIT": 5e10, "BASIC_EPS": year - 1980, "EXTRA": 1}
+        for year in range(2015, 2025)
+    ]))
+    # 港股：报告期 x STD_ITEM_NAME 的长表
+    write_statement(tmp_path, "00700", pd.DataFrame([
+        {"SECUCODE": "00700.HK", "REPORT_DATE": f"{year}-12-31 00:00:00", "STD_ITEM_NAME": item, "AMOUNT": amount}
+        for year in (2022, 2023, 2024)
+        for item, amount in (("营业额", (year - 2017) * 1e10), ("年内溢利", (year - 2012) * 1e9), ("毛利", 2.5e10), ("每股盈利", year - 2020.5))
+    ]))
+    index = LocalDataIndex(str(tmp_path / "data"), str(tmp_path / "financial"), str(tmp_path / "logs"))
+    return LocalAShareTools(index=index)
+
+
+def test_hk_long_statement_is_pivoted():
+    long = pd.DataFrame({
+        "REPORT_DATE": ["2024-12-31", "2024-12-31", "2023-12-31"],
+        "STD_ITEM_NAME": ["营业额", "年内溢利", "营业额"],
+        "AMOUNT": [7e10, 1.2e10, 6e10],
+    })
+    wide = wide_statement(long, "利润表")
+    assert list(wide.columns) == ["REPORT_DATE", "NETPROFIT", "OPERATE_INCOME"]
+    assert wide.set_index("REPORT_DATE")["OPERATE_INCOME"].to_dict() == {"2023-12-31": 6e10, "2024-12-31": 7e10}
+    # A股宽表原样返回
+    assert wide_statement(wide, "利润表") is wide
+
+
+def test_hk_statement_keeps_amounts(toolkit):
+    assert toolkit.get_financial_statement("00700.HK", "income") == (
+        "page 1/1, 3 rows\n"
+        "REPORT_DATE,OPERATE_INCOME(亿),NETPROFIT(亿),BASIC_EPS,毛利(亿)\n"
+        "2024-12-31,700.0,120.0,3.5,250.0\n"
+        "2023-12-31,600.0,110.0,2.5,250.0\n"
+        "2022-12-31,500.0,100.0,1.5,250.0\n"
+    )
+    assert toolkit.get_financial_statement("00700", "利润表", columns=["净利润"]).splitlines()[1:3] == ["REPORT_DATE,NETPROFIT(亿)", "2024-12-31,120.0"]
+
+
+def test_statement_and_column_aliases(toolkit):
+    by_alias = toolkit.get_financial_statement("600519", "profit", columns=["营业收入", "基本每股收益"])
+    assert by_alias == toolkit.get_financial_statement("600519", "利润表", columns=["OPERATE_INCOME", "BASIC_EPS"])
+    assert by_alias.splitlines()[1] == "REPORT_DATE,REPORT_TYPE,OPERATE_INCOME(亿),BASIC_EPS"
+    # 默认只返回核心字段
+    assert "EXTRA" not in toolkit.get_financial_statement("600519")
+    assert toolkit.get_financial_statement("600519", "dividends").startswith("Unknown statement dividends")
+    assert toolkit.get_financial_statement("000001") == "No local 利润表 for 000001"
+
+
+def test_pagination_newest_first(toolkit):
+    pages = [toolkit.get_financial_statement("600519", columns=["基本每股收益"], page=page, page_size=4).splitlines() for page in (1, 2, 3)]
+    assert [p[0] for p in pages] == ["page 1/3, 10 rows", "page 2/3, 10 rows", "page 3/3, 10 rows"]
+    assert [row.split(",")[0][:4] for p in pages for row in p[2:]] == [str(year) for year in range(2024, 2014, -1)]
+    # 页码超出范围时取最近的有效页
+    assert toolkit.get_financial_statement("600519", page=9, page_size=4).startswith("page 3/3, 10 rows")
+    assert toolkit.get_financial_statement("600519", page=0, page_size=4).startswith("page 1/3, 10 rows")
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from benchmarks.stub_openai_server import StubConfig
+from memories import DeferredRetrievalMemory, RetrievalMemoryAgent
+from models import stub_model
+from storage import WalSqliteMemoryDb
+
+
+@pytest.fixture
+def memory_db(tmp_path):
+    db = WalSqliteMemoryDb(table_name="user_memories", db_file=str(tmp_path / "agent.db"))
+    db.create()
+    return db
+
+
+def test_deferred_extraction_merges_turns(stub_server, memory_db):
+    base_url, config = stub_server
+    # 记忆模型收到用户消息后调用add_memory；agent本身没有这个工具，照常回答
+    config.script = StubConfig(script=[
+        {"match": "remember", "tool_calls": [{"name": "add_memory", "arguments": {"memory": "Ava likes NVIDIA and TSLA"}}]},
+    ]).script
+    memory = DeferredRetrievalMemory(model=stub_model(None, base_url), db=memory_db, coalesce_delay=30.0, max_turns=8)
+    agent = RetrievalMemoryAgent(model=stub_model(None, base_url), memory=memory, user_id="ava", enable_user_memories=True)
+
+    turns = ["please remember I like NVIDIA", "please remember I like TSLA", "please remember I hold both"]
+    for i, turn in enumerate(turns, start=1):
+        start = time.perf_counter()
+        agent.run(turn)
+        # 回答不等记忆提取：只有一次模型调用（0.3秒首token延迟），提取还在排队
+        assert time.perf_counter() - start < 1.0
+        assert memory.memory_queue.depth() == i
+    assert config.stats["requests"] == len(turns)
+    assert memory.memory_queue.stats()["extraction_calls"] == 0
+    assert memory.get_user_memories("ava") == []
+
+    assert memory.flush_memories(timeout=10)
+    stats = memory.memory_queue.stats()
+    assert (stats["depth"], stats["inflight"], stats["errors"]) == (0, 0, 0)
+    # 三轮合并成一次提取：记忆模型只调用了一次add_memory（工具结果之后再有一次收尾请求）
+    assert (stats["turns_processed"], stats["extraction_calls"]) == (3, 1)
+    assert config.stats["tool_call_responses"] == 1
+    assert config.stats["requests"] == len(turns) + 2
+    assert stats["lag_p50"] > 0 and stats["lag_p95"] >= stats["lag_p50"]
+    assert [m.memory for m in memory.get_user_memories("ava")] == ["Ava likes NVIDIA and TSLA"]
@@ -0,0 +1,111 @@
+import pytest
+from agno.memory.v2.schema import UserMemory
+
+from memories import HashEmbedder, MemoryVectorIndex, RetrievalMemory, RetrievalMemoryAgent, memory_query
+from models import stub_model
+from storage import WalSqliteMemoryDb
+
+FACTS = {
+    "m1": "最喜欢的股票是英伟达和特斯拉",
+    "m2": "住在上海，周末跑步",
+    "m3": "持有贵州茅台，关注白酒行业",
+    "m4": "不吃辣，喜欢喝茶",
+    "m5": "风险偏好较低，偏好高股息股票",
+}
+
+
+class CountingEmbedder(HashEmbedder):
+    def __init__(self, fail: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.fail = fail
+
+    def get_embedding(self, text):
+        self.calls += 1
+        if self.fail:
+            self.fail -= 1
+            raise TimeoutError("embedding timed out")
+        return super().get_embedding(text)
+
+
+def test_index_embeds_each_memory_once(tmp_path):
+    db_file = str(tmp_path / "agent.db")
+    embedder = CountingEmbedder()
+    index = MemoryVectorIndex(embedder=embedder, db_file=db_file)
+    assert index.sync("ava", FACTS) == 5
+    index.flush()
+    assert embedder.calls == 5
+    assert index.sync("ava", FACTS) == 0
+
+    # 只有改动的记忆重新嵌入，删除的记忆不再出现在结果里
+    changed = dict(FACTS, m2="住在杭州，周末爬山")
+    del changed["m4"]
+    assert index.sync("ava", changed) == 1
+    index.flush()
+    assert embedder.calls == 5 + 1
+    assert "m4" not in index.search("ava", "喜欢喝茶", 5)
+
+    # 向量持久化，重启后不用重新嵌入
+    restarted = CountingEmbedder()
+    again = MemoryVectorIndex(embedder=restarted, db_file=db_file)
+    assert again.sync("ava", changed) == 0 and restarted.calls == 0
+
+
+def test_index_returns_relevant_memories_first(tmp_path):
+    index = MemoryVectorIndex(db_file=str(tmp_path / "agent.db"))
+    index.sync("ava", FACTS)
+    index.flush()
+    assert index.search("ava", "英伟达 特斯拉 股票", 1) == ["m1"]
+    assert index.search("ava", "白酒 茅台", 2)[0] == "m3"
+    assert index.search("bob", "英伟达", 3) == []
+
+
+def test_pending_memories_are_returned_until_embedded(tmp_path):
+    index = MemoryVectorIndex(embedder=CountingEmbedder(fail=10), db_file=str(tmp_path / "agent.db"), max_retries=1, retry_delay=0.01)
+    index.sync("ava", {"m1": FACTS["m1"]})
+    # 还没嵌入完的新记忆直接带上
+    assert index.search("ava", "随便什么", 3) == ["m1"]
+    index.flush()
+    # 重试仍失败后放弃这批，不再当作待嵌入的记忆；下次sync重新提交
+    assert index.search("ava", "随便什么", 3) == []
+    index.embedder.fail = 0
+    assert index.sync("ava", {"m1": FACTS["m1"]}) == 1
+    index.flush()
+    assert index.search("ava", "英伟达", 3) == ["m1"]
+
+
+@pytest.fixture
+def memory_db(tmp_path):
+    db = WalSqliteMemoryDb(table_name="user_memories", db_file=str(tmp_path / "agent.db"))
+    db.create()
+    return db
+
+
+def test_retrieval_memory_scopes_memories_to_the_query(memory_db):
+    memory = RetrievalMemory(db=memory_db, top_k=2)
+    for text in FACTS.values():
+        memory.add_user_memory(UserMemory(memory=text), user_id="ava")
+    memory.index.flush()
+    assert len(memory.get_user_memories("ava")) == 5
+    with memory_query("英伟达和特斯拉最近怎么样"):
+        relevant = [m.memory for m in memory.get_user_memories("ava")]
+    assert len(relevant) == 2 and relevant[0] == FACTS["m1"]
+
+    # 另一个实例从数据库加载同一份记忆，向量已经落盘
+    other = RetrievalMemory(db=memory_db, embedder=CountingEmbedder(), top_k=1)
+    assert [m.memory for m in other.search_user_memories("茅台 白酒", user_id="ava")] == [FACTS["m3"]]
+    assert other.index.embedder.calls == 1
+
+
+def test_agent_prompt_only_carries_relevant_memories(stub_server, memory_db):
+    base_url, _ = stub_server
+    memory = RetrievalMemory(db=memory_db, top_k=1)
+    for text in FACTS.values():
+        memory.add_user_memory(UserMemory(memory=text), user_id="ava")
+    memory.index.flush()
+    agent = RetrievalMemoryAgent(model=stub_model(None, base_url), memory=memory, user_id="ava", add_memory_references=True)
+
+    response = agent.run("帮我看看英伟达和特斯拉")
+    system = response.messages[0].content
+    assert FACTS["m1"] in system
+    assert not any(text in system for key, text in FACTS.items() if key != "m1")
@@ -0,0 +1,34 @@
+from agno.agent import Agent
+
+from models import stub_model
+from tools.parallel_members import ParallelMemberTools
+
+
+def test_members_run_concurrently(stub_server):
+    base_url, config = stub_server
+    members = [Agent(name=name, model=stub_model(None, base_url)) for name in ("Web Search Agent", "Finance Agent")]
+    tools = ParallelMemberTools(members)
+
+    result = tools.run_member_tasks(["web-search-agent", "finance-agent"], ["search news", "get price"])
+
+    assert config.stats["requests"] == 2
+    assert set(tools.last_latencies) == {"web-search-agent", "finance-agent"}
+    # 每个成员至少等一次0.3秒的首token延迟，并发时总耗时接近单个成员的耗时
+    assert all(latency >= 0.3 for latency in tools.last_latencies.values())
+    wall_time = float(result.split(" in parallel in ")[1].split("s")[0])
+    assert wall_time < sum(tools.last_latencies.values()) * 0.8
+    for member_id, latency in tools.last_latencies.items():
+        assert f"## {member_id} ({latency:.2f}s)" in result
+
+
+def test_unknown_member():
+    tools = ParallelMemberTools([Agent(name="Finance Agent")])
+    assert tools.run_member_tasks(["nobody"], ["task"]).startswith("Member with ID nobody not found")
+
+
+def test_tool_arguments_are_parsed():
+    # 没有类型注解的参数agno不做解析，team参数必须注解为Team才会被注入而不是暴露给模型
+    tools = ParallelMemberTools([Agent(name="Finance Agent")])
+    function = tools.functions["run_member_tasks"]
+    function.process_entrypoint()
+    assert set(function.parameters["properties"]) == {"member_ids", "task_descriptions"}
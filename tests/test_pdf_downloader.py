@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fundamental.pdf_downloader import MANIFEST, DownloadItem, Manifest, PdfDownloader
+
+FILES = {
+    "/a.pdf": b"%PDF-1.4 annual report " + b"a" * 200_000,
+    # 同一份文件挂在另一个链接下
+    "/a-copy.pdf": b"%PDF-1.4 annual report " + b"a" * 200_000,
+    "/b.pdf": b"%PDF-1.4 interim report " + b"b" * 150_000,
+}
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """只读的静态文件服务，支持 Range: bytes=N-"""
+
+    requests = []
+
+    def do_GET(self):
+        body = FILES.get(self.path)
+        RangeHandler.requests.append((self.path, self.headers.get("Range")))
+        if body is None:
+            self.send_error(404)
+            return
+        start = int(self.headers["Range"][6:].rstrip("-")) if self.headers.get("Range") else 0
+        if start >= len(body):
+            self.send_response(416)
+            self.end_headers()
+            return
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def static_server():
+    RangeHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def items(base_url):
+    return [
+        DownloadItem("600519", "2024年年度报告", "2025-04-02", f"{base_url}/a.pdf"),
+        DownloadItem("600519", "2024年年度报告(更正)", "2025-04-03", f"{base_url}/a-copy.pdf"),
+        DownloadItem("000858", "2025年半年度报告", "2025-08-28", f"{base_url}/b.pdf"),
+    ]
+
+
+def pdf_files(out_dir):
+    return sorted(os.path.relpath(os.path.join(root, f), out_dir) for root, _, files in os.walk(out_dir) for f in files if f.endswith(".pdf"))
+
+
+def test_dedup_and_skip(static_server, tmp_path):
+    out_dir = str(tmp_path / "reports")
+    stats = PdfDownloader(out_dir).download(items(static_server))
+    assert (stats["downloaded"], stats["duplicates"], stats["failed"]) == (2, 1, 0)
+    assert pdf_files(out_dir) == ["000858/2025-08-28_2025年半年度报告.pdf", "600519/2025-04-02_2024年年度报告.pdf"]
+
+    manifest = Manifest(os.path.join(out_dir, MANIFEST))
+    assert len(manifest.urls) == 3 and len(manifest.hashes) == 2
+
+    # 再跑一次，所有链接都在清单里
+    stats = PdfDownloader(out_dir).download(items(static_server))
+    assert stats["skipped"] == 3 and stats["bytes"] == 0
+
+
+def test_resume_from_part_file(static_server, tmp_path):
+    out_dir = str(tmp_path / "reports")
+    downloader = PdfDownloader(out_dir)
+    item = items(static_server)[2]
+    dest = os.path.join(out_dir, item.code, item.filename)
+    os.makedirs(os.path.dirname(dest))
+    # 模拟上次中断时留下的半个文件
+    part = f"{dest}.{hashlib.md5(item.url.encode()).hexdigest()[:8]}.part"
+    with open(part, "wb") as f:
+        f.write(FILES["/b.pdf"][:50_000])
+
+    stats = downloader.download([item])
+    assert stats["resumed"] == 1 and stats["bytes"] == len(FILES["/b.pdf"]) - 50_000
+    assert ("/b.pdf", "bytes=50000-") in RangeHandler.requests
+    with open(dest, "rb") as f:
+        assert f.read() == FILES["/b.pdf"]
+    assert not os.path.exists(part)
+
+
+def test_files_without_manifest_are_not_duplicated(static_server, tmp_path):
+    out_dir = str(tmp_path / "reports")
+    PdfDownloader(out_dir).download(items(static_server))
+    before = pdf_files(out_dir)
+    # 进程在文件放好、清单写入之前被强制结束
+    os.remove(os.path.join(out_dir, MANIFEST))
+
+    stats = PdfDownloader(out_dir).download(items(static_server))
+    assert pdf_files(out_dir) == before
+    assert stats["downloaded"] == 0 and stats["duplicates"] == 3
+    assert len(Manifest(os.path.join(out_dir, MANIFEST)).urls) == 3
+
+
+def test_manifest_saved_after_each_file(static_server, tmp_path, monkeypatch):
+    out_dir = str(tmp_path / "reports")
+    saved = []
+    monkeypatch.setattr(Manifest, "save", lambda self: saved.append(len(self.urls)))
+    PdfDownloader(out_dir).download(items(static_server))
+    assert saved == [1, 2, 3]
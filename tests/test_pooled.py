@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from models import pooled
+from models.pooled import PooledOpenAILike
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools(monkeypatch):
+    for name in ("_HTTP_CLIENTS", "_CLIENTS", "_LIMITERS", "_LOOPS"):
+        monkeypatch.setattr(pooled, name, {})
+
+
+def model(**kwargs):
+    return PooledOpenAILike(id="qwen-turbo", api_key="test", base_url="http://127.0.0.1:9/v1", **kwargs)
+
+
+def async_entries():
+    return [k for k in pooled._CLIENTS if k[0] == "async"]
+
+
+def test_async_client_is_shared_within_a_loop():
+    async def clients():
+        return model().get_async_client(), model().get_async_client()
+
+    first, second = asyncio.run(clients())
+    assert first is second
+    assert model().get_client() is model().get_client()
+
+
+def test_clients_of_closed_loops_are_dropped():
+    async def client():
+        return model().get_async_client()
+
+    # 每次asyncio.run都是新的事件循环，关闭的循环的id可能被下一个循环复用
+    clients = [asyncio.run(client()) for _ in range(3)]
+    assert len({id(c) for c in clients}) == 3
+    assert len(async_entries()) == 1 and len(pooled._LOOPS) == 1
+    assert len([k for k in pooled._HTTP_CLIENTS if k[0] == "async"]) == 1
+
+
+def test_limiter_is_bound_to_the_running_loop():
+    async def limited():
+        gemini = model(max_concurrency=2)
+        async with gemini._aslot():
+            return gemini._limiter("async")
+
+    limiters = [asyncio.run(limited()) for _ in range(2)]
+    assert limiters[0] is not limiters[1]
+    assert len(pooled._LIMITERS) == 1
@@ -0,0 +1,97 @@
+import os
+import shutil
+
+import pytest
+
+from knowledge.report_pdf import Chunk, ReportTextPipeline, extract_to_cache, file_hash, iter_chunks, read_cache
+
+
+def write_pdf(path, pages):
+    """最小的PDF：每页若干行ASCII文本，Helvetica字体"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        text = " ".join(f"({line}) Tj 0 -20 Td" for line in lines)
+        stream = f"BT /F1 12 Tf 72 720 Td {text} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    body, offsets = b"%PDF-1.4\n", []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{i} 0 obj\n{obj}\nendobj\n".encode()
+    xref = f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    body += f"{xref}trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{len(body)}\n%%EOF\n".encode()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
+    return path
+
+
+def test_chunks_split_at_headings():
+    pages = [
+        (1, "目录\n第三节 管理层讨论与分析 ........ 10\n1 / 200"),
+        (2, "第二节 公司简介\n公司简介正文\n第三节 管理层讨论与分析\n一、经营情况\n营业收入增长15%\n毛利率提升"),
+        (3, "二、主要风险\n原材料价格波动\n- 3 -\n第四节 公司治理\n董事会运作规范"),
+    ]
+    chunks = list(iter_chunks(pages))
+    assert chunks == [
+        Chunk("第三节 管理层讨论与分析\n一、经营情况\n营业收入增长15%\n毛利率提升", "管理层讨论与分析", "经营情况", 2, 2),
+        Chunk("二、主要风险\n原材料价格波动", "管理层讨论与分析", "主要风险", 3, 3),
+    ]
+    # 不过滤章节时，封面目录、公司简介和公司治理也保留
+    assert [c.section for c in iter_chunks(pages, sections=None)] == ["", "公司简介", "管理层讨论与分析", "管理层讨论与分析", "公司治理"]
+
+
+def test_chunks_split_by_size():
+    lines = [f"第{i}段" + "营收" * 20 for i in range(10)]
+    pages = [(1, "第十节 财务报告\n" + "\n".join(lines[:5])), (2, "\n".join(lines[5:]))]
+    chunks = list(iter_chunks(pages, max_chars=100))
+    assert all(len(c.text) <= 100 for c in chunks) and len(chunks) == 5
+    assert chunks[0].text.startswith("第十节 财务报告\n第0段")
+    assert [(c.page_start, c.page_end) for c in chunks] == [(1, 1), (1, 1), (1, 2), (2, 2), (2, 2)]
+    # 单个超长段落自成一块
+    assert [len(c.text) for c in iter_chunks([(1, "第十节 财务报告\n正文\n" + "长" * 300)], max_chars=100)] == [11, 300]
+
+
+def test_cached_files_are_skipped_by_hash(tmp_path):
+    reports = tmp_path / "reports"
+    first = write_pdf(str(reports / "600519" / "2025-03-29_2024年年度报告.pdf"), [["Revenue grew 15 percent"], ["Gross margin 91 percent"]])
+    # 内容相同、路径不同的文件只提取一次，另一份算缓存命中
+    copy = str(reports / "SH600519" / "2025-03-29_2024年年度报告.pdf")
+    os.makedirs(os.path.dirname(copy))
+    shutil.copy(first, copy)
+    second = write_pdf(str(reports / "000858" / "2025-04-25_2024年年度报告.pdf"), [["Revenue grew 7 percent"]])
+    cache_dir = str(tmp_path / "cache")
+
+    pipeline = ReportTextPipeline(cache_dir, workers=2, sections=None)
+    hashes = pipeline.extract([first, copy, second])
+    assert hashes[first] == hashes[copy] == file_hash(first)
+    assert pipeline.stats == dict(pipeline.stats, files=3, cached=1, extracted=2, failed=0, pages=3)
+    rows = list(read_cache(pipeline.cache_path(hashes[first])))
+    assert rows[0]["text"] == "Revenue grew 15 percent\nGross margin 91 percent" and (rows[0]["page_start"], rows[0]["page_end"]) == (1, 2)
+
+    again = ReportTextPipeline(cache_dir, workers=2, sections=None)
+    assert again.extract([first, copy, second]) == hashes
+    assert (again.stats["cached"], again.stats["extracted"]) == (3, 0)
+
+    # 切块参数变了重新提取
+    resized = ReportTextPipeline(cache_dir, workers=2, max_chars=10, sections=None)
+    resized.extract([first, second])
+    assert (resized.stats["cached"], resized.stats["extracted"]) == (0, 2)
+
+
+def test_failed_extraction_leaves_no_temp_file(tmp_path):
+    broken = tmp_path / "600519" / "2025-03-29_2024年年度报告.pdf"
+    broken.parent.mkdir()
+    broken.write_bytes(b"not a pdf")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    with pytest.raises(Exception):
+        extract_to_cache(str(broken), file_hash(str(broken)), str(cache_dir))
+    assert os.listdir(cache_dir) == []
+
+    pipeline = ReportTextPipeline(str(cache_dir), workers=1)
+    assert pipeline.extract([str(broken)]) == {}
+    assert pipeline.stats["failed"] == 1 and os.listdir(cache_dir) == []
@@ -0,0 +1,27 @@
+import threading
+import time
+
+from research.batch import ModelGate
+from tools.ratelimit import TokenBucket
+
+
+def test_gate_waiting_for_token_does_not_hold_slot():
+    semaphore = threading.Semaphore(1)
+    slow, fast = TokenBucket(rate=1.0, capacity=1), TokenBucket(rate=100.0, capacity=1)
+    slow.acquire()
+    entered = {}
+
+    def call(name: str, bucket: TokenBucket) -> None:
+        with ModelGate(semaphore, bucket):
+            entered[name] = time.perf_counter()
+
+    start = time.perf_counter()
+    waiting = threading.Thread(target=call, args=("gemini", slow))
+    waiting.start()
+    time.sleep(0.1)
+    # gemini还在等令牌，qwen应当马上拿到唯一的并发名额
+    call("qwen", fast)
+    waiting.join()
+
+    assert entered["qwen"] - start < 0.5
+    assert entered["gemini"] - start >= 0.8
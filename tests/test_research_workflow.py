@@ -0,0 +1,51 @@
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+
+from agno.agent import Agent
+from agno.run.response import RunResponseContentEvent
+
+from benchmarks.stub_openai_server import StubConfig
+from models import stub_model
+from research.artifacts import ArtifactStore
+from research.stages import Stage, data_version
+from research.workflow import REPORT_STAGE, ResearchReportWorkflow
+from tools.local_ashare import LocalDataIndex
+
+
+def empty_index(tmp_path) -> LocalDataIndex:
+    return LocalDataIndex(*(str(tmp_path / name) for name in ("data", "financial", "logs")))
+
+
+def test_concurrent_workflows_cache_their_own_report(stub_server, tmp_path):
+    base_url, config = stub_server
+    config.script = StubConfig(script=[
+        {"match": "600519", "content": "贵州茅台研报"},
+        {"match": "000858", "content": "五粮液研报"},
+    ]).script
+    index, artifacts = empty_index(tmp_path), ArtifactStore(str(tmp_path / "artifacts"))
+
+    def run(code: str) -> str:
+        workflow = ResearchReportWorkflow(index=index, artifacts=artifacts, crawl=False, writer=Agent(model=stub_model(None, base_url)))
+        return "".join(e.content for e in workflow.run(code=code) if isinstance(e, RunResponseContentEvent) and isinstance(e.content, str))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        reports = dict(zip(["600519", "000858"], pool.map(run, ["600519", "000858"])))
+
+    assert reports == {"600519": "贵州茅台研报", "000858": "五粮液研报"}
+    assert artifacts.read("600519", REPORT_STAGE)["content"] == "贵州茅台研报"
+    assert artifacts.read("000858", REPORT_STAGE)["content"] == "五粮液研报"
+
+
+def test_default_writer_is_per_instance(tmp_path):
+    index = empty_index(tmp_path)
+    assert ResearchReportWorkflow(index=index, crawl=False).writer is not ResearchReportWorkflow(index=index, crawl=False).writer
+
+
+def test_stage_version_includes_revision(tmp_path):
+    path = tmp_path / "利润表.csv"
+    path.write_text("REPORT_DATE\n2024-12-31\n", encoding="utf-8")
+    stage = Stage("statements", "三大会计报表", lambda index, code: [str(path)], lambda index, code: "")
+
+    assert stage.version(None, "600519") == stage.version(None, "600519")
+    assert dataclasses.replace(stage, revision=2).version(None, "600519") != stage.version(None, "600519")
+    assert data_version([str(path)], "a") != data_version([str(path)], "b")
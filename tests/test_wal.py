@@ -0,0 +1,41 @@
+import multiprocessing
+import time
+
+import pytest
+from agno.memory.v2.db.schema import MemoryRow
+
+from storage import WalRunHistorySqliteStorage, WalSqliteMemoryDb
+
+
+def create_schema(db_file: str, start: float) -> str:
+    # 所有进程同一时刻开始建表，和多个worker同时启动一样
+    while time.time() < start:
+        pass
+    try:
+        WalRunHistorySqliteStorage(table_name="agent_sessions", db_file=db_file)
+        WalRunHistorySqliteStorage(table_name="team_sessions", db_file=db_file)
+        WalSqliteMemoryDb(table_name="user_memories", db_file=db_file)
+        return "ok"
+    except Exception as e:
+        return repr(e)
+
+
+def test_workers_create_schema_concurrently(tmp_path):
+    for i in range(2):
+        db_file = str(tmp_path / f"run{i}" / "agent.db")
+        with multiprocessing.get_context("spawn").Pool(4) as pool:
+            start = time.time() + 2
+            results = pool.starmap(create_schema, [(db_file, start)] * 4)
+        assert results == ["ok"] * 4
+
+
+def test_upsert_memory_reports_failures(tmp_path):
+    db = WalSqliteMemoryDb(table_name="user_memories", db_file=str(tmp_path / "agent.db"))
+    future = db.upsert_memory(MemoryRow(id="m1", user_id="ava", memory={"memory": "likes tea"}))
+    future.result(timeout=5)
+    assert [m.id for m in db.read_memories(user_id="ava")] == ["m1"]
+
+    # 写操作本身出错（这里让表对象失效）时，Future带着异常完成
+    db.table = None
+    with pytest.raises(Exception):
+        db.upsert_memory(MemoryRow(id="m2", user_id="ava", memory={"memory": "x"})).result(timeout=5)
@@ -0,0 +1,64 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from tools.cache import TTLCache
+from tools.ratelimit import TokenBucket
+from tools.yfinance_cached import CachedYFinanceTools, StubFinanceSource, YahooFinanceSource
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def download_frame(closes):
+    """yf.download(group_by="ticker") 的返回形状：列为 (Ticker, Price) 两级，单个代码也一样"""
+    index = pd.date_range("2025-06-23", periods=3, freq="B", name="Date")
+    columns = pd.MultiIndex.from_product([list(closes), FIELDS], names=["Ticker", "Price"])
+    data = np.column_stack([np.full(3, float(i)) for _ in closes for i in range(len(FIELDS))])
+    df = pd.DataFrame(data, index=index, columns=columns)
+    for symbol, values in closes.items():
+        df[(symbol, "Close")] = values
+    return df
+
+
+def yahoo_source(closes):
+    source = YahooFinanceSource()
+    calls = []
+
+    def download(tickers, **kwargs):
+        calls.append((tickers, kwargs["group_by"]))
+        return download_frame({t: closes[t] for t in tickers if t in closes})
+
+    source.yf = SimpleNamespace(download=download)
+    return source, calls
+
+
+def tools(source):
+    return CachedYFinanceTools(source=source, cache=TTLCache(), limiter=TokenBucket(rate=100, capacity=10), stock_price=True)
+
+
+def test_single_symbol_price_from_multiindex_frame():
+    source, calls = yahoo_source({"AAPL": [201.0, 203.5, np.nan]})
+    assert source.get_prices(["AAPL"]) == {"AAPL": 203.5}
+    assert tools(source).get_current_stock_price(" aapl ") == "203.5000"
+    assert calls[0] == (["AAPL"], "ticker")
+
+
+def test_bulk_prices_and_missing_symbol():
+    source, calls = yahoo_source({"AAPL": [1.0, 2.0, 3.0], "MSFT": [4.0, 5.0, 6.0]})
+    prices = json.loads(tools(source).get_current_stock_prices(["AAPL", "msft", "NOPE"]))
+    assert prices == {"AAPL": 3.0, "MSFT": 6.0, "NOPE": None}
+    assert len(calls) == 1
+
+
+def test_prices_are_cached_per_source():
+    source = StubFinanceSource()
+    toolkit = tools(source)
+    toolkit.get_current_stock_price("AAPL")
+    toolkit.get_current_stock_prices(["aapl", "GOOGL"])
+    assert source.calls["prices"] == 2
+    # 另一个离线数据源不会读到这份缓存
+    other = StubFinanceSource({"AAPL": {"price": 1.0}})
+    toolkit.source = other
+    assert toolkit.get_current_stock_price("AAPL") == "1.0000"
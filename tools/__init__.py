@@ -0,0 +1,48 @@
+"""
+工具模块
+供 agno agent / team 直接挂载的自定义工具集，以及工具结果（DataFrame）交给模型前的压缩
+
+各工具集依赖的SDK（yfinance、duckduckgo-search、pandas）较重，子模块在第一次访问对应名称时才导入
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .compaction import compact
+    from .ddgs_cached import CachedDuckDuckGoTools, SearchResultStore, StubSearchBackend
+    from .local_ashare import LocalAShareTools, LocalDataIndex
+    from .parallel_members import ParallelMemberTools
+    from .yfinance_cached import CachedYFinanceTools, StubFinanceSource, YahooFinanceSource
+
+_LAZY = {
+    'compact': '.compaction',
+    'CachedDuckDuckGoTools': '.ddgs_cached',
+    'SearchResultStore': '.ddgs_cached',
+    'StubSearchBackend': '.ddgs_cached',
+    'LocalAShareTools': '.local_ashare',
+    'LocalDataIndex': '.local_ashare',
+    'ParallelMemberTools': '.parallel_members',
+    'CachedYFinanceTools': '.yfinance_cached',
+    'StubFinanceSource': '.yfinance_cached',
+    'YahooFinanceSource': '.yfinance_cached',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    'compact',
+    'CachedDuckDuckGoTools',
+    'SearchResultStore',
+    'StubSearchBackend',
+    'LocalAShareTools',
+    'LocalDataIndex',
+    'ParallelMemberTools',
+    'CachedYFinanceTools',
+    'StubFinanceSource',
+    'YahooFinanceSource',
+]
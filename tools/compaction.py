@@ -0,0 +1,133 @@
+"""
+工具结果压缩：DataFrame交给模型之前
+- 列裁剪：只保留请求的指标（支持中文别名），没有请求时用默认列，全空的列去掉
+- 期数截断：按期间列倒序，只保留最近N期
+- 数值取整：金额按量级换算成亿/万，列名注明单位，小数统一保留两位；日期去掉 00:00:00
+- 按token预算输出CSV或Markdown，超出预算时先减行（保留最新的期间）再减列（保留关键列），末尾注明截断了多少
+
+    compact(df, columns=["营业收入", "净利润"], aliases=..., period_column="REPORT_DATE", periods=4, scale=True, max_tokens=800)
+"""
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from models.tokens import estimate_tokens
+
+FORMATS = ("csv", "markdown")
+# (量级阈值, 除数, 单位)，按列的最大绝对值选择
+UNITS = [(1e8, 1e8, "亿"), (1e5, 1e4, "万")]
+
+
+def project(df: pd.DataFrame, columns: Optional[List[str]], default: List[str], aliases: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """列裁剪：只保留请求的列（支持中文别名），未请求时使用默认列"""
+    aliases = aliases or {}
+    wanted = [aliases.get(c, c) for c in columns] if columns else default
+    keep = [c for c in dict.fromkeys(wanted) if c in df.columns]
+    return df[keep] if keep else df
+
+
+def truncate_periods(df: pd.DataFrame, period_column: Optional[str], periods: Optional[int]) -> pd.DataFrame:
+    """按期间列倒序，保留最近periods期；没有期间列时保留前periods行"""
+    if period_column and period_column in df.columns:
+        df = df.sort_values(period_column, ascending=False)
+    return df.head(periods) if periods else df
+
+
+def round_numbers(df: pd.DataFrame, digits: int = 2, scale: bool = False, exclude: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    数值列保留digits位小数；scale为True时金额列按最大绝对值换算成亿或万，列名加上单位，如 OPERATE_INCOME(亿)
+    :param exclude: 不取整、不换算的数值列，如年份
+    """
+    df = df.copy()
+    renames = {}
+    for column in df.columns:
+        values = df[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            # 报表的日期列是 "2024-12-31 00:00:00"
+            text = values.dropna().astype(str)
+            if len(text) and text.str.endswith(" 00:00:00").all():
+                df[column] = values.where(values.isna(), values.astype(str).str[:-9])
+            continue
+        if column in exclude or pd.api.types.is_bool_dtype(values):
+            continue
+        peak = values.abs().max()
+        if scale and pd.notna(peak):
+            unit = next(((divisor, name) for threshold, divisor, name in UNITS if peak >= threshold), None)
+            if unit is not None:
+                values = values / unit[0]
+                renames[column] = f"{column}({unit[1]})"
+        if pd.api.types.is_float_dtype(values):
+            values = values.round(digits)
+        df[column] = values
+    return df.rename(columns=renames)
+
+
+def _markdown(df: pd.DataFrame) -> str:
+    def cell(value) -> str:
+        return "" if pd.isna(value) else str(value).replace("|", "\\|").replace("\n", " ")
+
+    lines = ["| " + " | ".join(cell(c) for c in df.columns) + " |", "|" + "---|" * len(df.columns)]
+    lines.extend("| " + " | ".join(cell(v) for v in row) + " |" for row in df.itertuples(index=False))
+    return "\n".join(lines) + "\n"
+
+
+def render(df: pd.DataFrame, fmt: str = "csv") -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, use one of {FORMATS}")
+    return df.to_csv(index=False) if fmt == "csv" else _markdown(df)
+
+
+def fit_budget(df: pd.DataFrame, max_tokens: Optional[int], fmt: str = "csv", keep: Sequence[str] = ()) -> str:
+    """
+    按token预算输出：超出时先从末尾减行，只剩一行仍超出时再从右往左减掉非关键列
+    :param keep: 不会被减掉的列，如报告期
+    """
+    text = render(df, fmt)
+    if not max_tokens or estimate_tokens(text) <= max_tokens or df.empty:
+        return text
+    rows, columns = len(df), list(df.columns)
+    # 二分找出预算内最多的行数
+    low, high = 1, rows
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(render(df.head(mid), fmt)) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    df = df.head(low)
+    droppable = [c for c in columns if c not in keep]
+    while droppable and len(df.columns) > 1 and estimate_tokens(render(df, fmt)) > max_tokens:
+        df = df.drop(columns=droppable.pop())
+    note = f"[truncated to fit ~{max_tokens} tokens: {len(df)}/{rows} rows"
+    if len(df.columns) < len(columns):
+        note += f", {len(df.columns)}/{len(columns)} columns"
+    return render(df, fmt) + note + "; request fewer columns or the next page]\n"
+
+
+def compact(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    default: Optional[List[str]] = None,
+    aliases: Optional[Dict[str, str]] = None,
+    period_column: Optional[str] = None,
+    periods: Optional[int] = None,
+    keep: Sequence[str] = (),
+    digits: int = 2,
+    scale: bool = False,
+    fmt: str = "csv",
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    列裁剪 + 期数截断 + 数值取整 + 按预算输出
+    :param columns: 请求的列（或别名），None时用default，default也为None时保留所有列
+    :param keep: 始终保留的列（如报告期），列裁剪和预算截断都不会去掉
+    :param scale: 金额换算成亿/万
+    """
+    keep = [c for c in keep if c in df.columns]
+    if columns:
+        columns = list(keep) + [c for c in columns if c not in keep]
+    df = project(df, columns, default if default is not None else list(df.columns), aliases)
+    df = truncate_periods(df, period_column, periods)
+    df = df.dropna(axis=1, how="all")
+    df = round_numbers(df, digits, scale, exclude=keep)
+    return fit_budget(df, max_tokens, fmt, keep)
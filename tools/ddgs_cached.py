@@ -0,0 +1,268 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from agno.tools.duckduckgo import DuckDuckGoTools
+from agno.utils.log import log_debug, logger
+
+from .ratelimit import TokenBucket
+
+# DuckDuckGo对请求频率很敏感，进程内所有agent共享一个预算：平均每2秒一次，最多突发3次
+SHARED_SEARCH_LIMITER = TokenBucket(rate=0.5, capacity=3)
+# 词首尾的标点不影响查询含义；& + $ # 等符号是查询的一部分（S&P、C++），保留
+_PUNCTUATION = ".,;:!?\"'()[]{}<>，。；：！？“”‘’（）【】《》、"
+
+
+class SearchRateLimited(Exception):
+    """搜索后端返回限流（DuckDuckGo 202 Ratelimit）"""
+
+
+def normalize_query(query: str) -> str:
+    """
+    归一化查询，只差大小写、多余空格和词首尾标点的查询映射到同一个缓存键，如 "AAPL news, today" == "aapl  NEWS today"
+    词序和词中间的符号保留："china exports to us" != "us exports to china"，"S&P 500" != "S P 500"
+    """
+    tokens = (token.strip(_PUNCTUATION) for token in query.lower().split())
+    return " ".join(token for token in tokens if token)
+
+
+class SearchResultStore:
+    """
+    基于SQLite的搜索结果磁盘缓存，键为(类型, 地区, 归一化查询, 结果数)
+    :param db_file: 数据库文件路径
+    :param ttl: 结果有效期（秒）
+    """
+
+    def __init__(self, db_file: str = "tmp/search_cache.db", ttl: float = 6 * 60 * 60):
+        self.db_file = db_file
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_results ("
+                "kind TEXT, region TEXT, query TEXT, max_results INTEGER, created_at REAL, results TEXT, "
+                "PRIMARY KEY (kind, region, query, max_results))"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # sqlite3的连接用作上下文管理器只提交或回滚，不会关闭，这里显式关闭
+        conn = sqlite3.connect(self.db_file, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, kind: str, region: str, query: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT created_at, results FROM search_results WHERE kind=? AND region=? AND query=? AND max_results>=?"
+                " ORDER BY created_at DESC LIMIT 1",
+                (kind, region, normalize_query(query), max_results),
+            ).fetchone()
+        if row is None or row[0] + self.ttl < time.time():
+            return None
+        return json.loads(row[1])[:max_results]
+
+    def put(self, kind: str, region: str, query: str, max_results: int, results: List[Dict[str, Any]]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, region, normalize_query(query), max_results, time.time(), json.dumps(results, ensure_ascii=False)),
+            )
+
+    def purge_expired(self) -> int:
+        """删除过期结果，返回删除条数"""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM search_results WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+
+
+class DDGSBackend:
+    """真实的DuckDuckGo后端"""
+
+    def __init__(self, headers: Optional[Any] = None, proxy: Optional[str] = None, timeout: Optional[int] = 10, verify: bool = True):
+        from duckduckgo_search import DDGS
+        from duckduckgo_search.exceptions import RatelimitException
+
+        self._ddgs = lambda: DDGS(headers=headers, proxy=proxy, timeout=timeout, verify=verify)
+        self._ratelimit_error = RatelimitException
+
+    def search(self, kind: str, query: str, region: str, max_results: int) -> List[Dict[str, Any]]:
+        try:
+            ddgs = self._ddgs()
+            if kind == "news":
+                return ddgs.news(keywords=query, region=region, max_results=max_results)
+            return ddgs.text(keywords=query, region=region, max_results=max_results)
+        except self._ratelimit_error as e:
+            raise SearchRateLimited(str(e)) from e
+
+
+class StubSearchBackend:
+    """
+    本地假搜索后端，供测试使用
+    :param results: 查询 -> 结果列表；或一个 (kind, query, region, max_results) -> 结果列表 的函数
+    :param rate_limit_first: 前N次调用抛出SearchRateLimited，用于测试退避重试
+    :param latency: 每次调用的模拟耗时（秒）
+    """
+
+    def __init__(self, results: Optional[Any] = None, rate_limit_first: int = 0, latency: float = 0.0):
+        self.results = results or {}
+        self.rate_limit_first = rate_limit_first
+        self.latency = latency
+        self.calls: List[str] = []
+        self._lock = threading.Lock()
+
+    def search(self, kind: str, query: str, region: str, max_results: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.calls.append(query)
+            limited = len(self.calls) <= self.rate_limit_first
+        time.sleep(self.latency)
+        if limited:
+            raise SearchRateLimited("stub rate limit")
+        if callable(self.results):
+            return self.results(kind, query, region, max_results)
+        default = [{"title": f"Result for {query}", "href": f"https://example.com/?q={query}", "body": "stub"}]
+        return self.results.get(query, default)[:max_results]
+
+
+class CachedDuckDuckGoTools(DuckDuckGoTools):
+    """
+    DuckDuckGoTools的替代品：
+    - (查询, 地区)结果缓存到磁盘，带TTL，近似重复的查询共用缓存
+    - 所有请求经过共享的令牌桶限流，遇到限流按指数退避重试
+    - duckduckgo_search_many 在一次工具调用里并发执行多个查询
+    Args:
+        region: 搜索地区，如 "cn-zh"、"wt-wt"
+        store: 结果缓存，默认 tmp/search_cache.db
+        backend: 搜索后端，默认DDGSBackend，测试时传入StubSearchBackend
+        limiter: 限流器，默认进程内共享
+        max_retries: 限流后的最大重试次数
+        max_workers: 并发查询的线程数
+        其余参数同DuckDuckGoTools
+    """
+
+    def __init__(
+        self,
+        region: str = "wt-wt",
+        store: Optional[SearchResultStore] = None,
+        backend: Optional[Any] = None,
+        limiter: Optional[TokenBucket] = None,
+        max_retries: int = 3,
+        max_workers: int = 4,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.region = region
+        self.store = store or SearchResultStore()
+        self.backend = backend or DDGSBackend(headers=self.headers, proxy=self.proxy, timeout=self.timeout, verify=self.verify_ssl)
+        self.limiter = limiter or SHARED_SEARCH_LIMITER
+        self.max_retries = max_retries
+        self.max_workers = max_workers
+        # 同一查询正在请求时，其他线程等待它的结果，而不是重复请求
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        if "duckduckgo_search" in self.functions:
+            self.register(self.duckduckgo_search_many)
+
+    def _search(self, kind: str, query: str, max_results: int) -> List[Dict[str, Any]]:
+        cached = self.store.get(kind, self.region, query, max_results)
+        if cached is not None:
+            log_debug(f"DDG cache hit for: {query}")
+            return cached
+
+        key = (kind, normalize_query(query), max_results)
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        if not leader:
+            event.wait()
+            cached = self.store.get(kind, self.region, query, max_results)
+            if cached is not None:
+                return cached
+            # 领头的请求失败了，自己再试一次
+            return self._fetch(kind, query, max_results)
+
+        try:
+            return self._fetch(kind, query, max_results)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _fetch(self, kind: str, query: str, max_results: int) -> List[Dict[str, Any]]:
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                log_debug(f"Searching DDG {kind} for: {query}")
+                results = self.backend.search(kind, query, self.region, max_results)
+                self.store.put(kind, self.region, query, max_results, results)
+                return results
+            except SearchRateLimited:
+                if attempt == self.max_retries:
+                    raise
+                delay = (2 ** attempt) + random.uniform(0, 1)
+                logger.warning(f"DDG rate limited, retrying '{query}' in {delay:.1f}s")
+                time.sleep(delay)
+        return []
+
+    def _run(self, kind: str, query: str, max_results: int) -> str:
+        search_query = f"{self.modifier} {query}" if self.modifier and kind == "text" else query
+        try:
+            return json.dumps(self._search(kind, search_query, self.fixed_max_results or max_results), indent=2, ensure_ascii=False)
+        except SearchRateLimited as e:
+            return f"DuckDuckGo rate limit reached, try again later: {e}"
+
+    def duckduckgo_search(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search DuckDuckGo for a query.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The result from DuckDuckGo.
+        """
+        return self._run("text", query, max_results)
+
+    def duckduckgo_news(self, query: str, max_results: int = 5) -> str:
+        """Use this function to get the latest news from DuckDuckGo.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The latest news from DuckDuckGo.
+        """
+        return self._run("news", query, max_results)
+
+    def duckduckgo_search_many(self, queries: List[str], max_results: int = 5) -> str:
+        """Use this function to search DuckDuckGo for several queries at once. Prefer it over calling duckduckgo_search repeatedly.
+
+        Args:
+            queries (List[str]): The queries to search for.
+            max_results (optional, default=5): The maximum number of results per query.
+
+        Returns:
+            JSON mapping each query to its results.
+        """
+        # 近似重复的查询只搜一次
+        unique: Dict[str, str] = {}
+        for query in queries:
+            unique.setdefault(normalize_query(query), query)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique) or 1)) as executor:
+            outputs = dict(zip(unique, executor.map(lambda q: self._run("text", q, max_results), unique.values())))
+        results = {}
+        for query in queries:
+            output = outputs[normalize_query(query)]
+            results[query] = json.loads(output) if output.startswith(("[", "{")) else output
+        return json.dumps(results, indent=2, ensure_ascii=False)
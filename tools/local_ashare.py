@@ -0,0 +1,235 @@
+import glob
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+from agno.tools import Toolkit
+from agno.utils.log import log_debug
+
+from fundamental.financial_reports import FIELD_MAPPING_BALANCE, FIELD_MAPPING_CASHFLOW, FIELD_MAPPING_PROFIT
+
+from .compaction import fit_budget, project, round_numbers
+
+# 报表名 -> 字段映射表，同时支持英文别名
+STATEMENTS = {
+    "利润表": FIELD_MAPPING_PROFIT,
+    "资产负债表": FIELD_MAPPING_BALANCE,
+    "现金流量表": FIELD_MAPPING_CASHFLOW,
+}
+STATEMENT_ALIASES = {
+    "income": "利润表", "profit": "利润表",
+    "balance": "资产负债表",
+    "cashflow": "现金流量表", "cash_flow": "现金流量表",
+}
+# 报表按报告期排序、分页时始终保留的列
+PERIOD_COLUMNS = ["REPORT_DATE", "REPORT_TYPE", "FISCAL_YEAR", "DATE_TYPE_CODE"]
+# 舆情数据默认只返回这些列，正文等长字段需要显式请求
+SENTIMENT_COLUMNS = ["parsed_time", "title", "author", "read_count", "reply_count", "source"]
+
+
+class LocalDataIndex:
+    """
+    本地爬取数据的内存索引
+    - data/{code}/financial_reports/*.csv : 三大会计报表（financial_reports.py）
+    - financial/{code}/*.csv             : 交易所公告表格（sse_crawler.py / szse_crawler.py）
+    - logs/*_{code}*.csv                 : 东方财富/雪球舆情（public_opinion）
+    启动时只扫描文件路径，CSV在第一次被访问时加载并常驻内存，文件更新（mtime变化）后自动重新加载
+    """
+
+    def __init__(self, data_dir: str = "data", financial_dir: str = "financial", sentiment_dir: str = "logs"):
+        self.data_dir = data_dir
+        self.financial_dir = financial_dir
+        self.sentiment_dir = sentiment_dir
+        self.statements: Dict[str, Dict[str, str]] = {}
+        self.announcements: Dict[str, List[str]] = {}
+        self.sentiment: Dict[str, List[str]] = {}
+        self._frames: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """重新扫描目录，爬虫跑完之后调用"""
+        statements: Dict[str, Dict[str, str]] = {}
+        for path in glob.glob(os.path.join(self.data_dir, "*", "financial_reports", "*.csv")):
+            code = os.path.basename(os.path.dirname(os.path.dirname(path)))
+            name = os.path.splitext(os.path.basename(path))[0]
+            statements.setdefault(code, {})[name] = path
+
+        announcements: Dict[str, List[str]] = {}
+        for path in sorted(glob.glob(os.path.join(self.financial_dir, "*", "*.csv"))):
+            name = os.path.basename(path)
+            if "公告" in name or "信息披露" in name:
+                announcements.setdefault(os.path.basename(os.path.dirname(path)), []).append(path)
+
+        sentiment: Dict[str, List[str]] = {}
+        for path in sorted(glob.glob(os.path.join(self.sentiment_dir, "*.csv"))):
+            for part in os.path.splitext(os.path.basename(path))[0].split("_"):
+                if part.isdigit() and len(part) == 6:
+                    sentiment.setdefault(part, []).append(path)
+                    break
+
+        with self._lock:
+            self.statements, self.announcements, self.sentiment = statements, announcements, sentiment
+        log_debug(f"Local index: {len(statements)} statement codes, {len(announcements)} announcement codes, {len(sentiment)} sentiment codes")
+
+    def codes(self) -> List[str]:
+        return sorted(set(self.statements) | set(self.announcements) | set(self.sentiment))
+
+    def load(self, path: str) -> pd.DataFrame:
+        """读取CSV，命中内存缓存且文件未修改时直接返回"""
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._frames.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        df = pd.read_csv(path, encoding="utf-8-sig", dtype={"stock_code": str})
+        with self._lock:
+            self._frames[path] = (mtime, df)
+        return df
+
+
+def paginate(df: pd.DataFrame, page: int, page_size: int, fmt: str = "csv", max_tokens: Optional[int] = None, keep: Sequence[str] = ()) -> str:
+    """分页并输出为CSV或Markdown文本，附带页码信息，方便模型继续翻页；一页超出token预算时再截断（见 tools.compaction）"""
+    total = len(df)
+    pages = max(1, -(-total // page_size))
+    page = min(max(1, page), pages)
+    chunk = df.iloc[(page - 1) * page_size: page * page_size]
+    return f"page {page}/{pages}, {total} rows\n" + fit_budget(chunk, max_tokens, fmt, keep)
+
+
+def wide_statement(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """港股报表是 报告期 x STD_ITEM_NAME 的长表，透视成每期一行的宽表，能对应上的科目改名为A股字段；A股报表原样返回"""
+    if "STD_ITEM_NAME" not in df.columns:
+        return df
+    hk_to_a = {h: a for a, h, _, _ in reversed(STATEMENTS[name]) if a and h}
+    df = df.pivot_table(index="REPORT_DATE", columns="STD_ITEM_NAME", values="AMOUNT", aggfunc="first").reset_index()
+    df.columns.name = None
+    return df.rename(columns=hk_to_a)
+
+
+class LocalAShareTools(Toolkit):
+    """
+    基于本地爬取数据的A股工具集，不发任何网络请求。
+    所有结果都做了分页和列裁剪，报表金额换算成亿/万并取整，每页按token预算截断，避免大表格撑爆模型上下文。
+    Args:
+        index: 本地数据索引，默认扫描当前目录下的data/financial/logs
+        page_size: 默认每页行数
+        fmt: 表格输出格式，"csv" 或 "markdown"
+        max_tokens: 每次返回的表格的token预算，None为不限
+    """
+
+    def __init__(self, index: Optional[LocalDataIndex] = None, page_size: int = 8, fmt: str = "csv", max_tokens: Optional[int] = 2000, **kwargs):
+        self.index = index or LocalDataIndex()
+        self.page_size = page_size
+        self.fmt = fmt
+        self.max_tokens = max_tokens
+        super().__init__(
+            name="local_ashare_tools",
+            tools=[self.list_local_tickers, self.get_financial_statement, self.get_announcements, self.get_sentiment],
+            **kwargs,
+        )
+
+    def list_local_tickers(self) -> str:
+        """Use this function to list the A-share / HK tickers that have locally crawled data.
+
+        Returns:
+            str: One line per ticker with the datasets available for it.
+        """
+        lines = []
+        for code in self.index.codes():
+            available = []
+            if code in self.index.statements:
+                available.append("statements(" + ",".join(sorted(self.index.statements[code])) + ")")
+            if code in self.index.announcements:
+                available.append("announcements")
+            if code in self.index.sentiment:
+                available.append("sentiment")
+            lines.append(f"{code}: {' '.join(available)}")
+        return "\n".join(lines) if lines else "No local data found."
+
+    def get_financial_statement(
+        self, code: str, statement: str = "利润表", columns: Optional[List[str]] = None, page: int = 1, page_size: Optional[int] = None
+    ) -> str:
+        """Use this function to get a financial statement of a listed company from local data, newest period first.
+
+        Args:
+            code (str): The 6-digit stock code, e.g. "600519".
+            statement (str): One of "利润表"/"income", "资产负债表"/"balance", "现金流量表"/"cashflow".
+            columns (Optional[List[str]]): Field codes or Chinese names to return, e.g. ["营业收入", "净利润"]. Defaults to the core fields.
+            page (int): Page number, starting from 1.
+            page_size (Optional[int]): Periods per page.
+
+        Returns:
+            str: The requested periods and columns as a table, amounts in 亿 (1e8) or 万 (1e4) as marked in the column names.
+        """
+        code = code.replace(".HK", "")[:6]
+        name = STATEMENT_ALIASES.get(statement.lower(), statement)
+        if name not in STATEMENTS:
+            return f"Unknown statement {statement}, use one of {list(STATEMENTS)}"
+        path = self.index.statements.get(code, {}).get(name)
+        if path is None:
+            return f"No local {name} for {code}"
+
+        df = wide_statement(self.index.load(path), name)
+        mapping = STATEMENTS[name]
+        period_cols = [c for c in PERIOD_COLUMNS if c in df.columns]
+        default = period_cols + [a for a, _, _, _ in mapping if a] + [h for a, h, _, _ in mapping if not a]
+        aliases = {cn: a or h for a, h, cn, _ in mapping}
+        if columns:
+            # 报告期列始终保留，否则结果无法对应到期间
+            columns = period_cols + [c for c in columns if c not in period_cols]
+        df = project(df, columns, default, aliases)
+        if period_cols:
+            df = df.sort_values(period_cols[0], ascending=False)
+        df = round_numbers(df.dropna(axis=1, how="all"), scale=True, exclude=period_cols)
+        return paginate(df, page, page_size or self.page_size, self.fmt, self.max_tokens, period_cols)
+
+    def get_announcements(
+        self, code: str, keyword: Optional[str] = None, columns: Optional[List[str]] = None, page: int = 1, page_size: Optional[int] = None
+    ) -> str:
+        """Use this function to get exchange announcements (SSE/SZSE) of a listed company from local data.
+
+        Args:
+            code (str): The 6-digit stock code, e.g. "600519".
+            keyword (Optional[str]): Only return announcements containing this text, e.g. "年度报告".
+            columns (Optional[List[str]]): Columns to return. Defaults to all columns of the table.
+            page (int): Page number, starting from 1.
+            page_size (Optional[int]): Announcements per page.
+
+        Returns:
+            str: The matching announcements as CSV.
+        """
+        paths = self.index.announcements.get(code[:6])
+        if not paths:
+            return f"No local announcements for {code}"
+        df = pd.concat([self.index.load(p) for p in paths], ignore_index=True)
+        if keyword:
+            text = df.astype(str).apply(" ".join, axis=1)
+            df = df[text.str.contains(keyword, regex=False)]
+        df = project(df, columns, list(df.columns))
+        return paginate(df, page, page_size or self.page_size, self.fmt, self.max_tokens)
+
+    def get_sentiment(
+        self, code: str, columns: Optional[List[str]] = None, page: int = 1, page_size: Optional[int] = None
+    ) -> str:
+        """Use this function to get recent investor discussion and news posts (Eastmoney, Xueqiu) for a stock from local data.
+
+        Args:
+            code (str): The 6-digit stock code, e.g. "600519".
+            columns (Optional[List[str]]): Columns to return. Defaults to time, title, author, read/reply counts and source.
+            page (int): Page number, starting from 1.
+            page_size (Optional[int]): Posts per page.
+
+        Returns:
+            str: Post counts per source followed by the requested page of posts as CSV, newest first.
+        """
+        paths = self.index.sentiment.get(code[:6])
+        if not paths:
+            return f"No local sentiment data for {code}"
+        df = pd.concat([self.index.load(p) for p in paths], ignore_index=True)
+        if "parsed_time" in df.columns:
+            df = df.sort_values("parsed_time", ascending=False)
+        counts = df["source"].value_counts().to_dict() if "source" in df.columns else {}
+        df = project(df, columns, SENTIMENT_COLUMNS)
+        return f"posts by source: {counts}\n" + paginate(df, page, page_size or self.page_size, self.fmt, self.max_tokens)
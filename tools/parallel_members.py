@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from agno.agent import Agent, RunResponse
+from agno.memory.team import TeamMemory
+from agno.team.team import Team
+from agno.tools import Toolkit
+from agno.utils.log import log_debug, logger
+from agno.utils.string import url_safe_string
+
+
+class ParallelMemberTools(Toolkit):
+    """
+    Lets a coordinating Team fan independent sub-tasks out to its members concurrently.
+
+    The stock `transfer_task_to_member` tool runs one member per tool call, so a
+    coordinator that needs both a web search and a YFinance lookup waits for them
+    back to back. `run_member_tasks` runs every member's tasks in its own thread and
+    returns the merged results (with per-member latency) in a single tool result.
+
+    Args:
+        members (List[Agent]): The team members that can receive tasks.
+        max_workers (Optional[int]): Upper bound on concurrently running members. Defaults to one per member.
+    """
+
+    def __init__(self, members: List[Agent], max_workers: Optional[int] = None, **kwargs):
+        self.members: Dict[str, Agent] = {}
+        for member in members:
+            if member.name is None:
+                raise ValueError("ParallelMemberTools requires every member to have a name")
+            self.members[url_safe_string(member.name)] = member
+        self.max_workers = max_workers or len(self.members)
+        # Seconds spent by each member during the last dispatch, e.g. {"finance-agent": 3.2}
+        self.last_latencies: Dict[str, float] = {}
+
+        super().__init__(name="parallel_member_tools", tools=[self.run_member_tasks], **kwargs)
+
+    def _find_member(self, member_id: str) -> Optional[Tuple[str, Agent]]:
+        key = url_safe_string(member_id)
+        if key in self.members:
+            return key, self.members[key]
+        return None
+
+    def _run_member(self, member: Agent, tasks: List[str], session_id: Optional[str]) -> Tuple[float, List[RunResponse]]:
+        # Tasks for the same member run one after another, an Agent instance is not safe to run concurrently
+        start = time.perf_counter()
+        responses = [member.run(task, session_id=session_id, stream=False) for task in tasks]
+        return time.perf_counter() - start, responses
+
+    def run_member_tasks(self, member_ids: List[str], task_descriptions: List[str], team: Optional[Team] = None) -> str:
+        """Use this function to run several independent tasks on team members at the same time.
+        Use it instead of transferring tasks one by one when the tasks do not depend on each other's results.
+
+        Args:
+            member_ids (List[str]): The ID of the member for each task, e.g. ["web-search-agent", "finance-agent"].
+            task_descriptions (List[str]): A clear and concise description for each task, in the same order as member_ids.
+
+        Returns:
+            str: The result of every task, grouped by member, with each member's latency.
+        """
+        if len(member_ids) != len(task_descriptions):
+            return "member_ids and task_descriptions must have the same length."
+
+        plan: Dict[str, List[str]] = {}
+        for member_id, task in zip(member_ids, task_descriptions):
+            found = self._find_member(member_id)
+            if found is None:
+                return f"Member with ID {member_id} not found. Available members: {', '.join(self.members)}"
+            plan.setdefault(found[0], []).append(task)
+
+        session_id = team.session_id if team is not None else None
+        if team is not None:
+            for member_id in plan:
+                team._initialize_member(self.members[member_id], session_id=session_id)
+
+        log_debug(f"Running {len(task_descriptions)} tasks on {len(plan)} members in parallel")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(plan))) as executor:
+            futures = {
+                member_id: executor.submit(self._run_member, self.members[member_id], tasks, session_id)
+                for member_id, tasks in plan.items()
+            }
+            results = {}
+            for member_id, future in futures.items():
+                try:
+                    results[member_id] = future.result()
+                except Exception as e:
+                    logger.warning(f"Member {member_id} failed: {e}")
+                    results[member_id] = e
+        wall_time = time.perf_counter() - started
+
+        self.last_latencies = {}
+        sections = []
+        for member_id, tasks in plan.items():
+            result = results[member_id]
+            if isinstance(result, Exception):
+                sections.append(f"## {member_id} (failed)\n{result}")
+                continue
+            latency, responses = result
+            self.last_latencies[member_id] = latency
+            logger.info(f"Member {member_id} finished {len(tasks)} task(s) in {latency:.2f}s")
+            for task, response in zip(tasks, responses):
+                sections.append(f"## {member_id} ({latency:.2f}s)\nTask: {task}\n\n{response.content}")
+                if team is not None:
+                    self._add_to_team_context(team, self.members[member_id], task, response)
+
+        header = f"Ran {len(plan)} members in parallel in {wall_time:.2f}s (sequential would be ~{sum(self.last_latencies.values()):.2f}s)."
+        return "\n\n".join([header] + sections)
+
+    @staticmethod
+    def _add_to_team_context(team, member: Agent, task: str, response: RunResponse) -> None:
+        # Same bookkeeping transfer_task_to_member does, so show_members_responses and agentic context keep working
+        if isinstance(team.memory, TeamMemory):
+            team.memory.add_interaction_to_team_context(member_name=member.name, task=task, run_response=response)
+        elif team.memory is not None:
+            team.memory.add_interaction_to_team_context(
+                session_id=team.session_id, member_name=member.name, task=task, run_response=response
+            )
+        if team.run_response is not None:
+            team.run_response.add_member_run(response)
@@ -0,0 +1,53 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    令牌桶限流器，多个agent/线程共享同一个实例即可共享请求预算
+    :param rate: 每秒补充的令牌数（即长期平均QPS）
+    :param capacity: 桶容量（允许的突发请求数）
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens: int = 1) -> float:
+        """阻塞直到拿到令牌，返回等待的秒数"""
+        if tokens > self.capacity:
+            # 桶里的令牌永远到不了这么多，等下去是死循环
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def release(self, tokens: int = 1) -> None:
+        """归还没有用掉的令牌，如拿到令牌后发现任务已被别人取走"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """非阻塞获取令牌"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
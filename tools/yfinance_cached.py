@@ -0,0 +1,307 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from agno.tools.yfinance import YFinanceTools
+from agno.utils.log import log_debug, logger
+
+from .cache import TTLCache
+from .ratelimit import TokenBucket
+
+# 不同字段的缓存时间（秒）：价格变化快，基本面和公司信息基本一天内不变
+PRICE_TTL = 60
+NEWS_TTL = 15 * 60
+INFO_TTL = 24 * 60 * 60
+RECOMMENDATIONS_TTL = 24 * 60 * 60
+
+# 进程内所有agent共享的缓存和限流器，避免多个agent同时请求被Yahoo限流
+SHARED_CACHE = TTLCache(maxsize=4096)
+SHARED_LIMITER = TokenBucket(rate=2, capacity=5)
+
+
+def normalize_symbol(symbol: str) -> str:
+    return symbol.strip().upper()
+
+
+class YahooFinanceSource:
+    """
+    真实的Yahoo Finance数据源，每个方法对应一次（或一批）网络请求
+    """
+
+    # 缓存键的一部分，所有真实数据源共用缓存
+    cache_key = "yahoo"
+
+    def __init__(self):
+        import yfinance as yf
+
+        self.yf = yf
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        return self.yf.Ticker(symbol).info or {}
+
+    def get_prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        """一次bulk download拿到所有代码的最新收盘价"""
+        df = self.yf.download(
+            tickers=symbols, period="5d", interval="1d", group_by="ticker",
+            progress=False, threads=False, auto_adjust=True,
+        )
+        prices: Dict[str, Optional[float]] = {}
+        for symbol in symbols:
+            try:
+                # group_by="ticker" 时列是 (Ticker, Price) 两级，只查一个代码也一样
+                close = df[symbol]["Close"].dropna()
+                prices[symbol] = float(close.iloc[-1]) if not close.empty else None
+            except (KeyError, IndexError):
+                prices[symbol] = None
+        return prices
+
+    def get_recommendations(self, symbol: str) -> str:
+        return self.yf.Ticker(symbol).recommendations.to_json(orient="index")
+
+    def get_news(self, symbol: str, num_stories: int) -> List[Dict[str, Any]]:
+        return self.yf.Ticker(symbol).news[:num_stories]
+
+
+class StubFinanceSource:
+    """
+    离线数据源，供测试和压测使用，不发任何网络请求
+    :param data: {symbol: {"price": float, "info": dict, "recommendations": str, "news": list}}
+    """
+
+    def __init__(self, data: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.data = data or {
+            "AAPL": {"price": 210.5, "info": {"longName": "Apple Inc.", "shortName": "Apple", "symbol": "AAPL", "sector": "Technology", "marketCap": 3.2e12, "forwardPE": 28.1, "trailingEps": 6.4, "currency": "USD"}},
+            "GOOGL": {"price": 175.2, "info": {"longName": "Alphabet Inc.", "shortName": "Alphabet", "symbol": "GOOGL", "sector": "Communication Services", "marketCap": 2.1e12, "forwardPE": 21.3, "trailingEps": 7.5, "currency": "USD"}},
+            "MSFT": {"price": 450.1, "info": {"longName": "Microsoft Corporation", "shortName": "Microsoft", "symbol": "MSFT", "sector": "Technology", "marketCap": 3.3e12, "forwardPE": 33.0, "trailingEps": 12.1, "currency": "USD"}},
+        }
+        # 每个离线数据源单独一份缓存，不和真实数据源或其他假数据混用
+        self.cache_key = f"stub-{id(self)}"
+        # 记录每类请求次数，便于测试验证缓存和批量是否生效
+        self.calls: Dict[str, int] = {"info": 0, "prices": 0, "recommendations": 0, "news": 0}
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        self.calls["info"] += 1
+        return self.data.get(symbol, {}).get("info", {})
+
+    def get_prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        self.calls["prices"] += 1
+        return {symbol: self.data.get(symbol, {}).get("price") for symbol in symbols}
+
+    def get_recommendations(self, symbol: str) -> str:
+        self.calls["recommendations"] += 1
+        return self.data.get(symbol, {}).get("recommendations", "{}")
+
+    def get_news(self, symbol: str, num_stories: int) -> List[Dict[str, Any]]:
+        self.calls["news"] += 1
+        return self.data.get(symbol, {}).get("news", [])[:num_stories]
+
+
+class CachedYFinanceTools(YFinanceTools):
+    """
+    YFinanceTools的替代品，构造参数一致。
+    - 按(数据源, 代码, 字段)做TTL缓存：价格短TTL，基本面/公司信息长TTL，代码统一转成大写
+    - 多个代码的价格查询合并成一次bulk download
+    - 所有请求经过共享的令牌桶限流
+    Args:
+        source: 数据源，默认YahooFinanceSource，测试时传入StubFinanceSource
+        cache: 缓存实例，默认进程内共享
+        limiter: 限流器，默认进程内共享
+        其余参数同YFinanceTools
+    """
+
+    def __init__(
+        self,
+        source: Optional[Any] = None,
+        cache: Optional[TTLCache] = None,
+        limiter: Optional[TokenBucket] = None,
+        **kwargs,
+    ):
+        self.source = source or YahooFinanceSource()
+        # 空的TTLCache长度为0，不能用 `cache or SHARED_CACHE`
+        self.cache = cache if cache is not None else SHARED_CACHE
+        self.limiter = limiter or SHARED_LIMITER
+        super().__init__(**kwargs)
+        # 批量查价格始终可用，一次调用代替多次get_current_stock_price
+        if "get_current_stock_price" in self.functions:
+            self.register(self.get_current_stock_prices)
+
+    def _key(self, symbol: str, *field: Any) -> tuple:
+        return (getattr(self.source, "cache_key", type(self.source).__name__), symbol, *field)
+
+    def _info(self, symbol: str) -> Dict[str, Any]:
+        symbol = normalize_symbol(symbol)
+        key = self._key(symbol, "info")
+        info = self.cache.get(key)
+        if info is None:
+            self.limiter.acquire()
+            log_debug(f"Fetching info for {symbol}")
+            info = self.source.get_info(symbol)
+            self.cache.set(key, info, INFO_TTL)
+        return info
+
+    def _prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        """返回 {大写代码: 价格}"""
+        symbols = list(dict.fromkeys(normalize_symbol(s) for s in symbols))
+        prices = {symbol: self.cache.get(self._key(symbol, "price")) for symbol in symbols}
+        missing = [symbol for symbol, price in prices.items() if price is None]
+        if missing:
+            self.limiter.acquire()
+            log_debug(f"Bulk downloading prices for {missing}")
+            fetched = self.source.get_prices(missing)
+            for symbol, price in fetched.items():
+                if price is not None:
+                    self.cache.set(self._key(symbol, "price"), price, PRICE_TTL)
+                prices[symbol] = price
+        return prices
+
+    def get_current_stock_price(self, symbol: str) -> str:
+        """
+        Use this function to get the current stock price for a given symbol.
+
+        Args:
+            symbol (str): The stock symbol.
+
+        Returns:
+            str: The current stock price or error message.
+        """
+        try:
+            price = self._prices([symbol])[normalize_symbol(symbol)]
+            return f"{price:.4f}" if price else f"Could not fetch current price for {symbol}"
+        except Exception as e:
+            return f"Error fetching current price for {symbol}: {e}"
+
+    def get_current_stock_prices(self, symbols: List[str]) -> str:
+        """
+        Use this function to get the current stock prices for several symbols at once.
+        Prefer it over calling get_current_stock_price for each symbol.
+
+        Args:
+            symbols (List[str]): The stock symbols, e.g. ["AAPL", "GOOGL", "MSFT"].
+
+        Returns:
+            str: JSON mapping each symbol to its current price (null if unavailable).
+        """
+        try:
+            prices = self._prices(symbols)
+            return json.dumps({s: round(p, 4) if p else None for s, p in prices.items()}, indent=2)
+        except Exception as e:
+            return f"Error fetching current prices for {symbols}: {e}"
+
+    def get_company_info(self, symbol: str) -> str:
+        """Use this function to get company information and overview for a given stock symbol.
+
+        Args:
+            symbol (str): The stock symbol.
+
+        Returns:
+            str: JSON containing company profile and overview.
+        """
+        try:
+            info = self._info(symbol)
+            if not info:
+                return f"Could not fetch company info for {symbol}"
+            currency = info.get("currency", "USD")
+            company_info_cleaned = {
+                "Name": info.get("shortName"),
+                "Symbol": info.get("symbol"),
+                "Current Stock Price": f"{info.get('regularMarketPrice', info.get('currentPrice'))} {currency}",
+                "Market Cap": f"{info.get('marketCap', info.get('enterpriseValue'))} {currency}",
+                "Sector": info.get("sector"),
+                "Industry": info.get("industry"),
+                "Country": info.get("country"),
+                "EPS": info.get("trailingEps"),
+                "P/E Ratio": info.get("trailingPE"),
+                "52 Week Low": info.get("fiftyTwoWeekLow"),
+                "52 Week High": info.get("fiftyTwoWeekHigh"),
+                "50 Day Average": info.get("fiftyDayAverage"),
+                "200 Day Average": info.get("twoHundredDayAverage"),
+                "Website": info.get("website"),
+                "Summary": info.get("longBusinessSummary"),
+                "Analyst Recommendation": info.get("recommendationKey"),
+                "Number Of Analyst Opinions": info.get("numberOfAnalystOpinions"),
+                "Employees": info.get("fullTimeEmployees"),
+                "Total Cash": info.get("totalCash"),
+                "Free Cash flow": info.get("freeCashflow"),
+                "Operating Cash flow": info.get("operatingCashflow"),
+                "EBITDA": info.get("ebitda"),
+                "Revenue Growth": info.get("revenueGrowth"),
+                "Gross Margins": info.get("grossMargins"),
+                "Ebitda Margins": info.get("ebitdaMargins"),
+            }
+            return json.dumps(company_info_cleaned, indent=2)
+        except Exception as e:
+            return f"Error fetching company profile for {symbol}: {e}"
+
+    def get_stock_fundamentals(self, symbol: str) -> str:
+        """Use this function to get fundamental data for a given stock symbol yfinance API.
+
+        Args:
+            symbol (str): The stock symbol.
+
+        Returns:
+            str: A JSON string containing fundamental data or an error message.
+                Keys: symbol, company_name, sector, industry, market_cap, pe_ratio, pb_ratio,
+                dividend_yield, eps, beta, 52_week_high, 52_week_low.
+        """
+        try:
+            info = self._info(symbol)
+            fundamentals = {
+                "symbol": symbol,
+                "company_name": info.get("longName", ""),
+                "sector": info.get("sector", ""),
+                "industry": info.get("industry", ""),
+                "market_cap": info.get("marketCap", "N/A"),
+                "pe_ratio": info.get("forwardPE", "N/A"),
+                "pb_ratio": info.get("priceToBook", "N/A"),
+                "dividend_yield": info.get("dividendYield", "N/A"),
+                "eps": info.get("trailingEps", "N/A"),
+                "beta": info.get("beta", "N/A"),
+                "52_week_high": info.get("fiftyTwoWeekHigh", "N/A"),
+                "52_week_low": info.get("fiftyTwoWeekLow", "N/A"),
+            }
+            return json.dumps(fundamentals, indent=2)
+        except Exception as e:
+            return f"Error getting fundamentals for {symbol}: {e}"
+
+    def get_analyst_recommendations(self, symbol: str) -> str:
+        """Use this function to get analyst recommendations for a given stock symbol.
+
+        Args:
+            symbol (str): The stock symbol.
+
+        Returns:
+            str: JSON containing analyst recommendations.
+        """
+        try:
+            symbol = normalize_symbol(symbol)
+            key = self._key(symbol, "recommendations")
+            recommendations = self.cache.get(key)
+            if recommendations is None:
+                self.limiter.acquire()
+                recommendations = self.source.get_recommendations(symbol)
+                self.cache.set(key, recommendations, RECOMMENDATIONS_TTL)
+            return recommendations
+        except Exception as e:
+            return f"Error fetching analyst recommendations for {symbol}: {e}"
+
+    def get_company_news(self, symbol: str, num_stories: int = 3) -> str:
+        """Use this function to get company news and press releases for a given stock symbol.
+
+        Args:
+            symbol (str): The stock symbol.
+            num_stories (int): The number of news stories to return. Defaults to 3.
+
+        Returns:
+            str: JSON containing company news and press releases.
+        """
+        try:
+            symbol = normalize_symbol(symbol)
+            key = self._key(symbol, "news", num_stories)
+            news = self.cache.get(key)
+            if news is None:
+                self.limiter.acquire()
+                news = self.source.get_news(symbol, num_stories)
+                self.cache.set(key, news, NEWS_TTL)
+            return json.dumps(news, indent=2)
+        except Exception as e:
+            logger.warning(f"Error fetching company news for {symbol}: {e}")
+            return f"Error fetching company news for {symbol}: {e}"